@@ -0,0 +1,126 @@
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_community.retrievers import BM25Retriever
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src"))
+
+from pipeline.bm25 import SparseBM25Retriever
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Benchmark BM25Retriever against the sparse BM25 retriever')
+    parser.add_argument(
+        '--sizes',
+        type=int,
+        nargs='+',
+        default=[1000, 10000, 100000],
+        help='Corpus sizes (number of chunks) to benchmark'
+    )
+    parser.add_argument(
+        '--queries',
+        type=int,
+        default=200,
+        help='Number of queries per corpus size'
+    )
+    parser.add_argument(
+        '--k',
+        type=int,
+        default=3,
+        help='Number of documents retrieved per query'
+    )
+    parser.add_argument(
+        '--baseline-max-size',
+        type=int,
+        default=100000,
+        help='Skip the rank_bm25 baseline above this corpus size'
+    )
+    parser.add_argument(
+        '--output',
+        type=str,
+        default=None,
+        help='Write the results as JSON to this path'
+    )
+    return parser
+
+
+def synthetic_corpus(num_chunks: int, vocab_size: int = 30000, seed: int = 0) -> list[Document]:
+    """Chunks of Zipf-distributed words, roughly the length of our 500-token chunks."""
+    rng = np.random.default_rng(seed)
+    words = np.array([f"w{i}" for i in range(vocab_size)])
+    lengths = rng.integers(150, 400, size=num_chunks)
+    ranks = np.minimum(rng.zipf(1.2, size=int(lengths.sum())), vocab_size) - 1
+    docs, offset = [], 0
+    for length in lengths:
+        docs.append(Document(page_content=" ".join(words[ranks[offset:offset + length]])))
+        offset += length
+    return docs
+
+
+def synthetic_queries(docs: list[Document], num_queries: int, seed: int = 1) -> list[str]:
+    """Queries of 3-8 words sampled from random chunks."""
+    rng = np.random.default_rng(seed)
+    queries = []
+    for _ in range(num_queries):
+        tokens = docs[int(rng.integers(len(docs)))].page_content.split()
+        queries.append(" ".join(rng.choice(tokens, size=int(rng.integers(3, 9)))))
+    return queries
+
+
+def measure(retriever, queries: list[str]) -> tuple[dict, list[list[str]]]:
+    latencies, results = [], []
+    for query in queries:
+        start = time.perf_counter()
+        docs = retriever.invoke(query)
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([doc.page_content for doc in docs])
+    ordered = sorted(latencies)
+    return {
+        "p50_ms": round(statistics.median(latencies), 3),
+        "p95_ms": round(ordered[int(0.95 * (len(ordered) - 1))], 3),
+        "p99_ms": round(ordered[int(0.99 * (len(ordered) - 1))], 3),
+    }, results
+
+
+def main():
+    args = create_parser().parse_args()
+    report = []
+
+    for size in args.sizes:
+        docs = synthetic_corpus(size)
+        queries = synthetic_queries(docs, args.queries)
+        row = {"chunks": size}
+
+        start = time.perf_counter()
+        sparse_retriever = SparseBM25Retriever.from_documents(docs, k=args.k)
+        row["sparse_build_s"] = round(time.perf_counter() - start, 3)
+        row["sparse"], sparse_results = measure(sparse_retriever, queries)
+
+        if size <= args.baseline_max_size:
+            start = time.perf_counter()
+            baseline = BM25Retriever.from_documents(docs, k=args.k)
+            row["rank_bm25_build_s"] = round(time.perf_counter() - start, 3)
+            row["rank_bm25"], baseline_results = measure(baseline, queries)
+            row["speedup_p50"] = round(row["rank_bm25"]["p50_ms"] / max(row["sparse"]["p50_ms"], 1e-6), 1)
+            # Ties may be ordered differently, so compare result sets
+            row["topk_agreement"] = round(sum(
+                len(set(a) & set(b)) / max(len(b), 1)
+                for a, b in zip(sparse_results, baseline_results)
+            ) / len(queries), 4)
+
+        print(json.dumps(row))
+        report.append(row)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
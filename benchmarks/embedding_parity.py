@@ -0,0 +1,130 @@
+import os
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+from common.embedding import DEFAULT_MODEL_NAME as MODEL_NAME, load_embeddings
+from common.onnx_embedding import OnnxEmbeddings
+
+DEFAULT_QUERIES = [
+    "Apa syarat melakukan lembur dan bagaimana pelaporannya?",
+    "Bagaimana prosedur pengajuan cuti tahunan?",
+    "Siapa yang menyetujui perjalanan dinas?",
+    "Dokumen apa saja yang diperlukan untuk reimbursement?",
+    "Bagaimana cara mengajukan permintaan bantuan teknis ke Tim IT?",
+    "Seberapa sering backup data dilakukan?",
+]
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description='Compare the ONNX embedding backend (float32 and int8) with the PyTorch model'
+    )
+    parser.add_argument(
+        '--input',
+        type=str,
+        default=os.path.join(PROJECT_DIR, 'output', 'combined_output.txt'),
+        help='Text file split into paragraphs used as documents'
+    )
+    parser.add_argument('--max-texts', type=int, default=512, help='Maximum number of documents to embed')
+    parser.add_argument('--k', type=int, default=5, help='Neighbors compared per query')
+    parser.add_argument('--threads', type=int, default=None, help='Intra-op threads for the ONNX sessions')
+    parser.add_argument('--batch-size', type=int, default=32, help='Texts per ONNX forward pass')
+    parser.add_argument('--model-dir', type=str, default=None, help='Local ONNX model directory instead of the Hub')
+    parser.add_argument(
+        '--variants',
+        type=str,
+        nargs='+',
+        choices=['float32', 'int8'],
+        default=['float32', 'int8'],
+        help='ONNX variants to compare'
+    )
+    parser.add_argument('--min-cosine', type=float, default=0.99, help='Fail when any vector is less similar than this')
+    parser.add_argument(
+        '--min-topk-agreement',
+        type=float,
+        default=0.9,
+        help='Fail when the neighbors agree less than this on average'
+    )
+    parser.add_argument('--output', type=str, default=None, help='Write the report as JSON to this path')
+    return parser
+
+
+def load_texts(path: str, max_texts: int) -> list[str]:
+    """Non-empty paragraphs of the input file, or the default queries when it is missing."""
+    if not os.path.exists(path):
+        return list(DEFAULT_QUERIES)
+    with open(path, encoding="utf-8") as f:
+        paragraphs = [p.strip() for p in f.read().split("\n\n")]
+    return [p for p in paragraphs if p][:max_texts]
+
+
+def embed(embeddings, texts: list[str], queries: list[str]) -> tuple[np.ndarray, np.ndarray, float]:
+    embeddings.embed_documents(texts[:8])
+    start = time.perf_counter()
+    documents = np.asarray(embeddings.embed_documents(texts), dtype=np.float32)
+    elapsed = time.perf_counter() - start
+    return documents, np.asarray([embeddings.embed_query(q) for q in queries], dtype=np.float32), elapsed
+
+
+def neighbors(queries: np.ndarray, documents: np.ndarray, k: int) -> np.ndarray:
+    return np.argsort(-(queries @ documents.T), axis=1)[:, :k]
+
+
+def compare(reference: tuple, candidate: tuple, k: int) -> dict:
+    ref_docs, ref_queries, _ = reference
+    docs, queries, _ = candidate
+    cosine = np.sum(ref_docs * docs, axis=1) / (
+        np.linalg.norm(ref_docs, axis=1) * np.linalg.norm(docs, axis=1)
+    )
+    ref_top, top = neighbors(ref_queries, ref_docs, k), neighbors(queries, docs, k)
+    agreement = np.mean([len(set(a) & set(b)) / len(a) for a, b in zip(ref_top, top)])
+    return {
+        "min_cosine": round(float(cosine.min()), 6),
+        "mean_cosine": round(float(cosine.mean()), 6),
+        "max_abs_diff": round(float(np.abs(ref_docs - docs).max()), 6),
+        "topk_agreement": round(float(agreement), 4),
+    }
+
+
+def main():
+    args = create_parser().parse_args()
+    texts = load_texts(args.input, args.max_texts)
+    k = min(args.k, len(texts))
+
+    reference = embed(load_embeddings(MODEL_NAME, backend="torch"), texts, DEFAULT_QUERIES)
+    report = [{"backend": "torch", "texts": len(texts), "texts_per_s": round(len(texts) / reference[2], 1)}]
+    print(json.dumps(report[0]))
+
+    failed = False
+    for variant in args.variants:
+        embeddings = OnnxEmbeddings(
+            model_name=MODEL_NAME,
+            quantize=variant == "int8",
+            threads=args.threads,
+            batch_size=args.batch_size,
+            model_dir=args.model_dir
+        )
+        candidate = embed(embeddings, texts, DEFAULT_QUERIES)
+        row = {"backend": f"onnx-{variant}", "texts": len(texts), "texts_per_s": round(len(texts) / candidate[2], 1)}
+        row.update(compare(reference, candidate, k))
+        row["speedup"] = round(reference[2] / max(candidate[2], 1e-9), 2)
+        row["passed"] = row["min_cosine"] >= args.min_cosine and row["topk_agreement"] >= args.min_topk_agreement
+        failed = failed or not row["passed"]
+        print(json.dumps(row))
+        report.append(row)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
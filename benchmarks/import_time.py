@@ -0,0 +1,76 @@
+import os
+import sys
+import json
+import argparse
+import subprocess
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Measure the import time of the API service module')
+    parser.add_argument('--module', type=str, default='service', help='Module to import from src/')
+    parser.add_argument('--top', type=int, default=15, help='Number of slowest imports to list')
+    parser.add_argument('--runs', type=int, default=3, help='Fresh interpreters to measure; the fastest is reported')
+    parser.add_argument(
+        '--budget-ms',
+        type=float,
+        default=None,
+        help='Exit with status 1 when the import takes longer than this'
+    )
+    return parser
+
+
+def measure(module: str) -> list[tuple[str, int, int, int]]:
+    """Import `module` in a fresh interpreter with `-X importtime`.
+
+    Returns:
+        list[tuple[str, int, int, int]]: (module, depth, self_us, cumulative_us) per import.
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=os.path.join(PROJECT_DIR, "src"),
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "import failed")
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nesting is shown as two spaces per level after the separator's space
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), depth, int(self_us), int(cumulative_us)))
+    return rows
+
+
+def main():
+    args = create_parser().parse_args()
+    best = None
+    for _ in range(args.runs):
+        rows = measure(args.module)
+        total_us = next(cumulative for name, _, _, cumulative in rows if name == args.module)
+        if best is None or total_us < best[0]:
+            best = (total_us, rows)
+
+    total_us, rows = best
+    # Direct imports of the measured module carry its cost breakdown
+    direct = [row for row in rows if row[1] == 1]
+    report = {
+        "module": args.module,
+        "import_ms": round(total_us / 1000, 1),
+        "slowest": [
+            {"module": name, "cumulative_ms": round(cumulative / 1000, 1)}
+            for name, _, _, cumulative in sorted(direct, key=lambda row: -row[3])[:args.top]
+        ],
+    }
+    print(json.dumps(report, indent=2))
+    if args.budget_ms is not None and report["import_ms"] > args.budget_ms:
+        print(f"Import of {args.module} took {report['import_ms']} ms, over the {args.budget_ms} ms budget", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
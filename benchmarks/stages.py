@@ -0,0 +1,357 @@
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import subprocess
+from typing import Any, Callable, Optional
+
+import numpy as np
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(PROJECT_DIR, "src"))
+
+from stub_llm import StubLLMServer
+from common.snapshot import resolve_index_dirs
+
+OUTPUT_DIR = os.path.join(PROJECT_DIR, "output")
+STAGES = [
+    "load_split",
+    "embed_single",
+    "embed_batch",
+    "pgvector",
+    "bm25",
+    "memmap",
+    "rerank",
+    "assemble",
+    "prompt",
+    "llm",
+    "llm_stream",
+]
+DEFAULT_QUERIES = [
+    "Apa syarat melakukan lembur dan bagaimana pelaporannya?",
+    "Bagaimana prosedur pengajuan cuti tahunan?",
+    "Siapa yang menyetujui perjalanan dinas?",
+    "Dokumen apa saja yang diperlukan untuk reimbursement?",
+]
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Benchmark each stage of the RAG pipeline in isolation')
+    parser.add_argument(
+        '--stages',
+        type=str,
+        nargs='+',
+        choices=STAGES,
+        default=STAGES,
+        help='Stages to benchmark'
+    )
+    parser.add_argument('--runs', type=int, default=50, help='Timed warm runs per stage')
+    parser.add_argument('--warmup', type=int, default=5, help='Untimed runs between the cold run and the warm runs')
+    parser.add_argument('--batch-size', type=int, default=32, help='Texts per call in the embed_batch stage')
+    parser.add_argument('--llm-delay-ms', type=float, default=0.0, help='Latency added by the stub LLM server')
+    parser.add_argument(
+        '--input',
+        type=str,
+        default=os.path.join(PROJECT_DIR, 'evaluasi_data.xlsx'),
+        help='Excel file with a `pertanyaan` column used as queries'
+    )
+    parser.add_argument('--output', type=str, default=None, help='Write the report as JSON to this path')
+    return parser
+
+
+def index_dirs() -> tuple[str, str]:
+    """Keyword and vector index directories of the published snapshot, or the unversioned ones from older runs"""
+    _, keyword_index_dir, vector_index_dir = resolve_index_dirs(
+        os.path.join(OUTPUT_DIR, "snapshots"),
+        os.path.join(OUTPUT_DIR, "keyword_index"),
+        os.path.join(OUTPUT_DIR, "vector_index")
+    )
+    return keyword_index_dir, vector_index_dir
+
+
+class Skip(Exception):
+    """Raised by a stage setup when the stage cannot run in this environment."""
+
+
+def summarize(latencies_ms: list[float]) -> dict:
+    values = np.asarray(latencies_ms)
+    return {
+        "runs": len(values),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+    }
+
+
+def run_stage(name: str, setup: Callable[[], Callable[[int], Any]], runs: int, warmup: int) -> dict:
+    """Time one stage.
+
+    `setup` builds the stage (timed as `init_s`) and returns a callable that
+    runs it once for iteration `i`. The first call on the fresh stage is the
+    cold run (model graphs, connection pools and page cache not yet warm);
+    after `warmup` untimed calls, `runs` warm calls are summarized.
+    """
+    result = {"stage": name}
+    try:
+        start = time.perf_counter()
+        run = setup()
+        result["init_s"] = round(time.perf_counter() - start, 3)
+
+        start = time.perf_counter()
+        run(0)
+        result["cold_ms"] = round((time.perf_counter() - start) * 1000, 3)
+
+        for i in range(warmup):
+            run(1 + i)
+        latencies = []
+        for i in range(runs):
+            start = time.perf_counter()
+            run(1 + warmup + i)
+            latencies.append((time.perf_counter() - start) * 1000)
+        result["status"] = "ok"
+        result["warm"] = summarize(latencies)
+    except Skip as e:
+        result.update({"status": "skipped", "reason": str(e)})
+    except Exception as e:
+        result.update({"status": "error", "reason": f"{type(e).__name__}: {e}"})
+    print(json.dumps(result), file=sys.stderr)
+    return result
+
+
+class Context:
+    """Inputs shared by the stages, built lazily so skipped stages cost nothing."""
+
+    def __init__(self, args):
+        self.args = args
+        self._queries = None
+        self._chunks = None
+        self._embeddings = None
+        self._prompt = None
+
+    @property
+    def queries(self) -> list[str]:
+        if self._queries is None:
+            try:
+                import pandas as pd
+                self._queries = [str(q) for q in pd.read_excel(self.args.input)["pertanyaan"].dropna()]
+            except Exception:
+                self._queries = []
+            self._queries = self._queries or DEFAULT_QUERIES
+        return self._queries
+
+    def query(self, i: int) -> str:
+        return self.queries[i % len(self.queries)]
+
+    @property
+    def chunks(self) -> list:
+        if self._chunks is None:
+            from pipeline.keyword_index import KeywordIndex
+
+            index_dir, _ = index_dirs()
+            if os.path.exists(os.path.join(index_dir, "meta.json")):
+                index = KeywordIndex(index_dir)
+                self._chunks = [index.get_document(i) for i in range(index.num_docs)]
+            else:
+                from pipeline.rag import RAGPipeline
+                self._chunks = RAGPipeline.load_split_documents(os.path.join(OUTPUT_DIR, "documents"))
+            if not self._chunks:
+                raise Skip("no chunks found, run etl/indexing.py first")
+        return self._chunks
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            from pipeline.embedding import embedding_pipeline
+            self._embeddings = embedding_pipeline()
+        return self._embeddings
+
+    @property
+    def prompt(self):
+        if self._prompt is None:
+            from pipeline.prompts import get_rag_prompt
+            self._prompt = get_rag_prompt()
+        return self._prompt
+
+
+def setup_load_split(ctx: Context):
+    from pipeline.rag import RAGPipeline
+
+    path = os.path.join(OUTPUT_DIR, "documents")
+    if not os.path.exists(path):
+        raise Skip(f"{path} not found")
+    return lambda i: RAGPipeline.load_split_documents(path)
+
+
+def setup_embed_single(ctx: Context):
+    embeddings = ctx.embeddings
+    return lambda i: embeddings.embed_query(ctx.query(i))
+
+
+def setup_embed_batch(ctx: Context):
+    embeddings = ctx.embeddings
+    texts = [chunk.page_content for chunk in ctx.chunks]
+    batch_size = ctx.args.batch_size
+
+    def run(i: int):
+        start = (i * batch_size) % len(texts)
+        batch = (texts[start:] + texts)[:batch_size]
+        embeddings.embed_documents(batch)
+    return run
+
+
+def setup_pgvector(ctx: Context):
+    from pipeline.db import get_engine
+    from pipeline.retriever import get_vector_store
+
+    try:
+        vector_store = get_vector_store(ctx.embeddings, os.getenv("COLLECTION_NAME"), get_engine())
+    except Exception as e:
+        raise Skip(f"vector store unavailable: {e}")
+    # Query vectors are computed up front so only the database round trip is timed
+    vectors = [ctx.embeddings.embed_query(q) for q in ctx.queries]
+    return lambda i: vector_store.similarity_search_by_vector(vectors[i % len(vectors)], k=3)
+
+
+def setup_bm25(ctx: Context):
+    from pipeline.keyword_index import KeywordIndex
+    from pipeline.retriever import get_keyword_retriever
+
+    index_dir, _ = index_dirs()
+    if os.path.exists(os.path.join(index_dir, "meta.json")):
+        retriever = get_keyword_retriever(index=KeywordIndex(index_dir))
+    else:
+        retriever = get_keyword_retriever(chunks=ctx.chunks)
+    return lambda i: retriever.invoke(ctx.query(i))
+
+
+def setup_memmap(ctx: Context):
+    from pipeline.vector_index import VectorIndex
+
+    _, index_dir = index_dirs()
+    if not os.path.exists(os.path.join(index_dir, "meta.json")):
+        raise Skip("vector index not exported, run etl/indexing.py with VECTOR_INDEX_EXPORT=true")
+    index = VectorIndex(index_dir)
+    vectors = [ctx.embeddings.embed_query(q) for q in ctx.queries]
+    return lambda i: index.search(vectors[i % len(vectors)], k=3)
+
+
+def setup_rerank(ctx: Context):
+    from langchain.retrievers.document_compressors import FlashrankRerank
+    from pipeline.retriever import get_keyword_retriever
+
+    compressor = FlashrankRerank(top_n=5)
+    # Same candidate count as the hybrid path: top 3 from each retriever
+    keyword_retriever = get_keyword_retriever(chunks=ctx.chunks, k=6)
+    candidates = [keyword_retriever.invoke(q) for q in ctx.queries]
+    return lambda i: compressor.compress_documents(candidates[i % len(candidates)], ctx.query(i))
+
+
+def _candidate_sets(ctx: Context) -> list:
+    # Neighbouring chunks, so consecutive chunks overlap like retrieved ones often do
+    return [ctx.chunks[j:j + 5] for j in range(0, len(ctx.chunks), 5)]
+
+
+def setup_assemble(ctx: Context):
+    from pipeline.context import ContextAssembler
+
+    assembler = ContextAssembler()
+    contexts = _candidate_sets(ctx)
+    return lambda i: assembler.assemble(contexts[i % len(contexts)])
+
+
+def setup_prompt(ctx: Context):
+    from pipeline.context import ContextAssembler
+
+    prompt = ctx.prompt
+    assembler = ContextAssembler()
+    contexts = [assembler.assemble(docs).text for docs in _candidate_sets(ctx)]
+    return lambda i: prompt.invoke({"context": contexts[i % len(contexts)], "question": ctx.query(i)})
+
+
+def _llm_chain(ctx: Context, server: StubLLMServer):
+    from langchain_core.output_parsers import StrOutputParser
+    from pipeline.llm import get_llm
+
+    os.environ.setdefault("GROQ_API_KEY", "stub")
+    return ctx.prompt | get_llm(base_url=server.base_url) | StrOutputParser()
+
+
+def _llm_context(ctx: Context) -> str:
+    from pipeline.context import ContextAssembler
+    return ContextAssembler().assemble(ctx.chunks[:5]).text
+
+
+def setup_llm(ctx: Context, server: StubLLMServer):
+    chain = _llm_chain(ctx, server)
+    context = _llm_context(ctx)
+    return lambda i: chain.invoke({"context": context, "question": ctx.query(i)})
+
+
+def setup_llm_stream(ctx: Context, server: StubLLMServer):
+    chain = _llm_chain(ctx, server)
+    context = _llm_context(ctx)
+    loop = asyncio.new_event_loop()
+
+    async def consume(query: str):
+        async for _ in chain.astream({"context": context, "question": query}):
+            pass
+    return lambda i: loop.run_until_complete(consume(ctx.query(i)))
+
+
+def environment() -> dict:
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_DIR, capture_output=True, text=True
+        ).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+def main():
+    args = create_parser().parse_args()
+    ctx = Context(args)
+    server: Optional[StubLLMServer] = None
+    if {"llm", "llm_stream"} & set(args.stages):
+        server = StubLLMServer(delay_ms=args.llm_delay_ms).start()
+
+    setups = {
+        "load_split": lambda: setup_load_split(ctx),
+        "embed_single": lambda: setup_embed_single(ctx),
+        "embed_batch": lambda: setup_embed_batch(ctx),
+        "pgvector": lambda: setup_pgvector(ctx),
+        "bm25": lambda: setup_bm25(ctx),
+        "memmap": lambda: setup_memmap(ctx),
+        "rerank": lambda: setup_rerank(ctx),
+        "assemble": lambda: setup_assemble(ctx),
+        "prompt": lambda: setup_prompt(ctx),
+        "llm": lambda: setup_llm(ctx, server),
+        "llm_stream": lambda: setup_llm_stream(ctx, server),
+    }
+    report = {
+        "environment": environment(),
+        "config": {"runs": args.runs, "warmup": args.warmup, "batch_size": args.batch_size, "llm_delay_ms": args.llm_delay_ms},
+        "stages": [run_stage(name, setups[name], args.runs, args.warmup) for name in STAGES if name in args.stages],
+    }
+    if server is not None:
+        server.stop()
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(output)
+    print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+import json
+import time
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='OpenAI/Groq-compatible stub chat completion server')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='Host to bind')
+    parser.add_argument('--port', type=int, default=8081, help='Port to bind')
+    parser.add_argument('--delay-ms', type=float, default=0.0, help='Delay before the first token')
+    parser.add_argument('--token-delay-ms', type=float, default=0.0, help='Delay between streamed tokens')
+    return parser
+
+
+DEFAULT_ANSWER = (
+    "Berdasarkan SOP, lembur harus disetujui atasan langsung sebelum dilaksanakan "
+    "dan dilaporkan melalui formulir lembur paling lambat satu hari kerja setelahnya."
+)
+
+
+class StubLLMServer:
+    """Local chat completion endpoint with a fixed answer and configurable latency.
+
+    Serves `POST /openai/v1/chat/completions` (the path the Groq client calls)
+    in both regular and streaming (SSE) mode, so the LLM stage can be
+    benchmarked without network variance or API cost. Point `GROQ_BASE_URL`
+    at `base_url` to run the API against it.
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        answer: str = DEFAULT_ANSWER,
+        delay_ms: float = 0.0,
+        token_delay_ms: float = 0.0
+    ):
+        self.answer = answer
+        self.delay_ms = delay_ms
+        self.token_delay_ms = token_delay_ms
+        self.requests = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+                if not self.path.endswith("/chat/completions"):
+                    self.send_error(404)
+                    return
+                stub.requests += 1
+                time.sleep(stub.delay_ms / 1000)
+                if body.get("stream"):
+                    self._stream(body)
+                else:
+                    self._complete(body)
+
+            def _completion_id(self):
+                return f"chatcmpl-stub-{stub.requests}"
+
+            def _complete(self, body):
+                tokens = stub.answer.split(" ")
+                payload = json.dumps({
+                    "id": self._completion_id(),
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model", "stub"),
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": stub.answer},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": {"prompt_tokens": 0, "completion_tokens": len(tokens), "total_tokens": len(tokens)},
+                }).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def _stream(self, body):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def send(data: str):
+                    event = f"data: {data}\n\n".encode("utf-8")
+                    self.wfile.write(f"{len(event):x}\r\n".encode("ascii") + event + b"\r\n")
+                    self.wfile.flush()
+
+                tokens = stub.answer.split(" ")
+                for i, token in enumerate(tokens):
+                    if i and stub.token_delay_ms:
+                        time.sleep(stub.token_delay_ms / 1000)
+                    send(json.dumps({
+                        "id": self._completion_id(),
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": body.get("model", "stub"),
+                        "choices": [{
+                            "index": 0,
+                            "delta": {"role": "assistant", "content": token if i == 0 else " " + token},
+                            "finish_reason": "stop" if i == len(tokens) - 1 else None,
+                        }],
+                    }))
+                send("[DONE]")
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def start(self) -> "StubLLMServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-llm", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main():
+    args = create_parser().parse_args()
+    server = StubLLMServer(args.host, args.port, delay_ms=args.delay_ms, token_delay_ms=args.token_delay_ms)
+    print(f"Stub LLM listening on {server.base_url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+"""
+Code shared by the API (`src/`) and the indexing pipeline (`etl/`).
+
+Installed with the project (`pip install -e .`, included in
+`requirements.txt`), so both sides import these modules as `common.<module>`.
+"""
@@ -0,0 +1,107 @@
+# common/chunking.py
+import os
+import hashlib
+import logging
+from typing import List
+
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_core.documents import Document
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 100
+SEPARATORS = [
+    "\n\n",
+    "\n",
+    " ",
+    ".",
+    ",",
+    "\u200b",  # Zero-width space
+    "\uff0c",  # Fullwidth comma
+    "\u3001",  # Ideographic comma
+    "\uff0e",  # Fullwidth full stop
+    "\u3002",  # Ideographic full stop
+    "",
+]
+
+
+def split_documents(documents: List[Document]) -> List[Document]:
+    """
+    Split documents into chunks, never across two documents.
+
+    The indexer and the API's in-memory BM25 fallback both chunk through
+    here, so they produce the same chunks from the same text.
+
+    Args:
+        documents (List[Document]): The documents to split.
+
+    Returns:
+        List[Document]: The chunks, in document order.
+    """
+    text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
+        chunk_size=CHUNK_SIZE,
+        chunk_overlap=CHUNK_OVERLAP,
+        separators=SEPARATORS,
+    )
+    return text_splitter.split_documents(documents)
+
+
+def load_document_chunks(path: str) -> List[Document]:
+    """
+    Load one extracted document and split it into chunks.
+
+    Args:
+        path (str): The document's text file, as written by `etl/indexing.py`.
+
+    Returns:
+        List[Document]: The chunks; empty for an empty file.
+    """
+    if os.path.getsize(path) == 0:
+        return []
+    from langchain_unstructured import UnstructuredLoader
+
+    return split_documents(UnstructuredLoader(path).load())
+
+
+def load_corpus_chunks(documents_dir: str) -> List[Document]:
+    """
+    Chunk every extracted document of a directory, one document at a time.
+
+    Args:
+        documents_dir (str): Directory of per-document `.txt` files written by `etl/indexing.py`.
+
+    Returns:
+        List[Document]: The chunks of all documents, ordered by file name.
+    """
+    chunks: List[Document] = []
+    for name in sorted(os.listdir(documents_dir)):
+        if name.endswith(".txt"):
+            chunks.extend(load_document_chunks(os.path.join(documents_dir, name)))
+    logger.info(f"Split {documents_dir} into {len(chunks)} chunks")
+    return chunks
+
+
+def chunk_ids(source: str, chunks: List[Document]) -> List[str]:
+    """
+    Derive stable ids from the source document and chunk content.
+
+    Identical chunks within a document are told apart by their occurrence
+    count, so ids survive edits elsewhere in the document and unchanged
+    chunks are neither re-embedded nor rewritten.
+
+    Args:
+        source (str): Name of the source document.
+        chunks (List[Document]): The document's chunks, in order.
+
+    Returns:
+        List[str]: One id per chunk.
+    """
+    seen = {}
+    ids = []
+    for chunk in chunks:
+        occurrence = seen.get(chunk.page_content, 0)
+        seen[chunk.page_content] = occurrence + 1
+        key = f"{source}\0{occurrence}\0{chunk.page_content}"
+        ids.append(hashlib.sha256(key.encode("utf-8")).hexdigest()[:32])
+    return ids
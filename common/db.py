@@ -0,0 +1,73 @@
+# common/db.py
+import os
+import logging
+from typing import Any, Dict
+
+from dotenv import load_dotenv, find_dotenv
+from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine
+
+load_dotenv(find_dotenv())
+
+logger = logging.getLogger(__name__)
+
+
+def get_connection_string() -> str:
+    """
+    Build the Postgres connection string from the environment.
+
+    The `psycopg` (v3) driver serves both the sync and the async engine.
+
+    Returns:
+        str: The SQLAlchemy connection string.
+    """
+    return (
+        f"postgresql+psycopg://"
+        f"{os.getenv('POSTGRES_USER')}:"
+        f"{os.getenv('POSTGRES_PASSWORD')}@"
+        f"{os.getenv('POSTGRES_HOST')}:"
+        f"{os.getenv('POSTGRES_PORT')}/"
+        f"{os.getenv('POSTGRES_DB')}"
+    )
+
+
+def get_engine_args(statement_timeout_ms: int) -> Dict[str, Any]:
+    """
+    Connection pool settings shared by the API and `etl/indexing.py`.
+
+    Args:
+        statement_timeout_ms (int): Per-statement timeout. 0 disables the timeout.
+
+    Returns:
+        Dict[str, Any]: Keyword arguments for `create_engine` / `create_async_engine`.
+    """
+    return {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", "5")),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", "10")),
+        "pool_timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),
+        "pool_recycle": int(os.getenv("DB_POOL_RECYCLE", "1800")),
+        "pool_pre_ping": os.getenv("DB_POOL_PRE_PING", "true").lower() == "true",
+        "connect_args": {
+            "connect_timeout": int(os.getenv("DB_CONNECT_TIMEOUT", "5")),
+            "options": f"-c statement_timeout={int(statement_timeout_ms)}",
+        },
+    }
+
+
+def create_pooled_engine(statement_timeout_ms: int) -> Engine:
+    """
+    Create a pooled sync engine with the shared settings.
+
+    Args:
+        statement_timeout_ms (int): Per-statement timeout. 0 disables the timeout.
+
+    Returns:
+        Engine: The new engine.
+    """
+    engine_args = get_engine_args(statement_timeout_ms)
+    engine = create_engine(get_connection_string(), **engine_args)
+    logger.info(
+        f"Database engine initialized (pool_size={engine_args['pool_size']}, "
+        f"max_overflow={engine_args['max_overflow']})"
+    )
+    return engine
@@ -0,0 +1,65 @@
+# common/embedding.py
+import os
+import logging
+from typing import Optional
+
+from langchain_core.embeddings import Embeddings
+from common.onnx_embedding import OnnxEmbeddings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+BACKENDS = ["torch", "onnx"]
+
+
+def load_embeddings(model_name: str = DEFAULT_MODEL_NAME, backend: Optional[str] = None) -> Embeddings:
+    """
+    Create the embedding model used for both chunks and queries.
+
+    The backend is "torch" (sentence-transformers on PyTorch) or "onnx"
+    (ONNX Runtime, optionally int8), chosen by `EMBEDDING_BACKEND` when not
+    given. Both produce the same normalized vectors, within the tolerance
+    checked by `benchmarks/embedding_parity.py`. `EMBEDDING_THREADS` and the
+    `EMBEDDING_ONNX_*` variables tune the model.
+
+    Args:
+        model_name (str): The name of the model to use for embedding.
+        backend (Optional[str]): "torch" or "onnx".
+
+    Returns:
+        Embeddings: The initialized embedding model.
+    """
+    backend = (backend or os.getenv("EMBEDDING_BACKEND", "torch")).lower()
+    threads = int(os.getenv("EMBEDDING_THREADS") or 0) or None
+    if backend == "onnx":
+        embeddings = OnnxEmbeddings(
+            model_name=model_name,
+            quantize=os.getenv("EMBEDDING_ONNX_QUANTIZE", "false").lower() == "true",
+            threads=threads,
+            batch_size=int(os.getenv("EMBEDDING_ONNX_BATCH_SIZE", "32")),
+            model_dir=os.getenv("EMBEDDING_ONNX_MODEL_DIR") or None
+        )
+    elif backend == "torch":
+        from langchain_huggingface import HuggingFaceEmbeddings
+
+        if threads:
+            set_inference_threads(threads)
+        embeddings = HuggingFaceEmbeddings(
+            model_name=model_name,
+            model_kwargs={"device": "cpu"}
+        )
+    else:
+        raise ValueError(f"Unknown embedding backend: {backend}. Valid backends are: {BACKENDS}")
+    logger.info(f"Embeddings initialized successfully ({backend})")
+    return embeddings
+
+
+def set_inference_threads(threads: int) -> None:
+    """
+    Limit the threads the PyTorch embedding model uses per forward pass.
+
+    Args:
+        threads (int): Intra-op threads for torch.
+    """
+    import torch
+    torch.set_num_threads(threads)
@@ -0,0 +1,181 @@
+# common/index_format.py
+import os
+import json
+import mmap
+import hashlib
+from typing import List
+
+import numpy as np
+from langchain_core.documents import Document
+
+# Bumped whenever `etl/indexing.py` changes the files it writes; the API
+# refuses indexes of another format and the indexer rebuilds them
+KEYWORD_INDEX_FORMAT = 2
+VECTOR_INDEX_FORMAT = 1
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Tokenize text for keyword search, at index and at query time.
+
+    Matches the default whitespace tokenizer of `BM25Retriever`.
+
+    Args:
+        text (str): The text to tokenize.
+
+    Returns:
+        List[str]: The tokens.
+    """
+    return text.split()
+
+
+def is_current_format(index_dir: str, format_version: int) -> bool:
+    """
+    Whether an index exists and was written in the given format.
+
+    Args:
+        index_dir (str): Directory of the persisted index.
+        format_version (int): Expected format, e.g. `KEYWORD_INDEX_FORMAT`.
+
+    Returns:
+        bool: False when the index is missing or must be rebuilt.
+    """
+    try:
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            return json.load(f).get("format") == format_version
+    except FileNotFoundError:
+        return False
+
+
+def bm25_idf(doc_freqs: np.ndarray, num_docs: int, epsilon: float = 0.25) -> np.ndarray:
+    """
+    Okapi IDF per term, with rank_bm25's flooring of negative IDF.
+
+    Args:
+        doc_freqs (np.ndarray): Number of documents containing each term.
+        num_docs (int): Number of documents.
+        epsilon (float): Floor for negative IDF, as a fraction of the mean IDF.
+
+    Returns:
+        np.ndarray: float64 IDF per term.
+    """
+    doc_freqs = np.asarray(doc_freqs, dtype=np.float64)
+    idf = np.log(num_docs - doc_freqs + 0.5) - np.log(doc_freqs + 0.5)
+    if len(idf):
+        idf[idf < 0] = epsilon * idf.mean()
+    return idf
+
+
+def bm25_weights(
+    indptr: np.ndarray,
+    postings_docs: np.ndarray,
+    postings_tf: np.ndarray,
+    idf: np.ndarray,
+    doc_lengths: np.ndarray,
+    k1: float = 1.5,
+    b: float = 0.75
+) -> np.ndarray:
+    """
+    BM25 weight of every posting of CSR term-document postings lists.
+
+    The weight `idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))`
+    is query independent, so a query's scores are sums of these weights.
+
+    Args:
+        indptr (np.ndarray): Start of each term's postings.
+        postings_docs (np.ndarray): Document index per posting.
+        postings_tf (np.ndarray): Term frequency per posting.
+        idf (np.ndarray): IDF per term.
+        doc_lengths (np.ndarray): Token count per document.
+        k1 (float): BM25 term frequency saturation.
+        b (float): BM25 length normalization.
+
+    Returns:
+        np.ndarray: float32 weight per posting.
+    """
+    num_docs = len(doc_lengths)
+    avgdl = float(np.mean(doc_lengths)) if num_docs else 0.0
+    lengths = np.asarray(doc_lengths, dtype=np.float32)
+    tf = np.asarray(postings_tf, dtype=np.float32)
+    length_norm = k1 * (1 - b + b * lengths / avgdl) if avgdl else np.zeros(num_docs, dtype=np.float32)
+    term_idf = np.repeat(np.asarray(idf, dtype=np.float32), np.diff(indptr))
+    return (term_idf * tf * (k1 + 1) / (tf + length_norm[postings_docs])).astype(np.float32)
+
+
+def compute_version(chunks: List[Document], ids: List[str]) -> str:
+    """
+    Compute a content hash identifying an index build.
+
+    Args:
+        chunks (List[Document]): The indexed chunks.
+        ids (List[str]): The chunk ids.
+
+    Returns:
+        str: A short hex digest of the chunk ids and contents.
+    """
+    digest = hashlib.sha256()
+    for chunk_id, chunk in zip(ids, chunks):
+        digest.update(chunk_id.encode("utf-8"))
+        digest.update(b"\0")
+        digest.update(chunk.page_content.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def write_chunks(index_dir: str, chunks: List[Document], ids: List[str]) -> None:
+    """
+    Write chunk records with byte offsets for random access.
+
+    Produces `chunks.jsonl` (id, text and metadata per line) and
+    `chunk_offsets.npy`, read back by `ChunkStore`.
+
+    Args:
+        index_dir (str): Directory to write to.
+        chunks (List[Document]): The chunks.
+        ids (List[str]): Chunk ids, aligned with `chunks`.
+    """
+    offsets = [0]
+    with open(os.path.join(index_dir, "chunks.jsonl"), "wb") as f:
+        for chunk_id, chunk in zip(ids, chunks):
+            line = json.dumps(
+                {"id": chunk_id, "page_content": chunk.page_content, "metadata": chunk.metadata},
+                ensure_ascii=False,
+                default=str
+            ).encode("utf-8") + b"\n"
+            f.write(line)
+            offsets.append(offsets[-1] + len(line))
+    np.save(os.path.join(index_dir, "chunk_offsets.npy"), np.array(offsets, dtype=np.int64))
+
+
+class ChunkStore:
+    """
+    Chunk records written next to a persisted index (`chunks.jsonl` plus byte offsets).
+
+    The file is memory-mapped and a record is decoded only when it is returned.
+    """
+
+    def __init__(self, index_dir: str, num_docs: int):
+        """
+        Open the chunk records of an index.
+
+        Args:
+            index_dir (str): Directory containing `chunks.jsonl` and `chunk_offsets.npy`.
+            num_docs (int): Number of chunks in the index.
+        """
+        self.offsets = np.load(os.path.join(index_dir, "chunk_offsets.npy"), mmap_mode="r")
+        with open(os.path.join(index_dir, "chunks.jsonl"), "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if num_docs else b""
+
+    def get(self, doc_idx: int) -> Document:
+        """
+        Decode a chunk.
+
+        Args:
+            doc_idx (int): Position of the chunk in the index.
+
+        Returns:
+            Document: The chunk with its id and metadata.
+        """
+        start, end = self.offsets[doc_idx], self.offsets[doc_idx + 1]
+        record = json.loads(self._data[start:end])
+        return Document(id=record["id"], page_content=record["page_content"], metadata=record["metadata"])
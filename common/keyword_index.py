@@ -0,0 +1,126 @@
+# common/keyword_index.py
+import os
+import json
+import shutil
+import logging
+from collections import Counter
+from typing import Dict, List, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+
+from common.index_format import (
+    KEYWORD_INDEX_FORMAT, bm25_idf, bm25_weights, compute_version, tokenize, write_chunks
+)
+
+logger = logging.getLogger(__name__)
+
+
+def build_keyword_index(
+    chunks: List[Document],
+    ids: List[str],
+    index_dir: str,
+    k1: float = 1.5,
+    b: float = 0.75,
+    epsilon: float = 0.25
+) -> str:
+    """
+    Build and persist a BM25 (Okapi) keyword index for the given chunks.
+
+    Written by `etl/indexing.py` and read by the API's `KeywordIndex`. The
+    index is written as flat files so the API can memory-map it at startup
+    instead of re-loading, re-splitting and re-tokenizing the corpus.
+    BM25 weights are query independent and computed here, so every worker
+    scores against the same page-cache-backed arrays instead of building its
+    own weight matrix:
+
+    - meta.json: format, version, BM25 parameters and corpus statistics
+    - terms.bin / term_offsets.npy: UTF-8 terms sorted by bytes, with byte
+      offsets; a term's position is its term id
+    - idf.npy: IDF per term (rank_bm25 flooring of negative IDF applied)
+    - doc_lengths.npy: token count per chunk
+    - postings_indptr.npy / postings_docs.npy / postings_weights.npy: CSR
+      term-chunk matrix of BM25 weights (term id -> chunk indices and the
+      posting's `idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))`);
+      both index arrays share one dtype so SciPy wraps them without a copy
+    - chunks.jsonl / chunk_offsets.npy: chunk id, text and metadata per line,
+      with byte offsets for random access
+
+    Args:
+        chunks (List[Document]): The chunks to index.
+        ids (List[str]): Stable chunk ids, aligned with `chunks`.
+        index_dir (str): Directory to write the index to. Replaced once fully written.
+        k1 (float): BM25 term frequency saturation.
+        b (float): BM25 length normalization.
+        epsilon (float): Floor for negative IDF, as a fraction of the mean IDF.
+
+    Returns:
+        str: The version of the written index.
+    """
+    vocab: Dict[str, int] = {}
+    doc_lengths = np.zeros(len(chunks), dtype=np.int32)
+    postings: List[List[Tuple[int, int]]] = []
+
+    for doc_idx, chunk in enumerate(chunks):
+        tokens = tokenize(chunk.page_content)
+        doc_lengths[doc_idx] = len(tokens)
+        for term, tf in Counter(tokens).items():
+            term_id = vocab.setdefault(term, len(vocab))
+            if term_id == len(postings):
+                postings.append([])
+            postings[term_id].append((doc_idx, tf))
+
+    # Term ids follow the byte order of the terms, so the API looks a term up
+    # by binary search over the memory-mapped term list
+    terms = sorted(vocab, key=lambda term: term.encode("utf-8"))
+    postings = [postings[vocab[term]] for term in terms]
+    encoded = [term.encode("utf-8") for term in terms]
+    term_offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    term_offsets[1:] = np.cumsum([len(term) for term in encoded])
+
+    num_docs = len(chunks)
+    idf = bm25_idf([len(p) for p in postings], num_docs, epsilon)
+
+    nnz = sum(len(p) for p in postings)
+    index_dtype = np.int32 if max(nnz, num_docs) < 2 ** 31 else np.int64
+    indptr = np.zeros(len(postings) + 1, dtype=index_dtype)
+    indptr[1:] = np.cumsum([len(p) for p in postings])
+    postings_docs = np.fromiter((d for p in postings for d, _ in p), dtype=index_dtype, count=nnz)
+    postings_tf = np.fromiter((tf for p in postings for _, tf in p), dtype=np.float32, count=nnz)
+    postings_weights = bm25_weights(indptr, postings_docs, postings_tf, idf, doc_lengths, k1=k1, b=b)
+    avgdl = float(doc_lengths.mean()) if num_docs else 0.0
+
+    version = compute_version(chunks, ids)
+    tmp_dir = index_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    np.save(os.path.join(tmp_dir, "idf.npy"), idf.astype(np.float32))
+    np.save(os.path.join(tmp_dir, "doc_lengths.npy"), doc_lengths)
+    np.save(os.path.join(tmp_dir, "postings_indptr.npy"), indptr)
+    np.save(os.path.join(tmp_dir, "postings_docs.npy"), postings_docs)
+    np.save(os.path.join(tmp_dir, "postings_weights.npy"), postings_weights)
+    np.save(os.path.join(tmp_dir, "term_offsets.npy"), term_offsets)
+    with open(os.path.join(tmp_dir, "terms.bin"), "wb") as f:
+        f.write(b"".join(encoded))
+
+    write_chunks(tmp_dir, chunks, ids)
+
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "format": KEYWORD_INDEX_FORMAT,
+            "version": version,
+            "k1": k1,
+            "b": b,
+            "epsilon": epsilon,
+            "num_docs": num_docs,
+            "num_terms": len(vocab),
+            "avgdl": avgdl,
+        }, f, indent=2)
+
+    if os.path.isdir(index_dir):
+        shutil.rmtree(index_dir)
+    os.replace(tmp_dir, index_dir)
+
+    logger.info(f"Keyword index {version} written to {index_dir} ({num_docs} chunks, {len(vocab)} terms)")
+    return version
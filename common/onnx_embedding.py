@@ -0,0 +1,191 @@
+# common/onnx_embedding.py
+import os
+import logging
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "rag-onnx")
+
+
+def resolve_model_files(model_name: str, model_dir: Optional[str] = None):
+    """
+    Locate the ONNX export and tokenizer of a sentence-transformers model.
+
+    Args:
+        model_name (str): Hugging Face model id, e.g. "sentence-transformers/all-MiniLM-L6-v2".
+        model_dir (Optional[str]): Local directory with `model.onnx` (or `onnx/model.onnx`)
+            and `tokenizer.json`; downloaded from the Hub when not given.
+
+    Returns:
+        tuple[str, str]: Paths of the ONNX model and of tokenizer.json.
+    """
+    if model_dir:
+        model_path = os.path.join(model_dir, "model.onnx")
+        if not os.path.exists(model_path):
+            model_path = os.path.join(model_dir, "onnx", "model.onnx")
+        return model_path, os.path.join(model_dir, "tokenizer.json")
+
+    from huggingface_hub import hf_hub_download
+    return (
+        hf_hub_download(repo_id=model_name, filename="onnx/model.onnx"),
+        hf_hub_download(repo_id=model_name, filename="tokenizer.json"),
+    )
+
+
+def quantize_model(model_path: str, model_name: str, cache_dir: str = DEFAULT_CACHE_DIR) -> str:
+    """
+    Quantize the model's weights to int8 (dynamic quantization), once.
+
+    Activations stay float and are quantized per batch at run time, so no
+    calibration data is needed. The result is cached by model name.
+
+    Args:
+        model_path (str): The float32 ONNX model.
+        model_name (str): Model id, used to name the cached file.
+        cache_dir (str): Directory for the quantized model.
+
+    Returns:
+        str: Path of the int8 model.
+    """
+    quantized_path = os.path.join(cache_dir, f"{model_name.replace('/', '--')}-int8.onnx")
+    if os.path.exists(quantized_path):
+        return quantized_path
+
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = f"{quantized_path}.{os.getpid()}.tmp"
+    quantize_dynamic(model_path, tmp_path, weight_type=QuantType.QInt8)
+    os.replace(tmp_path, quantized_path)
+    logger.info(f"Quantized {model_name} to int8 at {quantized_path}")
+    return quantized_path
+
+
+class OnnxEmbeddings(Embeddings):
+    """
+    Sentence-transformers embeddings computed with ONNX Runtime on CPU.
+
+    Reproduces the `all-MiniLM-L6-v2` pipeline (BERT, mean pooling over
+    the attention mask, L2 normalization) without PyTorch. Texts are
+    embedded in batches sorted by length, so each batch pads to similar
+    lengths. With `quantize`, the weights are int8 (dynamic quantization);
+    check the vectors against PyTorch with `benchmarks/embedding_parity.py`
+    before indexing with them.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "sentence-transformers/all-MiniLM-L6-v2",
+        quantize: bool = False,
+        threads: Optional[int] = None,
+        batch_size: int = 32,
+        max_length: int = 256,
+        model_dir: Optional[str] = None,
+        cache_dir: str = DEFAULT_CACHE_DIR
+    ):
+        """
+        Load the ONNX model and tokenizer.
+
+        Args:
+            model_name (str): Hugging Face model id.
+            quantize (bool): Run the int8 dynamically quantized model.
+            threads (Optional[int]): Intra-op threads, None for one per core.
+            batch_size (int): Texts per forward pass.
+            max_length (int): Maximum tokens per text (the model's max_seq_length).
+            model_dir (Optional[str]): Local model directory instead of the Hub.
+            cache_dir (str): Directory for the quantized model.
+        """
+        from tokenizers import Tokenizer
+
+        self.model_name = model_name
+        self.quantize = quantize
+        self.batch_size = batch_size
+        model_path, tokenizer_path = resolve_model_files(model_name, model_dir)
+        self.model_path = quantize_model(model_path, model_name, cache_dir) if quantize else model_path
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.no_padding()
+        self.pad_id = self.tokenizer.token_to_id("[PAD]") or 0
+
+        self._load_session(threads)
+        logger.info(
+            f"ONNX embeddings initialized ({model_name}, {'int8' if quantize else 'float32'}, "
+            f"{threads or 'default'} threads)"
+        )
+
+    def _load_session(self, threads: Optional[int]) -> None:
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+        output_names = [output.name for output in self.session.get_outputs()]
+        self.output_name = next(
+            (name for name in ("last_hidden_state", "token_embeddings") if name in output_names),
+            output_names[0]
+        )
+
+    def reset_after_fork(self, threads: Optional[int] = None) -> None:
+        """Recreate the inference session, whose thread pool does not survive fork()"""
+        self._load_session(threads)
+
+    def _embed_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        length = max(len(encoding.ids) for encoding in encodings)
+        input_ids = np.full((len(texts), length), self.pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(texts), length), dtype=np.int64)
+        token_type_ids = np.zeros((len(texts), length), dtype=np.int64)
+        for row, encoding in enumerate(encodings):
+            input_ids[row, :len(encoding.ids)] = encoding.ids
+            attention_mask[row, :len(encoding.ids)] = encoding.attention_mask
+            token_type_ids[row, :len(encoding.ids)] = encoding.type_ids
+
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask, "token_type_ids": token_type_ids}
+        token_embeddings = self.session.run([self.output_name], {name: inputs[name] for name in self.input_names})[0]
+
+        mask = attention_mask[:, :, None].astype(np.float32)
+        pooled = (token_embeddings * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        return pooled / np.maximum(norms, 1e-12)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed texts in batches of similar length.
+
+        Args:
+            texts (List[str]): Texts to embed.
+
+        Returns:
+            List[List[float]]: One normalized vector per text, in input order.
+        """
+        if not texts:
+            return []
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors: List[List[float]] = [None] * len(texts)
+        for start in range(0, len(order), self.batch_size):
+            batch = order[start:start + self.batch_size]
+            for i, vector in zip(batch, self._embed_batch([texts[i] for i in batch]).tolist()):
+                vectors[i] = vector
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        """
+        Embed a single query.
+
+        Args:
+            text (str): The query.
+
+        Returns:
+            List[float]: Normalized query vector.
+        """
+        return self.embed_documents([text])[0]
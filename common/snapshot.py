@@ -0,0 +1,128 @@
+# common/snapshot.py
+import os
+import time
+import shutil
+import logging
+from typing import Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+CURRENT_FILE = "CURRENT"
+KEYWORD_INDEX = "keyword_index"
+VECTOR_INDEX = "vector_index"
+STAGING_PREFIX = ".staging-"
+
+
+def read_current_snapshot(snapshots_dir: Optional[str]) -> Optional[str]:
+    """
+    Name of the snapshot published last by `etl/indexing.py`.
+
+    Args:
+        snapshots_dir (Optional[str]): Directory holding the snapshots and the `CURRENT` pointer.
+
+    Returns:
+        Optional[str]: The snapshot name, or None when nothing was published.
+    """
+    if not snapshots_dir:
+        return None
+    try:
+        with open(os.path.join(snapshots_dir, CURRENT_FILE), encoding="utf-8") as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    return name if name and os.path.isdir(os.path.join(snapshots_dir, name)) else None
+
+
+def current_snapshot_dir(snapshots_dir: str) -> Optional[str]:
+    """
+    Directory of the snapshot the API serves.
+
+    Args:
+        snapshots_dir (str): Directory holding the snapshots and the `CURRENT` pointer.
+
+    Returns:
+        Optional[str]: The snapshot directory, or None when nothing was published.
+    """
+    name = read_current_snapshot(snapshots_dir)
+    return os.path.join(snapshots_dir, name) if name else None
+
+
+def resolve_index_dirs(
+    snapshots_dir: Optional[str], keyword_index_dir: Optional[str], vector_index_dir: Optional[str]
+) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+    """
+    Index directories of the current snapshot, or the unversioned ones.
+
+    Args:
+        snapshots_dir (Optional[str]): Directory holding the published snapshots.
+        keyword_index_dir (Optional[str]): Keyword index used when no snapshot is published.
+        vector_index_dir (Optional[str]): Vector index used when no snapshot is published.
+
+    Returns:
+        Tuple[Optional[str], Optional[str], Optional[str]]: Snapshot name (None
+            for the unversioned directories), keyword and vector index directories.
+    """
+    name = read_current_snapshot(snapshots_dir)
+    if name is None:
+        return None, keyword_index_dir, vector_index_dir
+    snapshot_dir = os.path.join(snapshots_dir, name)
+    return name, os.path.join(snapshot_dir, KEYWORD_INDEX), os.path.join(snapshot_dir, VECTOR_INDEX)
+
+
+def create_staging_dir(snapshots_dir: str) -> str:
+    """
+    Create an empty directory to build the next snapshot in.
+
+    Args:
+        snapshots_dir (str): Directory holding the snapshots.
+
+    Returns:
+        str: The staging directory; pass it to `publish_snapshot` once the indexes are written.
+    """
+    os.makedirs(snapshots_dir, exist_ok=True)
+    staging_dir = os.path.join(snapshots_dir, f"{STAGING_PREFIX}{os.getpid()}")
+    shutil.rmtree(staging_dir, ignore_errors=True)
+    os.makedirs(staging_dir)
+    return staging_dir
+
+
+def publish_snapshot(staging_dir: str, snapshots_dir: str, version: str, keep: int = 3) -> str:
+    """
+    Make a fully written snapshot the one the API serves.
+
+    The staging directory is renamed to its final name, then the `CURRENT`
+    pointer is replaced atomically, so the API never sees a partially written
+    index. Snapshots are never modified after publishing: the API reloads
+    by opening the new directory while requests in flight keep reading the
+    old one. Only the `keep` most recent snapshots are kept; on POSIX systems
+    a worker still mapping a deleted snapshot keeps reading it until it lets go.
+
+    Args:
+        staging_dir (str): Directory from `create_staging_dir` holding the new indexes.
+        snapshots_dir (str): Directory holding the snapshots.
+        version (str): Content version of the keyword index, part of the snapshot name.
+        keep (int): Number of published snapshots to keep, including the new one.
+
+    Returns:
+        str: The name of the published snapshot.
+    """
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{version}"
+    os.replace(staging_dir, os.path.join(snapshots_dir, name))
+
+    tmp_path = os.path.join(snapshots_dir, f"{CURRENT_FILE}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(name)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(snapshots_dir, CURRENT_FILE))
+    logger.info(f"Published index snapshot {name}")
+
+    published = sorted(
+        entry for entry in os.listdir(snapshots_dir)
+        if not entry.startswith(STAGING_PREFIX) and os.path.isdir(os.path.join(snapshots_dir, entry))
+    )
+    for old in published[:-max(1, keep)]:
+        if old != name:
+            shutil.rmtree(os.path.join(snapshots_dir, old), ignore_errors=True)
+            logger.info(f"Removed index snapshot {old}")
+    return name
@@ -0,0 +1,7 @@
+# common/tables.py
+# PGVector tables written by the indexer and queried by the API
+EMBEDDING_TABLE = "langchain_pg_embedding"
+COLLECTION_TABLE = "langchain_pg_collection"
+
+# Generated tsvector column behind the postgres keyword backend
+TSV_COLUMN = "document_tsv"
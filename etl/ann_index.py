@@ -0,0 +1,91 @@
+import os
+import json
+import argparse
+from dotenv import load_dotenv, find_dotenv
+
+from pipeline.db import get_engine
+from pipeline.ann_index import create_ann_index, drop_ann_indexes, list_ann_indexes, recall_latency_report
+from pipeline.fulltext_index import create_fulltext_index, drop_fulltext_index
+from pipeline.utils import setup_logging
+
+load_dotenv(find_dotenv())
+
+logger = setup_logging()
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Manage ANN and full-text indexes of the PGVector collection')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    create = subparsers.add_parser('create', help='Create an HNSW or IVFFlat index')
+    create.add_argument('--method', choices=['hnsw', 'ivfflat'], default='hnsw')
+    create.add_argument('--dimension', type=int, default=384, help='Embedding dimension')
+    create.add_argument('--m', type=int, default=16, help='HNSW max connections per layer')
+    create.add_argument('--ef-construction', type=int, default=64, help='HNSW build candidate list size')
+    create.add_argument('--lists', type=int, default=None, help='IVFFlat lists (default: derived from row count)')
+    create.add_argument('--maintenance-work-mem', type=str, default=None, help="Memory for the build, e.g. '1GB'")
+    create.add_argument('--replace', action='store_true', help='Rebuild the index if it exists')
+
+    subparsers.add_parser('drop', help='Drop all managed ANN indexes')
+
+    fulltext = subparsers.add_parser('fulltext', help='Create the full-text (tsvector + GIN) index used by KEYWORD_BACKEND=postgres')
+    fulltext.add_argument(
+        '--config',
+        type=str,
+        default=os.getenv('FULLTEXT_CONFIG', 'simple'),
+        help='Text search configuration, e.g. simple or indonesian'
+    )
+    fulltext.add_argument('--replace', action='store_true', help='Rebuild the column and index if they exist')
+    fulltext.add_argument('--drop', action='store_true', help='Drop the column and index instead')
+    subparsers.add_parser('list', help='List managed ANN indexes')
+
+    report = subparsers.add_parser('report', help='Recall vs latency of the ANN index against exact search')
+    report.add_argument('--k', type=int, default=3)
+    report.add_argument('--queries', type=int, default=100, help='Number of sampled query vectors')
+    report.add_argument('--ef-search', type=str, default='10,20,40,80,160', help='Comma separated HNSW ef_search values')
+    report.add_argument('--probes', type=str, default='1,5,10,20', help='Comma separated IVFFlat probes values')
+    report.add_argument('--output', type=str, default=None, help='Write the JSON report to this file')
+    return parser
+
+def main():
+    args = create_parser().parse_args()
+    engine = get_engine()
+
+    if args.command == 'create':
+        create_ann_index(
+            engine,
+            method=args.method,
+            dimension=args.dimension,
+            m=args.m,
+            ef_construction=args.ef_construction,
+            lists=args.lists,
+            maintenance_work_mem=args.maintenance_work_mem,
+            replace=args.replace
+        )
+    elif args.command == 'drop':
+        drop_ann_indexes(engine)
+    elif args.command == 'fulltext':
+        if args.drop:
+            drop_fulltext_index(engine)
+        else:
+            create_fulltext_index(engine, config=args.config, replace=args.replace)
+    elif args.command == 'list':
+        for name in list_ann_indexes(engine):
+            print(name)
+    elif args.command == 'report':
+        report = recall_latency_report(
+            engine,
+            os.getenv('COLLECTION_NAME'),
+            k=args.k,
+            num_queries=args.queries,
+            ef_search_values=tuple(int(v) for v in args.ef_search.split(',') if v),
+            probes_values=tuple(int(v) for v in args.probes.split(',') if v)
+        )
+        output = json.dumps(report, indent=2)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                f.write(output)
+            logger.info(f"Report written to {args.output}")
+        print(output)
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,26 @@
 import os
+import argparse
 from dotenv import load_dotenv, find_dotenv
 from langchain_postgres import PGVector
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_huggingface import HuggingFaceEmbeddings
-from langchain_unstructured import UnstructuredLoader
 
-from pipeline.pipeline import process_all_pdfs
-from pipeline.constant import INPUT_DIR, OUTPUT_DIR
+from pipeline.pipeline import process_pdfs
+from pipeline.ann_index import create_ann_index
+from pipeline.fulltext_index import create_fulltext_index
+from pipeline.bulk_load import bulk_load
+from pipeline.db import get_engine
+from pipeline.constant import (
+    INPUT_DIR, OUTPUT_DIR, SNAPSHOTS_DIR, DOCUMENTS_DIR, MANIFEST_PATH, OCR_CACHE_DIR
+)
+from common.keyword_index import build_keyword_index
+from pipeline.vector_index import export_vector_index
+from common.snapshot import (
+    KEYWORD_INDEX, VECTOR_INDEX, create_staging_dir, current_snapshot_dir, publish_snapshot
+)
+from pipeline.manifest import MANIFEST_FORMAT, file_hash, load_manifest, save_manifest
 from pipeline.utils import setup_logging, save_combined_output
+from common.chunking import chunk_ids, load_document_chunks
+from common.embedding import DEFAULT_MODEL_NAME, load_embeddings
+from common.index_format import KEYWORD_INDEX_FORMAT, VECTOR_INDEX_FORMAT, is_current_format
 
 load_dotenv(find_dotenv())
 
@@ -15,50 +28,54 @@ logger = setup_logging()
 
 class DocumentIndexer:
     def __init__(self):
-        self.connection_string = (
-            f"postgresql+psycopg://"
-            f"{os.getenv('POSTGRES_USER')}:"
-            f"{os.getenv('POSTGRES_PASSWORD')}@"
-            f"{os.getenv('POSTGRES_HOST')}:"
-            f"{os.getenv('POSTGRES_PORT')}/"
-            f"{os.getenv('POSTGRES_DB')}"
-        )
+        self.engine = get_engine()
         self.collection_name = os.getenv('COLLECTION_NAME')
-        self.model_name = 'sentence-transformers/all-MiniLM-L6-v2'
+        self.model_name = DEFAULT_MODEL_NAME
+        self.ocr_batch_size = int(os.getenv('OCR_BATCH_SIZE', '1'))
+        self.ocr_workers = int(os.getenv('OCR_WORKERS', '1'))
+        self.ocr_dpi = int(os.getenv('OCR_DPI', '200'))
+        self.ocr_raster_threads = int(os.getenv('OCR_RASTER_THREADS', '1'))
+        self.ann_index_method = os.getenv('ANN_INDEX_METHOD', 'hnsw').lower()
+        self.embedding_batch_size = int(os.getenv('INDEX_EMBEDDING_BATCH_SIZE', '256'))
+        self.embedding_backend = os.getenv('EMBEDDING_BACKEND', 'torch').lower()
+        # The API's postgres keyword backend searches a full-text index on the collection
+        self.fulltext_index = os.getenv('KEYWORD_BACKEND', 'memory').lower() == 'postgres'
+        self.fulltext_config = os.getenv('FULLTEXT_CONFIG', 'simple')
+        self.vector_index_export = os.getenv('VECTOR_INDEX_EXPORT', 'true').lower() == 'true'
+        self.vector_index_quantize = os.getenv('VECTOR_INDEX_QUANTIZE', 'false').lower() == 'true'
+        self.snapshot_keep = int(os.getenv('INDEX_SNAPSHOT_KEEP', '3'))
     
 
     def create_embeddings(self):
-        """Create and return embedding pipeline."""
-        return HuggingFaceEmbeddings(
-            model_name=self.model_name,
-            model_kwargs={"device": "cpu"}
-        )
+        """Create and return embedding pipeline.
 
-    def load_documents(self, docs_path):
-        """Load documents from the specified path."""
-        loader = UnstructuredLoader(docs_path)
-        return loader.load()
-
-    def split_documents(self, documents):
-        """Split documents into chunks."""
-        text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-            chunk_size=500,
-            chunk_overlap=100,
-            separators=[
-                "\n\n",
-                "\n",
-                " ",
-                ".",
-                ",",
-                "\u200b",  # Zero-width space
-                "\uff0c",  # Fullwidth comma
-                "\u3001",  # Ideographic comma
-                "\uff0e",  # Fullwidth full stop
-                "\u3002",  # Ideographic full stop
-                "",
-            ],
-        )
-        return text_splitter.split_documents(documents)
+        Uses the same backend as the API (`EMBEDDING_BACKEND`), so chunks and
+        queries are embedded by the same model variant.
+        """
+        return load_embeddings(self.model_name, self.embedding_backend)
+
+    def document_text_path(self, source):
+        """Path of the extracted text of a source PDF."""
+        return os.path.join(DOCUMENTS_DIR, os.path.splitext(source)[0] + ".txt")
+
+    def write_document_text(self, source, pages):
+        """Write the extracted text and markdown of a source PDF."""
+        os.makedirs(DOCUMENTS_DIR, exist_ok=True)
+        base = os.path.splitext(self.document_text_path(source))[0]
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write("\n".join(page["text"] for page in pages))
+        with open(base + ".md", "w", encoding="utf-8") as f:
+            f.write("\n".join(page["markdown"] for page in pages))
+
+    def load_document_chunks(self, source):
+        """Load and split the extracted text of a source PDF.
+
+        Chunked by `common.chunking` like the API's in-memory BM25 fallback.
+        """
+        chunks = load_document_chunks(self.document_text_path(source))
+        for chunk in chunks:
+            chunk.metadata["source_document"] = source
+        return chunks
 
     def create_vector_store(self):
         """Create and return vector store instance."""
@@ -66,43 +83,229 @@ class DocumentIndexer:
             return PGVector(
                 embeddings=self.create_embeddings(),
                 collection_name=self.collection_name,
-                connection=self.connection_string,
+                connection=self.engine,
                 use_jsonb=True,
             )
         except Exception as e:
             logger.error(f"An error occurred during vector store creation: {e}")
             return None
 
-    def index_documents(self):
-        """Main indexing process."""
-        logger.info("Starting document indexing process...")
+    def build_ann_index(self):
+        """Create the configured ANN index; a no-op when it already exists or the method is 'none'."""
+        if self.ann_index_method == "none":
+            return
         try:
-            logger.info("Processing PDF documents...")
-            texts, markdowns = process_all_pdfs(INPUT_DIR)
-            logger.info("PDF documents processed successfully")
-
-            save_combined_output(texts, markdowns)
-            logger.info(f"Combined output saved successfully on {OUTPUT_DIR}")
+            create_ann_index(
+                self.engine,
+                method=self.ann_index_method,
+                m=int(os.getenv('HNSW_M', '16')),
+                ef_construction=int(os.getenv('HNSW_EF_CONSTRUCTION', '64'))
+            )
         except Exception as e:
-            logger.error(f"An error occurred during processing: {e}")
-            
-        
-        documents = self.load_documents(OUTPUT_DIR + "/combined_output.txt")
-        logger.info(f"Loaded {len(documents)} documents")
-            
-        chunks = self.split_documents(documents)
-        logger.info(f"Created {len(chunks)} chunks")
-            
+            logger.error(f"An error occurred during ANN index creation: {e}")
+
+    def sync_document(self, source, entry, pages, failed, vector_store, pending=None):
+        """Sync the chunks of a re-processed PDF to the vector store.
+
+        Args:
+            source (str): File name of the PDF in the input directory.
+            entry (dict | None): The document's manifest entry from the previous run.
+            pages (list): The OCR page records of the document.
+            failed (int): Number of pages that could not be processed.
+            vector_store (PGVector): The vector store to upsert into.
+            pending (list | None): In bulk mode, collects (id, chunk) pairs to load
+                later instead of upserting them right away.
+
+        Returns:
+            dict: The new manifest entry.
+        """
+        entry = entry or {"pages": [], "chunk_ids": []}
+        self.write_document_text(source, pages)
+
+        chunks = self.load_document_chunks(source)
+        ids = chunk_ids(source, chunks)
+        old_ids = set(entry["chunk_ids"])
+
+        new_chunks = [(chunk_id, chunk) for chunk_id, chunk in zip(ids, chunks) if chunk_id not in old_ids]
+        if pending is not None:
+            pending.extend(new_chunks)
+        elif new_chunks:
+            vector_store.add_documents([chunk for _, chunk in new_chunks], ids=[chunk_id for chunk_id, _ in new_chunks])
+        stale_ids = sorted(old_ids - set(ids))
+        if stale_ids:
+            vector_store.delete(ids=stale_ids)
+        logger.info(f"{source}: {len(new_chunks)} chunks upserted, {len(stale_ids)} deleted, {len(ids) - len(new_chunks)} unchanged")
+
+        return {
+            # Leave the hash unset when pages failed so the next run retries them
+            "file_hash": file_hash(os.path.join(INPUT_DIR, source)) if failed == 0 else None,
+            "pages": pages,
+            "chunk_ids": ids,
+        }
+
+    def index_documents(self, reprocess=False, bulk=False):
+        """Main indexing process.
+
+        Only PDFs whose content hash changed since the last run are re-processed,
+        and within them only pages whose rendered image changed are re-OCRed.
+        Chunks get stable ids, so the vector store is updated by upserting new
+        chunks and deleting stale ones instead of appending duplicates.
+
+        Args:
+            reprocess (bool): Rebuild text, markdown and chunks of every PDF from
+                the DocTags cache, e.g. after changing `clean_markdown_text`.
+                Only pages missing from the cache go through the vision model.
+            bulk (bool): Load new chunks with large embedding batches and binary
+                COPY in one transaction, dropping ANN indexes during the load and
+                rebuilding them afterwards.
+        """
+        logger.info("Starting document indexing process...")
+        manifest = load_manifest(MANIFEST_PATH, self.collection_name)
+        documents = manifest["documents"] if manifest else {}
+
+        sources = sorted(f for f in os.listdir(INPUT_DIR) if f.lower().endswith(".pdf"))
+        changed = [
+            f for f in sources
+            if reprocess or documents.get(f, {}).get("file_hash") != file_hash(os.path.join(INPUT_DIR, f))
+        ]
+        removed = [f for f in documents if f not in sources]
+
+        snapshot_dir = current_snapshot_dir(SNAPSHOTS_DIR)
+        indexes_exist = snapshot_dir is not None and is_current_format(
+            os.path.join(snapshot_dir, KEYWORD_INDEX), KEYWORD_INDEX_FORMAT
+        ) and (
+            not self.vector_index_export
+            or is_current_format(os.path.join(snapshot_dir, VECTOR_INDEX), VECTOR_INDEX_FORMAT)
+        )
+        if manifest and not changed and not removed and indexes_exist:
+            logger.info("All documents are up to date, nothing to index")
+            return True
+        logger.info(f"{len(changed)} new or changed and {len(removed)} removed documents")
+
         vector_store = self.create_vector_store()
-        vector_store.add_documents(chunks)
-        logger.info("Successfully added documents to vector store")
+        if vector_store is None:
+            return False
+        if manifest is None:
+            # Rows written without a manifest have unknown ids, start from a clean collection
+            logger.info(f"No manifest found, resetting collection {self.collection_name}")
+            vector_store.delete_collection()
+            vector_store.create_collection()
+
+        jobs = [
+            (
+                os.path.join(INPUT_DIR, source),
+                {} if reprocess else {page["hash"]: page for page in documents.get(source, {}).get("pages", [])}
+            )
+            for source in changed
+        ]
+        pending = [] if bulk else None
+        for pdf_path, pages, failed in process_pdfs(
+            jobs, self.ocr_batch_size, self.ocr_workers, self.ocr_dpi, self.ocr_raster_threads, OCR_CACHE_DIR
+        ):
+            source = os.path.basename(pdf_path)
+            try:
+                documents[source] = self.sync_document(source, documents.get(source), pages, failed, vector_store, pending)
+            except Exception as e:
+                logger.error(f"An error occurred while indexing {source}: {e}")
+
+        if pending:
+            # The ANN indexes are dropped inside the load's transaction, so a
+            # failed load leaves them in place; without a configured method
+            # nothing would rebuild them, so they are kept
+            try:
+                bulk_load(
+                    self.engine,
+                    self.collection_name,
+                    vector_store.embeddings,
+                    [chunk for _, chunk in pending],
+                    [chunk_id for chunk_id, _ in pending],
+                    batch_size=self.embedding_batch_size,
+                    drop_ann_indexes=self.ann_index_method != "none"
+                )
+            except Exception as e:
+                logger.error(f"An error occurred during bulk load: {e}")
+                return False
+            self.build_ann_index()
+
+        for source in removed:
+            vector_store.delete(ids=documents[source]["chunk_ids"])
+            for ext in (".txt", ".md"):
+                path = os.path.splitext(self.document_text_path(source))[0] + ext
+                if os.path.exists(path):
+                    os.remove(path)
+            del documents[source]
+            logger.info(f"{source}: removed from the index")
+
+        indexed = [source for source in sources if source in documents]
+        texts, markdowns = [], []
+        for source in indexed:
+            pages = documents[source]["pages"]
+            if not os.path.exists(self.document_text_path(source)):
+                self.write_document_text(source, pages)
+            texts.append("\n".join(page["text"] for page in pages))
+            markdowns.append("\n".join(page["markdown"] for page in pages))
+        save_combined_output(texts, markdowns)
+        logger.info(f"Combined output saved successfully on {OUTPUT_DIR}")
+
+        chunks, ids = [], []
+        for source in indexed:
+            source_chunks = self.load_document_chunks(source)
+            chunks.extend(source_chunks)
+            ids.extend(chunk_ids(source, source_chunks))
+        # Indexes are built into a new snapshot; a running API swaps it in
+        # once it is published, without a restart
+        staging_dir = create_staging_dir(SNAPSHOTS_DIR)
+        version = build_keyword_index(chunks, ids, os.path.join(staging_dir, KEYWORD_INDEX))
+
+        if self.vector_index_export:
+            try:
+                export_vector_index(
+                    self.engine,
+                    self.collection_name,
+                    chunks,
+                    ids,
+                    os.path.join(staging_dir, VECTOR_INDEX),
+                    quantize=self.vector_index_quantize
+                )
+            except Exception as e:
+                logger.error(f"An error occurred during vector index export: {e}")
+
+        publish_snapshot(staging_dir, SNAPSHOTS_DIR, version, keep=self.snapshot_keep)
+
+        save_manifest(
+            {"format": MANIFEST_FORMAT, "collection": self.collection_name, "documents": documents},
+            MANIFEST_PATH
+        )
+
+        self.build_ann_index()
+        if self.fulltext_index:
+            try:
+                create_fulltext_index(self.engine, config=self.fulltext_config)
+            except Exception as e:
+                logger.error(f"An error occurred during full-text index creation: {e}")
+        logger.info("Successfully synced documents to vector store")
         
         return True
             
 
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description='Index SOP documents into the vector store')
+    parser.add_argument(
+        '--reprocess',
+        action='store_true',
+        help='Rebuild text and chunks of every document from the OCR cache'
+    )
+    parser.add_argument(
+        '--bulk',
+        action='store_true',
+        help='Load chunks with batched embedding and binary COPY, rebuilding ANN indexes afterwards'
+    )
+    return parser
+
 def main():
+    args = create_parser().parse_args()
     indexer = DocumentIndexer()
-    success = indexer.index_documents()
+    success = indexer.index_documents(reprocess=args.reprocess, bulk=args.bulk)
     
     if success:
         logger.info("Indexing completed successfully!")
@@ -0,0 +1,301 @@
+import re
+import time
+import statistics
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from common.tables import COLLECTION_TABLE, EMBEDDING_TABLE
+from pipeline.utils import setup_logging
+
+logger = setup_logging()
+
+INDEX_PREFIX = f"ix_{EMBEDDING_TABLE}_embedding"
+OPERATOR_CLASSES = {
+    "cosine": "vector_cosine_ops",
+    "l2": "vector_l2_ops",
+    "ip": "vector_ip_ops",
+}
+DISTANCE_OPERATORS = {
+    "cosine": "<=>",
+    "l2": "<->",
+    "ip": "<#>",
+}
+
+
+def index_name(method: str, distance: str = "cosine") -> str:
+    """Name of the ANN index for a method and distance.
+
+    Args:
+        method (str): Index method ('hnsw' or 'ivfflat').
+        distance (str): Distance the index is built for.
+
+    Returns:
+        str: The index name.
+    """
+    return f"{INDEX_PREFIX}_{method}_{distance}"
+
+
+def get_collection_uuid(engine: Engine, collection_name: str) -> str:
+    """Look up the uuid of a PGVector collection.
+
+    Args:
+        engine (Engine): Database engine.
+        collection_name (str): Name of the collection.
+
+    Returns:
+        str: The collection uuid.
+
+    Raises:
+        ValueError: If the collection does not exist.
+    """
+    with engine.connect() as conn:
+        uuid = conn.execute(
+            text(f"SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :name"),
+            {"name": collection_name}
+        ).scalar()
+    if uuid is None:
+        raise ValueError(f"Collection not found: {collection_name}")
+    return str(uuid)
+
+
+def ensure_vector_dimension(engine: Engine, dimension: int) -> None:
+    """Give the embedding column a fixed dimension, which ANN indexes require.
+
+    PGVector creates `embedding` as an undimensioned `vector` unless an
+    `embedding_length` is passed. All collections in the table must use
+    vectors of `dimension` for the conversion to succeed.
+
+    Args:
+        engine (Engine): Database engine.
+        dimension (int): Embedding dimension.
+
+    Returns:
+        None
+    """
+    with engine.begin() as conn:
+        current = conn.execute(text(
+            "SELECT atttypmod FROM pg_attribute "
+            f"WHERE attrelid = '{EMBEDDING_TABLE}'::regclass AND attname = 'embedding'"
+        )).scalar()
+        if current == dimension:
+            return
+        logger.info(f"Converting {EMBEDDING_TABLE}.embedding to vector({dimension})")
+        conn.execute(text(
+            f"ALTER TABLE {EMBEDDING_TABLE} ALTER COLUMN embedding TYPE vector({dimension})"
+        ))
+
+
+def list_ann_indexes(engine: Engine) -> list[str]:
+    """List the ANN indexes managed on the embedding table.
+
+    Args:
+        engine (Engine): Database engine.
+
+    Returns:
+        list[str]: Names of existing managed indexes.
+    """
+    with engine.connect() as conn:
+        rows = conn.execute(
+            text("SELECT indexname FROM pg_indexes WHERE tablename = :table AND indexname LIKE :prefix"),
+            {"table": EMBEDDING_TABLE, "prefix": f"{INDEX_PREFIX}_%"}
+        ).scalars().all()
+    return list(rows)
+
+
+def drop_ann_indexes(engine: Engine) -> None:
+    """Drop every managed ANN index, e.g. before a bulk load.
+
+    Args:
+        engine (Engine): Database engine.
+
+    Returns:
+        None
+    """
+    for name in list_ann_indexes(engine):
+        with engine.begin() as conn:
+            conn.execute(text(f'DROP INDEX IF EXISTS "{name}"'))
+        logger.info(f"Dropped ANN index {name}")
+
+
+def default_ivfflat_lists(num_rows: int) -> int:
+    """pgvector's rule of thumb: rows / 1000 up to 1M rows, sqrt(rows) above."""
+    if num_rows <= 1_000_000:
+        return max(1, num_rows // 1000)
+    return int(num_rows ** 0.5)
+
+
+def create_ann_index(
+    engine: Engine,
+    method: str = "hnsw",
+    distance: str = "cosine",
+    dimension: int = 384,
+    m: int = 16,
+    ef_construction: int = 64,
+    lists: int | None = None,
+    maintenance_work_mem: str | None = None,
+    replace: bool = False
+) -> str:
+    """Create an HNSW or IVFFlat index on the embedding column.
+
+    Build the index after bulk loading: inserting into an existing index is
+    much slower than building it once, and IVFFlat needs data to pick its
+    centroids from.
+
+    Args:
+        engine (Engine): Database engine.
+        method (str): 'hnsw' or 'ivfflat'.
+        distance (str): 'cosine', 'l2' or 'ip'; must match the store's distance strategy.
+        dimension (int): Embedding dimension.
+        m (int): HNSW max connections per layer.
+        ef_construction (int): HNSW candidate list size during build.
+        lists (int | None): IVFFlat list count; derived from the row count if None.
+        maintenance_work_mem (str | None): Memory for the build, e.g. '1GB'.
+        replace (bool): Drop and rebuild the index if it already exists.
+
+    Returns:
+        str: The index name.
+    """
+    if method not in ("hnsw", "ivfflat"):
+        raise ValueError(f"Unsupported ANN index method: {method}")
+    if distance not in OPERATOR_CLASSES:
+        raise ValueError(f"Unsupported distance: {distance}")
+
+    ensure_vector_dimension(engine, dimension)
+    name = index_name(method, distance)
+    if name in list_ann_indexes(engine):
+        if not replace:
+            logger.info(f"ANN index {name} already exists")
+            return name
+        with engine.begin() as conn:
+            conn.execute(text(f'DROP INDEX "{name}"'))
+
+    if method == "hnsw":
+        options = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+    else:
+        if lists is None:
+            with engine.connect() as conn:
+                num_rows = conn.execute(text(f"SELECT count(*) FROM {EMBEDDING_TABLE}")).scalar()
+            lists = default_ivfflat_lists(num_rows)
+        options = f"lists = {int(lists)}"
+
+    start = time.time()
+    with engine.begin() as conn:
+        if maintenance_work_mem:
+            if not re.fullmatch(r"\d+\s*(kB|MB|GB)", maintenance_work_mem):
+                raise ValueError(f"Invalid maintenance_work_mem: {maintenance_work_mem}")
+            conn.execute(text(f"SET LOCAL maintenance_work_mem = '{maintenance_work_mem}'"))
+        conn.execute(text(
+            f'CREATE INDEX "{name}" ON {EMBEDDING_TABLE} '
+            f"USING {method} (embedding {OPERATOR_CLASSES[distance]}) WITH ({options})"
+        ))
+        conn.execute(text(f"ANALYZE {EMBEDDING_TABLE}"))
+    logger.info(f"Created ANN index {name} ({options}) in {time.time() - start:.1f} s")
+    return name
+
+
+def _search(conn, collection_uuid: str, vector: str, k: int, distance: str) -> tuple[list[str], float]:
+    start = time.perf_counter()
+    ids = conn.execute(
+        text(
+            f"SELECT id FROM {EMBEDDING_TABLE} WHERE collection_id = :cid "
+            f"ORDER BY embedding {DISTANCE_OPERATORS[distance]} CAST(:q AS vector) LIMIT :k"
+        ),
+        {"cid": collection_uuid, "q": vector, "k": k}
+    ).scalars().all()
+    return list(ids), (time.perf_counter() - start) * 1000
+
+
+def _percentile(values: list[float], q: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))]
+
+
+def recall_latency_report(
+    engine: Engine,
+    collection_name: str,
+    k: int = 3,
+    num_queries: int = 100,
+    ef_search_values: tuple[int, ...] = (10, 20, 40, 80, 160),
+    probes_values: tuple[int, ...] = (1, 5, 10, 20),
+    distance: str = "cosine"
+) -> dict:
+    """Measure recall@k and latency of ANN search against exact search.
+
+    Query vectors are sampled from the stored embeddings of the collection.
+    Exact results are computed with index scans disabled; each ANN setting is
+    then evaluated with `hnsw.ef_search` or `ivfflat.probes` set per query.
+
+    Args:
+        engine (Engine): Database engine.
+        collection_name (str): Name of the collection.
+        k (int): Number of neighbours per query.
+        num_queries (int): Number of sampled query vectors.
+        ef_search_values (tuple): HNSW `ef_search` settings to evaluate.
+        probes_values (tuple): IVFFlat `probes` settings to evaluate.
+        distance (str): Distance used by the index.
+
+    Returns:
+        dict: Exact-search latency and, per index setting, recall and latency percentiles.
+    """
+    collection_uuid = get_collection_uuid(engine, collection_name)
+    indexes = list_ann_indexes(engine)
+
+    with engine.connect() as conn:
+        queries = conn.execute(
+            text(
+                f"SELECT embedding::text FROM {EMBEDDING_TABLE} "
+                "WHERE collection_id = :cid ORDER BY random() LIMIT :n"
+            ),
+            {"cid": collection_uuid, "n": num_queries}
+        ).scalars().all()
+
+    def run(settings: dict[str, str]) -> tuple[list[list[str]], list[float]]:
+        results, latencies = [], []
+        with engine.connect() as conn:
+            for vector in queries:
+                with conn.begin():
+                    for name, value in settings.items():
+                        conn.execute(text(f"SET LOCAL {name} = {value}"))
+                    ids, latency = _search(conn, collection_uuid, vector, k, distance)
+                results.append(ids)
+                latencies.append(latency)
+        return results, latencies
+
+    def summarize(latencies: list[float]) -> dict:
+        return {
+            "p50_ms": round(statistics.median(latencies), 3),
+            "p95_ms": round(_percentile(latencies, 0.95), 3),
+            "p99_ms": round(_percentile(latencies, 0.99), 3),
+        }
+
+    exact, exact_latencies = run({"enable_indexscan": "off"})
+    report = {
+        "collection": collection_name,
+        "k": k,
+        "num_queries": len(queries),
+        "indexes": indexes,
+        "exact": summarize(exact_latencies) if queries else {},
+        "settings": [],
+    }
+
+    sweeps = []
+    if any("_hnsw_" in name for name in indexes):
+        sweeps += [("hnsw.ef_search", value) for value in ef_search_values]
+    if any("_ivfflat_" in name for name in indexes):
+        sweeps += [("ivfflat.probes", value) for value in probes_values]
+
+    for name, value in sweeps:
+        approx, latencies = run({name: str(int(value))})
+        recalls = [
+            len(set(a) & set(e)) / len(e) if e else 1.0
+            for a, e in zip(approx, exact)
+        ]
+        report["settings"].append({
+            "parameter": name,
+            "value": value,
+            "recall": round(sum(recalls) / len(recalls), 4) if recalls else None,
+            **(summarize(latencies) if latencies else {}),
+        })
+
+    return report
@@ -0,0 +1,128 @@
+import time
+import uuid
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from pgvector.psycopg import register_vector
+from psycopg.types.json import Jsonb
+from sqlalchemy.engine import Engine
+
+from common.tables import COLLECTION_TABLE, EMBEDDING_TABLE
+from pipeline.ann_index import INDEX_PREFIX
+from pipeline.utils import setup_logging
+
+logger = setup_logging()
+
+
+def embed_in_batches(embeddings: Embeddings, texts: list[str], batch_size: int = 256) -> np.ndarray:
+    """Embed texts in large batches.
+
+    Args:
+        embeddings (Embeddings): The embedding model.
+        texts (list[str]): The texts to embed.
+        batch_size (int): Number of texts per `embed_documents` call.
+
+    Returns:
+        np.ndarray: float32 matrix with one row per text.
+    """
+    vectors = []
+    start = time.time()
+    for i in range(0, len(texts), batch_size):
+        vectors.append(np.asarray(embeddings.embed_documents(texts[i:i + batch_size]), dtype=np.float32))
+        logger.info(f"Embedded {min(i + batch_size, len(texts))}/{len(texts)} chunks")
+    if not vectors:
+        return np.zeros((0, 0), dtype=np.float32)
+    matrix = np.vstack(vectors)
+    elapsed = time.time() - start
+    logger.info(f"Embedded {len(texts)} chunks in {elapsed:.1f} s ({len(texts) / max(elapsed, 1e-9):.0f}/s)")
+    return matrix
+
+
+def bulk_load(
+    engine: Engine,
+    collection_name: str,
+    embeddings: Embeddings,
+    chunks: list[Document],
+    ids: list[str],
+    batch_size: int = 256,
+    drop_ann_indexes: bool = False
+) -> int:
+    """Embed chunks and upsert them into the collection with binary COPY.
+
+    Rows are streamed with `COPY ... FROM STDIN (FORMAT BINARY)` into a
+    temporary staging table and merged into `langchain_pg_embedding` with a
+    single `INSERT ... ON CONFLICT (id) DO UPDATE`, all in one transaction.
+    Build ANN indexes after the load rather than before it.
+
+    With `drop_ann_indexes`, the managed ANN indexes are dropped in the same
+    transaction, after the staged COPY and right before the merge. If any
+    step fails, the drop is rolled back with the rest and the indexes stay
+    in place; on success the caller must rebuild them.
+
+    Args:
+        engine (Engine): Database engine.
+        collection_name (str): Name of the PGVector collection; must already exist.
+        embeddings (Embeddings): The embedding model.
+        chunks (list[Document]): The chunks to load.
+        ids (list[str]): Stable chunk ids, aligned with `chunks`.
+        batch_size (int): Number of texts per embedding call.
+        drop_ann_indexes (bool): Drop the managed ANN indexes before the merge
+            so it does not update them row by row.
+
+    Returns:
+        int: Number of rows loaded.
+    """
+    if not chunks:
+        return 0
+
+    vectors = embed_in_batches(embeddings, [chunk.page_content for chunk in chunks], batch_size)
+
+    start = time.time()
+    raw_connection = engine.raw_connection()
+    try:
+        conn = raw_connection.driver_connection
+        register_vector(conn)
+        with conn.transaction():
+            with conn.cursor() as cur:
+                cur.execute(f"SELECT uuid FROM {COLLECTION_TABLE} WHERE name = %s", (collection_name,))
+                row = cur.fetchone()
+                if row is None:
+                    raise ValueError(f"Collection not found: {collection_name}")
+                collection_uuid = row[0] if isinstance(row[0], uuid.UUID) else uuid.UUID(str(row[0]))
+
+                cur.execute(
+                    "CREATE TEMP TABLE bulk_embedding "
+                    "(id varchar, collection_id uuid, embedding vector, document varchar, cmetadata jsonb) "
+                    "ON COMMIT DROP"
+                )
+                with cur.copy(
+                    "COPY bulk_embedding (id, collection_id, embedding, document, cmetadata) "
+                    "FROM STDIN WITH (FORMAT BINARY)"
+                ) as copy:
+                    copy.set_types(["varchar", "uuid", "vector", "varchar", "jsonb"])
+                    for chunk_id, chunk, vector in zip(ids, chunks, vectors):
+                        copy.write_row((chunk_id, collection_uuid, vector, chunk.page_content, Jsonb(chunk.metadata)))
+
+                if drop_ann_indexes:
+                    cur.execute(
+                        "SELECT indexname FROM pg_indexes WHERE tablename = %s AND indexname LIKE %s",
+                        (EMBEDDING_TABLE, f"{INDEX_PREFIX}_%")
+                    )
+                    for (name,) in cur.fetchall():
+                        cur.execute(f'DROP INDEX IF EXISTS "{name}"')
+                        logger.info(f"Dropped ANN index {name} for the merge")
+
+                cur.execute(
+                    f"INSERT INTO {EMBEDDING_TABLE} (id, collection_id, embedding, document, cmetadata) "
+                    "SELECT id, collection_id, embedding, document, cmetadata FROM bulk_embedding "
+                    "ON CONFLICT (id) DO UPDATE SET "
+                    "collection_id = EXCLUDED.collection_id, embedding = EXCLUDED.embedding, "
+                    "document = EXCLUDED.document, cmetadata = EXCLUDED.cmetadata"
+                )
+        raw_connection.commit()
+    finally:
+        raw_connection.close()
+
+    logger.info(f"Loaded {len(chunks)} rows with COPY in {time.time() - start:.1f} s")
+    return len(chunks)
@@ -4,4 +4,9 @@ MODEL_NAME = "ds4sd/SmolDocling-256M-preview"
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 INPUT_DIR = os.path.join(PROJECT_ROOT, "docs")
 OUTPUT_DIR = os.path.join(PROJECT_ROOT, "output")
+# Versioned keyword + vector indexes, see common/snapshot.py
+SNAPSHOTS_DIR = os.path.join(OUTPUT_DIR, "snapshots")
+DOCUMENTS_DIR = os.path.join(OUTPUT_DIR, "documents")
+MANIFEST_PATH = os.path.join(OUTPUT_DIR, "index_manifest.json")
+OCR_CACHE_DIR = os.path.join(OUTPUT_DIR, "ocr_cache")
 SEPARATOR = "\n\n"
@@ -0,0 +1,20 @@
+import os
+from functools import lru_cache
+
+from sqlalchemy.engine import Engine
+
+from common.db import create_pooled_engine
+
+
+@lru_cache(maxsize=None)
+def get_engine() -> Engine:
+    """Get the process-wide pooled engine.
+
+    Indexing runs long statements (bulk loads, index builds), so its
+    timeout comes from `INDEX_STATEMENT_TIMEOUT_MS` (0, disabled, by default)
+    instead of the API's `DB_STATEMENT_TIMEOUT_MS`.
+
+    Returns:
+        Engine: The shared engine.
+    """
+    return create_pooled_engine(int(os.getenv("INDEX_STATEMENT_TIMEOUT_MS", "0")))
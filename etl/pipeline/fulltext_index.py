@@ -0,0 +1,88 @@
+import re
+import time
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+
+from common.tables import EMBEDDING_TABLE, TSV_COLUMN
+from pipeline.utils import setup_logging
+
+logger = setup_logging()
+
+FULLTEXT_INDEX_NAME = f"ix_{EMBEDDING_TABLE}_{TSV_COLUMN}"
+
+
+def fulltext_column_exists(engine: Engine) -> bool:
+    """Whether the embedding table has the full-text column.
+
+    Args:
+        engine (Engine): Database engine.
+
+    Returns:
+        bool: True if `document_tsv` exists.
+    """
+    with engine.connect() as conn:
+        return conn.execute(
+            text(
+                "SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = :table AND column_name = :column"
+            ),
+            {"table": EMBEDDING_TABLE, "column": TSV_COLUMN}
+        ).scalar() is not None
+
+
+def drop_fulltext_index(engine: Engine) -> None:
+    """Drop the full-text column and its GIN index.
+
+    Args:
+        engine (Engine): Database engine.
+
+    Returns:
+        None
+    """
+    with engine.begin() as conn:
+        conn.execute(text(f'DROP INDEX IF EXISTS "{FULLTEXT_INDEX_NAME}"'))
+        conn.execute(text(f"ALTER TABLE {EMBEDDING_TABLE} DROP COLUMN IF EXISTS {TSV_COLUMN}"))
+    logger.info(f"Dropped full-text index {FULLTEXT_INDEX_NAME}")
+
+
+def create_fulltext_index(engine: Engine, config: str = "simple", replace: bool = False) -> str:
+    """Add a stored `tsvector` column of each chunk and a GIN index on it.
+
+    The column is generated from `document`, so rows written later by
+    `PGVector.add_documents` or the bulk COPY get their vector without any
+    change to the loaders. The API's `postgres` keyword backend and SQL
+    hybrid fusion query this column; both must use the same `config`.
+    Adding the column rewrites the table once.
+
+    Args:
+        engine (Engine): Database engine.
+        config (str): Text search configuration, e.g. 'simple' (no stemming,
+            like the BM25 tokenizer) or 'indonesian'.
+        replace (bool): Drop and rebuild the column and index if they exist,
+            e.g. after changing `config`.
+
+    Returns:
+        str: The index name.
+    """
+    if not re.fullmatch(r"[a-z_]+", config):
+        raise ValueError(f"Invalid text search configuration: {config}")
+
+    if fulltext_column_exists(engine):
+        if not replace:
+            logger.info(f"Full-text index {FULLTEXT_INDEX_NAME} already exists")
+            return FULLTEXT_INDEX_NAME
+        drop_fulltext_index(engine)
+
+    start = time.time()
+    with engine.begin() as conn:
+        conn.execute(text(
+            f"ALTER TABLE {EMBEDDING_TABLE} ADD COLUMN {TSV_COLUMN} tsvector "
+            f"GENERATED ALWAYS AS (to_tsvector('{config}'::regconfig, coalesce(document, ''))) STORED"
+        ))
+        conn.execute(text(
+            f'CREATE INDEX "{FULLTEXT_INDEX_NAME}" ON {EMBEDDING_TABLE} USING gin ({TSV_COLUMN})'
+        ))
+        conn.execute(text(f"ANALYZE {EMBEDDING_TABLE}"))
+    logger.info(f"Created full-text index {FULLTEXT_INDEX_NAME} ({config}) in {time.time() - start:.1f} s")
+    return FULLTEXT_INDEX_NAME
@@ -0,0 +1,66 @@
+import os
+import json
+import hashlib
+
+from pipeline.utils import setup_logging
+
+logger = setup_logging()
+
+MANIFEST_FORMAT = 1
+
+
+def file_hash(path: str) -> str:
+    """Compute the SHA-256 of a file's content.
+
+    Args:
+        path (str): Path to the file.
+
+    Returns:
+        str: Hex digest of the file content.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_manifest(path: str, collection_name: str) -> dict | None:
+    """Load the indexing manifest recorded by the previous run.
+
+    The manifest maps each indexed PDF to its content hash, per-page hashes
+    and OCR output, and the ids of the chunks stored in the vector store.
+
+    Args:
+        path (str): Path to the manifest file.
+        collection_name (str): Collection the manifest must belong to.
+
+    Returns:
+        dict | None: The manifest, or None if it is missing or belongs to another
+            collection or format.
+    """
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("format") != MANIFEST_FORMAT or manifest.get("collection") != collection_name:
+        logger.warning(f"Ignoring manifest {path} from another collection or format")
+        return None
+    return manifest
+
+
+def save_manifest(manifest: dict, path: str) -> None:
+    """Write the manifest atomically.
+
+    Args:
+        manifest (dict): The manifest to write.
+        path (str): Path to the manifest file.
+
+    Returns:
+        None
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(tmp_path, path)
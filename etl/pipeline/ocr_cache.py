@@ -0,0 +1,61 @@
+import os
+import hashlib
+
+from pipeline.constant import MODEL_NAME
+
+
+class OCRCache:
+    """Persistent cache of raw DocTags per rendered page.
+
+    Entries are keyed by the page image hash and the OCR model name, so the
+    cleaning, markdown export and chunking steps can be re-run without the
+    vision model, and a model change never serves stale output. Each entry is
+    a small file written atomically, which makes the cache safe to share
+    between OCR worker processes.
+    """
+
+    def __init__(self, cache_dir: str, model_name: str = MODEL_NAME):
+        """Initialize the cache.
+
+        Args:
+            cache_dir (str): Root directory of the cache.
+            model_name (str): Name of the model that produced the DocTags.
+        """
+        self.model_name = model_name
+        self.cache_dir = os.path.join(cache_dir, model_name.replace("/", "__"))
+
+    def _path(self, page_hash: str) -> str:
+        key = hashlib.sha256(f"{self.model_name}\0{page_hash}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, key[:2], key + ".doctags")
+
+    def get(self, page_hash: str) -> str | None:
+        """Return the cached DocTags of a page.
+
+        Args:
+            page_hash (str): Hash of the rendered page image.
+
+        Returns:
+            str | None: The DocTags, or None if the page is not cached.
+        """
+        path = self._path(page_hash)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+
+    def put(self, page_hash: str, doctags: str) -> None:
+        """Store the DocTags of a page.
+
+        Args:
+            page_hash (str): Hash of the rendered page image.
+            doctags (str): The DocTags generated for the page.
+
+        Returns:
+            None
+        """
+        path = self._path(page_hash)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(doctags)
+        os.replace(tmp_path, path)
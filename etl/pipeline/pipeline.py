@@ -1,13 +1,19 @@
 import os
 import time
+import hashlib
+import tempfile
 import torch
-from pdf2image import convert_from_path
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from typing import Callable, Iterator
+from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
 from transformers import AutoProcessor, AutoModelForVision2Seq
 from docling_core.types.doc import DoclingDocument
 from docling_core.types.doc.document import DocTagsDocument
 
 from pipeline.constant import MODEL_NAME
+from pipeline.ocr_cache import OCRCache
 from pipeline.utils import (
     clean_markdown_text,
     get_compute_capability,
@@ -38,27 +44,50 @@ def load_model_and_processor(device: str) -> tuple[AutoProcessor, AutoModelForVi
         torch_dtype=torch.bfloat16 if device == "cuda" else torch.float32,
         _attn_implementation="flash_attention_2" if device == "cuda" and get_compute_capability() >= 8 else "eager",
     ).to(device)
+    # Batched generation with a decoder-only model needs left padding
+    processor.tokenizer.padding_side = "left"
     return processor, model
 
-def process_image(
-    image: Image.Image,
+def doctags_to_outputs(doctags: str, image: Image.Image) -> tuple[str, str]:
+    """
+    Convert the DocTags of a page into cleaned text and markdown.
+
+    Args:
+        doctags (str): DocTags generated for the page
+        image (Image.Image): The page image
+
+    Returns:
+        tuple: A tuple containing:
+            - text_clean (str): The cleaned extracted text
+            - markdown (str): The markdown formatted text
+    """
+    doc_tags_doc = DocTagsDocument.from_doctags_and_image_pairs([doctags], [image])
+    doc = DoclingDocument(name="Document")
+    doc.load_from_doctags(doc_tags_doc)
+    markdown = doc.export_to_markdown()
+
+    text_clean = clean_markdown_text(doctags)
+
+    return text_clean, markdown
+
+def generate_doctags(
+    images: list[Image.Image],
     processor: AutoProcessor,
     model: AutoModelForVision2Seq,
     device: str
-) -> tuple[str, str, float]:
+) -> tuple[list[str], float]:
     """
-    Process a single image through the OCR pipeline.
+    Generate DocTags for several page images in a single `generate` call.
 
     Args:
-        image (Image.Image): The input image to process
+        images (list[Image.Image]): The page images to process
         processor (AutoProcessor): The loaded processor
         model (AutoModelForVision2Seq): The loaded model
         device (str): The device to run inference on
 
     Returns:
         tuple: A tuple containing:
-            - text_clean (str): The cleaned extracted text
-            - markdown (str): The markdown formatted text
+            - doctags (list): DocTags per image, in input order
             - generation_time (float): Time taken for generation in seconds
     """
     messages = [
@@ -70,7 +99,12 @@ def process_image(
         }
     ]
     prompt = processor.apply_chat_template(messages, add_generation_prompt=True)
-    inputs = processor(text=prompt, images=[image], return_tensors="pt").to(device)
+    inputs = processor(
+        text=[prompt] * len(images),
+        images=[[image] for image in images],
+        padding=True,
+        return_tensors="pt"
+    ).to(device)
 
     start_time = time.time()
     generated_ids = model.generate(**inputs, max_new_tokens=8192)
@@ -78,92 +112,265 @@ def process_image(
 
     prompt_length = inputs.input_ids.shape[1]
     trimmed_generated_ids = generated_ids[:, prompt_length:]
-    doctags = processor.batch_decode(
+    decoded = processor.batch_decode(
         trimmed_generated_ids, 
         skip_special_tokens=False
-    )[0].replace("<end_of_utterance>", "").strip()
+    )
+    pad_token = processor.tokenizer.pad_token
+    doctags = []
+    for text in decoded:
+        text = text.replace("<end_of_utterance>", "")
+        if pad_token:
+            text = text.replace(pad_token, "")
+        doctags.append(text.strip())
 
-    doc_tags_doc = DocTagsDocument.from_doctags_and_image_pairs([doctags], [image])
-    doc = DoclingDocument(name="Document")
-    doc.load_from_doctags(doc_tags_doc)
-    markdown = doc.export_to_markdown()
+    return doctags, generation_time
 
-    text_clean = clean_markdown_text(doctags)
+def iter_pdf_pages(
+    pdf_path: str,
+    dpi: int = 200,
+    thread_count: int = 1,
+    pages_per_chunk: int = 1
+) -> Iterator[Image.Image]:
+    """
+    Rasterize a PDF lazily, a few pages at a time.
+
+    Pages are rendered `pages_per_chunk` at a time into a temporary directory
+    and opened from disk, so only the current chunk is held in memory instead
+    of every page of the document. Rendered files are deleted once the caller
+    has moved past their chunk; callers close each image when done with it.
+
+    Args:
+        pdf_path (str): Path to the PDF file
+        dpi (int): Rendering resolution
+        thread_count (int): Number of pdftoppm threads per chunk
+        pages_per_chunk (int): Number of pages rendered per pdftoppm call
+
+    Yields:
+        Image.Image: One page image at a time, in page order
+    """
+    page_count = pdfinfo_from_path(pdf_path)["Pages"]
+    with tempfile.TemporaryDirectory(prefix="pdf_pages_") as tmp_dir:
+        for first_page in range(1, page_count + 1, pages_per_chunk):
+            last_page = min(first_page + pages_per_chunk - 1, page_count)
+            images = convert_from_path(
+                pdf_path,
+                dpi=dpi,
+                first_page=first_page,
+                last_page=last_page,
+                thread_count=thread_count,
+                output_folder=tmp_dir
+            )
+            try:
+                for image in images:
+                    image.load()
+                    yield image
+            finally:
+                for image in images:
+                    if getattr(image, "filename", None) and os.path.exists(image.filename):
+                        os.remove(image.filename)
+
+def hash_image(image: Image.Image) -> str:
+    """
+    Hash the rendered pixels of a page.
+
+    Args:
+        image (Image.Image): The rendered page
+
+    Returns:
+        str: Hex digest identifying the page content
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{image.mode}:{image.size}".encode("utf-8"))
+    digest.update(image.tobytes())
+    return digest.hexdigest()
 
-    return text_clean, markdown, generation_time
+def lazy_model_loader() -> Callable[[], tuple[AutoProcessor, AutoModelForVision2Seq, str]]:
+    """
+    Create a loader that loads the OCR model and processor on first use only.
+
+    Returns:
+        Callable: A function returning (processor, model, device)
+    """
+    loaded = {}
 
-def process_pdf(
+    def load():
+        if not loaded:
+            device = get_device()
+            processor, model = load_model_and_processor(device)
+            loaded["value"] = (processor, model, device)
+        return loaded["value"]
+
+    return load
+
+def process_pdf_pages(
     pdf_path: str,
-    processor: AutoProcessor,
-    model: AutoModelForVision2Seq,
-    device: str
-) -> tuple[str, str]:
+    model_loader: Callable[[], tuple[AutoProcessor, AutoModelForVision2Seq, str]],
+    known_pages: dict | None = None,
+    batch_size: int = 1,
+    dpi: int = 200,
+    raster_threads: int = 1,
+    cache_dir: str | None = None
+) -> tuple[list[dict], int]:
     """
-    Process a single PDF file and extract text from all its pages.
+    Process a PDF page by page, re-using OCR output of unchanged pages.
+
+    Pages are rasterized lazily. Unchanged pages reuse `known_pages`, pages
+    found in the DocTags cache are only cleaned and exported again, and the
+    rest are sent to the model `batch_size` at a time, so at most one batch of
+    page images is in memory. If a batch fails, its pages are retried one by one.
 
     Args:
         pdf_path (str): Path to the PDF file
-        processor (AutoProcessor): The loaded processor
-        model (AutoModelForVision2Seq): The loaded model
-        device (str): The device to run inference on
+        model_loader (Callable): Returns (processor, model, device); only called
+            when a page actually needs OCR
+        known_pages (dict | None): Page records from a previous run keyed by page hash
+        batch_size (int): Number of pages per `generate` call
+        dpi (int): Page rendering resolution
+        raster_threads (int): Number of rasterization threads
+        cache_dir (str | None): Directory of the on-disk DocTags cache
 
     Returns:
         tuple: A tuple containing:
-            - texts (list): List of extracted text from each page
-            - markdowns (list): List of markdown formatted text from each page
+            - pages (list): One record per successfully processed page with
+              `hash`, `text` and `markdown`
+            - failed (int): Number of pages that could not be processed
     """
     filename = os.path.basename(pdf_path)
-    images = convert_from_path(pdf_path)
-    texts, markdowns = [], []
+    known_pages = known_pages or {}
+    cache = OCRCache(cache_dir) if cache_dir else None
+    results: list[dict | None] = []
+    pending = []
 
     logger.info(f"Processing: {filename}")
 
-    for i, image in enumerate(images):
+    def run_batch(batch):
+        processor, model, device = model_loader()
+        doctags, gen_time = generate_doctags([image for _, _, image in batch], processor, model, device)
+        for (i, page_hash, image), tags in zip(batch, doctags):
+            if cache is not None:
+                cache.put(page_hash, tags)
+            text, markdown = doctags_to_outputs(tags, image)
+            results[i] = {"hash": page_hash, "text": text, "markdown": markdown}
+        pages = ", ".join(str(i + 1) for i, _, _ in batch)
+        logger.info(f"Page {pages} of {filename} processed in {gen_time:.2f} s")
+
+    def flush():
         try:
-            text, markdown, gen_time = process_image(image, processor, model, device)
-            texts.append(text)
-            markdowns.append(markdown)
-            logger.info(f"Page {i+1} of {filename} processed in {gen_time:.2f} s")
-            
+            run_batch(pending)
         except Exception as e:
-            logger.error(f"Error on page {i+1} of {filename}: {e}")
+            if len(pending) == 1:
+                logger.error(f"Error on page {pending[0][0]+1} of {filename}: {e}")
+            else:
+                logger.warning(f"Batch OCR failed on {filename} ({e}), retrying pages one by one")
+                for item in pending:
+                    try:
+                        run_batch([item])
+                    except Exception as e:
+                        logger.error(f"Error on page {item[0]+1} of {filename}: {e}")
+        finally:
+            for _, _, image in pending:
+                image.close()
+            pending.clear()
 
-    return texts, markdowns
+    for i, image in enumerate(iter_pdf_pages(pdf_path, dpi, raster_threads, batch_size)):
+        page_hash = hash_image(image)
+        results.append(None)
+        if page_hash in known_pages:
+            results[i] = known_pages[page_hash]
+            image.close()
+            logger.info(f"Page {i+1} of {filename} unchanged, OCR skipped")
+            continue
 
-def process_all_pdfs(input_dir: str) -> tuple[list, list]:
-    """
-    Process all PDF files in the specified directory.
+        cached = cache.get(page_hash) if cache is not None else None
+        if cached is not None:
+            try:
+                text, markdown = doctags_to_outputs(cached, image)
+                results[i] = {"hash": page_hash, "text": text, "markdown": markdown}
+                logger.info(f"Page {i+1} of {filename} rebuilt from OCR cache")
+            except Exception as e:
+                logger.error(f"Error on cached page {i+1} of {filename}: {e}")
+            finally:
+                image.close()
+            continue
 
-    This function:
-    1. Sets up the device (CPU/CUDA)
-    2. Loads the model and processor
-    3. Processes each PDF file in the input directory
-    4. Combines the results from all PDFs
+        pending.append((i, page_hash, image))
+        if len(pending) >= batch_size:
+            flush()
+    if pending:
+        flush()
 
-    Args:
-        input_dir (str): Directory containing PDF files to process
+    pages = [page for page in results if page is not None]
+    return pages, len(results) - len(pages)
 
-    Returns:
-        tuple: A tuple containing:
-            - all_texts (list): List of extracted text from all PDFs
-            - all_markdowns (list): List of markdown formatted text from all PDFs
+# Per-process OCR model used by `process_pdfs` workers
+_worker_model_loader = None
+
+def _init_ocr_worker(num_threads: int) -> None:
+    """Initialize an OCR worker process with its own lazily loaded model."""
+    global _worker_model_loader
+    torch.set_num_threads(num_threads)
+    _worker_model_loader = lazy_model_loader()
+
+def _process_pdf_in_worker(pdf_path: str, known_pages: dict, options: dict) -> tuple[list[dict], int]:
+    return process_pdf_pages(pdf_path, _worker_model_loader, known_pages, **options)
+
+def process_pdfs(
+    jobs: list[tuple[str, dict]],
+    batch_size: int = 1,
+    num_workers: int = 1,
+    dpi: int = 200,
+    raster_threads: int = 1,
+    cache_dir: str | None = None
+) -> Iterator[tuple[str, list[dict], int]]:
     """
-    device = get_device()
-    processor, model = load_model_and_processor(device)
+    OCR several PDFs, optionally spread across worker processes.
 
-    all_texts = []
-    all_markdowns = []
+    With `num_workers > 1` each worker process loads its own SmolDocling model
+    and the CPU threads are split evenly between workers. Results are yielded
+    as PDFs complete; a PDF whose processing crashed is logged and skipped.
 
-    for file in sorted(os.listdir(input_dir)):
-        if file.lower().endswith(".pdf"):
-            full_path = os.path.join(input_dir, file)
-            texts, markdowns = process_pdf(full_path, processor, model, device)
-            # Combine all pages in one document
-            all_texts.append("\n".join(texts))
-            all_markdowns.append("\n".join(markdowns))
+    Args:
+        jobs (list): (pdf_path, known_pages) pairs to process
+        batch_size (int): Number of pages per `generate` call
+        num_workers (int): Number of worker processes
+        dpi (int): Page rendering resolution
+        raster_threads (int): Number of rasterization threads per PDF
+        cache_dir (str | None): Directory of the on-disk DocTags cache
 
-    return all_texts, all_markdowns
+    Yields:
+        tuple: (pdf_path, pages, failed) as returned by `process_pdf_pages`
+    """
+    options = {"batch_size": batch_size, "dpi": dpi, "raster_threads": raster_threads, "cache_dir": cache_dir}
+    if num_workers <= 1 or len(jobs) <= 1:
+        model_loader = lazy_model_loader()
+        for pdf_path, known_pages in jobs:
+            try:
+                pages, failed = process_pdf_pages(pdf_path, model_loader, known_pages, **options)
+            except Exception as e:
+                logger.error(f"Error processing {os.path.basename(pdf_path)}: {e}")
+                continue
+            yield pdf_path, pages, failed
+        return
 
-# if __name__ == "__main__":
-#     texts, markdowns = process_all_pdfs(INPUT_DIR)
-#     save_combined_output(texts, markdowns)
\ No newline at end of file
+    num_workers = min(num_workers, len(jobs))
+    num_threads = max(1, (os.cpu_count() or 1) // num_workers)
+    logger.info(f"Processing {len(jobs)} PDFs with {num_workers} workers ({num_threads} threads each)")
+    with ProcessPoolExecutor(
+        max_workers=num_workers,
+        mp_context=get_context("spawn"),
+        initializer=_init_ocr_worker,
+        initargs=(num_threads,)
+    ) as pool:
+        futures = {
+            pool.submit(_process_pdf_in_worker, pdf_path, known_pages, options): pdf_path
+            for pdf_path, known_pages in jobs
+        }
+        for future in as_completed(futures):
+            pdf_path = futures[future]
+            try:
+                pages, failed = future.result()
+            except Exception as e:
+                logger.error(f"Error processing {os.path.basename(pdf_path)}: {e}")
+                continue
+            yield pdf_path, pages, failed
@@ -0,0 +1,138 @@
+import os
+import json
+import shutil
+
+import numpy as np
+from langchain_core.documents import Document
+from pgvector.psycopg import register_vector
+from sqlalchemy.engine import Engine
+
+from common.index_format import VECTOR_INDEX_FORMAT, compute_version, write_chunks
+from common.tables import EMBEDDING_TABLE
+from pipeline.ann_index import get_collection_uuid
+from pipeline.utils import setup_logging
+
+logger = setup_logging()
+
+
+def fetch_embeddings(engine: Engine, collection_name: str, ids: list[str], batch_size: int = 1000) -> dict[str, np.ndarray]:
+    """Read stored embeddings of the given chunk ids from PGVector.
+
+    Args:
+        engine (Engine): Database engine.
+        collection_name (str): Name of the PGVector collection.
+        ids (list[str]): Chunk ids to fetch.
+        batch_size (int): Number of ids per query.
+
+    Returns:
+        dict[str, np.ndarray]: Chunk id -> embedding, for the ids found.
+    """
+    collection_uuid = get_collection_uuid(engine, collection_name)
+    vectors = {}
+    raw_connection = engine.raw_connection()
+    try:
+        conn = raw_connection.driver_connection
+        register_vector(conn)
+        with conn.cursor() as cur:
+            for i in range(0, len(ids), batch_size):
+                cur.execute(
+                    f"SELECT id, embedding FROM {EMBEDDING_TABLE} WHERE collection_id = %s AND id = ANY(%s)",
+                    (collection_uuid, ids[i:i + batch_size])
+                )
+                for chunk_id, embedding in cur:
+                    vectors[chunk_id] = np.asarray(embedding, dtype=np.float32)
+        raw_connection.commit()
+    finally:
+        raw_connection.close()
+    return vectors
+
+
+def quantize_int8(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Symmetric per-row int8 quantization.
+
+    Args:
+        vectors (np.ndarray): float32 matrix.
+
+    Returns:
+        tuple[np.ndarray, np.ndarray]: int8 codes and the float32 scale per row.
+    """
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def export_vector_index(
+    engine: Engine,
+    collection_name: str,
+    chunks: list[Document],
+    ids: list[str],
+    index_dir: str,
+    quantize: bool = False
+) -> str:
+    """Export the collection's embeddings as a memory-mappable matrix.
+
+    Rows follow the order of `ids` (the keyword index order), so both indexes
+    share a version. Vectors are L2-normalized so a dot product is the cosine
+    similarity PGVector ranks by:
+
+    - meta.json: format, version, dimension, number of rows, quantization
+    - vectors.npy: float32 matrix, one normalized embedding per chunk
+    - vectors_int8.npy / scales.npy: int8 codes and per-row scales (if quantized)
+    - chunks.jsonl / chunk_offsets.npy: chunk records, as in the keyword index
+
+    Args:
+        engine (Engine): Database engine.
+        collection_name (str): Name of the PGVector collection.
+        chunks (list[Document]): The indexed chunks.
+        ids (list[str]): Chunk ids, aligned with `chunks`.
+        index_dir (str): Directory to write the index to. Replaced once fully written.
+        quantize (bool): Also write int8 codes for a 4x smaller scan.
+
+    Returns:
+        str: The version of the written index.
+    """
+    vectors_by_id = fetch_embeddings(engine, collection_name, ids)
+    missing = [chunk_id for chunk_id in ids if chunk_id not in vectors_by_id]
+    if missing:
+        logger.warning(f"{len(missing)} chunks have no stored embedding and are left out of the vector index")
+        kept = [(chunk_id, chunk) for chunk_id, chunk in zip(ids, chunks) if chunk_id in vectors_by_id]
+        ids = [chunk_id for chunk_id, _ in kept]
+        chunks = [chunk for _, chunk in kept]
+
+    dimension = len(next(iter(vectors_by_id.values()))) if vectors_by_id else 0
+    vectors = np.zeros((len(ids), dimension), dtype=np.float32)
+    for row, chunk_id in enumerate(ids):
+        vectors[row] = vectors_by_id[chunk_id]
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    vectors /= np.where(norms > 0, norms, 1.0)
+
+    version = compute_version(chunks, ids)
+    tmp_dir = index_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    np.save(os.path.join(tmp_dir, "vectors.npy"), vectors)
+    if quantize:
+        codes, scales = quantize_int8(vectors)
+        np.save(os.path.join(tmp_dir, "vectors_int8.npy"), codes)
+        np.save(os.path.join(tmp_dir, "scales.npy"), scales)
+    write_chunks(tmp_dir, chunks, ids)
+
+    with open(os.path.join(tmp_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "format": VECTOR_INDEX_FORMAT,
+            "version": version,
+            "collection": collection_name,
+            "distance": "cosine",
+            "dimension": dimension,
+            "num_docs": len(ids),
+            "quantized": quantize,
+        }, f, indent=2)
+
+    if os.path.isdir(index_dir):
+        shutil.rmtree(index_dir)
+    os.replace(tmp_dir, index_dir)
+
+    logger.info(f"Vector index {version} written to {index_dir} ({len(ids)} chunks, dimension {dimension})")
+    return version
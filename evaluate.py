@@ -9,9 +9,9 @@ def create_parser() -> argparse.ArgumentParser:
     parser.add_argument(
         '--method',
         type=str,
-        choices=['native', 'hybrid'],
+        choices=['native', 'hybrid', 'memmap'],
         default='native',
-        help='Retrieval method to use (native or hybrid)'
+        help='Retrieval method to use (native, hybrid or memmap)'
     )
     parser.add_argument(
         '--input',
@@ -25,11 +25,17 @@ def create_parser() -> argparse.ArgumentParser:
         default=3,
         help='Delay between requests in seconds'
     )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=0,
+        help='Send questions to /ask/batch in groups of this size (0 = one /ask request per question)'
+    )
     return parser
 
 def evaluate_questions(
     file_path: str,
-    method: Literal['native', 'hybrid'],
+    method: Literal['native', 'hybrid', 'memmap'],
     delay: int = 3
 ) -> None:
     """
@@ -37,7 +43,7 @@ def evaluate_questions(
     
     Args:
         file_path (str): Path to Excel file containing questions
-        method (str): Retrieval method ('native' or 'hybrid')
+        method (str): Retrieval method ('native', 'hybrid' or 'memmap')
         delay (int): Delay between requests in seconds
     """
     # Baca file Excel
@@ -90,16 +96,75 @@ def evaluate_questions(
     print(f"\nEvaluation completed for {method} method!")
     print(f"Results saved to {file_path}")
 
+def evaluate_questions_batch(
+    file_path: str,
+    method: Literal['native', 'hybrid', 'memmap'],
+    batch_size: int
+) -> None:
+    """
+    Evaluate questions through the batch endpoint
+    
+    Args:
+        file_path (str): Path to Excel file containing questions
+        method (str): Retrieval method ('native', 'hybrid' or 'memmap')
+        batch_size (int): Questions per batch request
+    """
+    df = pd.read_excel(file_path)
+    api_url = "http://localhost:8000/api/v1/ask/batch"
+
+    output_column = f'output_{method}'
+    if output_column not in df.columns:
+        df[output_column] = None
+
+    print(f"\nStarting batch evaluation using {method.upper()} method...")
+    print(f"Total questions: {len(df)}, batch size: {batch_size}\n")
+
+    for start in range(0, len(df), batch_size):
+        rows = df.iloc[start:start + batch_size]
+        payload = {
+            "questions": [
+                {"session_id": f"eval_{index}", "query": row['pertanyaan'], "method": method}
+                for index, row in rows.iterrows()
+            ]
+        }
+        try:
+            response = requests.post(api_url, json=payload)
+            if response.status_code != 200:
+                print(f"✗ Error for questions {start + 1}-{start + len(rows)}: {response.status_code}")
+                continue
+
+            for index, result in zip(rows.index, response.json()['results']):
+                if result['error'] is None:
+                    df.at[index, output_column] = result['answer']
+                    print(f"✓ Answer saved for question {index + 1}")
+                else:
+                    print(f"✗ Error for question {index + 1}: {result['error']}")
+            df.to_excel(file_path, index=False)
+
+        except Exception as e:
+            print(f"✗ Skip questions {start + 1}-{start + len(rows)}: {str(e)}")
+            continue
+
+    print(f"\nEvaluation completed for {method} method!")
+    print(f"Results saved to {file_path}")
+
 def main():
     parser = create_parser()
     args = parser.parse_args()
     
     try:
-        evaluate_questions(
-            file_path=args.input,
-            method=args.method,
-            delay=args.delay
-        )
+        if args.batch_size > 0:
+            evaluate_questions_batch(
+                file_path=args.input,
+                method=args.method,
+                batch_size=args.batch_size
+            )
+        else:
+            evaluate_questions(
+                file_path=args.input,
+                method=args.method,
+                delay=args.delay
+            )
     except Exception as e:
         print(f"Error during evaluation: {str(e)}")
 
@@ -1,6 +1,6 @@
 from enum import Enum
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict
 
 class RetrievalMethod(str, Enum):
     """
@@ -8,6 +8,7 @@ class RetrievalMethod(str, Enum):
     """
     NATIVE = "native"
     HYBRID = "hybrid"
+    MEMMAP = "memmap"
 
 class QuestionRequest(BaseModel):
     """
@@ -26,12 +27,24 @@ class RetrieverConfig(BaseModel):
     top_k: Optional[int] = None
     vector_store_top_k: Optional[int] = None
     bm25_top_k: Optional[int] = None
+    keyword_backend: Optional[str] = None
+    fusion: Optional[str] = None
     weights: Optional[List[float]] = None
     rerank_top_n: Optional[int] = None
 
     class Config:
         from_attributes = True
 
+class Timings(BaseModel):
+    """
+    Pydantic model for the per-request stage timings.
+    """
+    stages_ms: Dict[str, float]
+    documents: Dict[str, int]
+    time_to_first_token_ms: Optional[float] = None
+    prompt_tokens: Optional[int] = None
+    completion_tokens: Optional[int] = None
+
 class Metadata(BaseModel):
     """
     Pydantic model for the metadata.
@@ -39,6 +52,9 @@ class Metadata(BaseModel):
     method: RetrievalMethod
     model: str
     retriever_config: RetrieverConfig
+    cached: bool = False
+    coalesced: bool = False
+    timings: Optional[Timings] = None
 
     class Config:
         from_attributes = True
@@ -53,4 +69,29 @@ class Response(BaseModel):
     metadata: Metadata
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class BatchQuestionRequest(BaseModel):
+    """
+    Pydantic model for the batch question request.
+    """
+    questions: List[QuestionRequest]
+
+class BatchItemResult(BaseModel):
+    """
+    Pydantic model for the result of one question in a batch.
+    """
+    index: int
+    session_id: str
+    query: str
+    answer: Optional[str] = None
+    metadata: Optional[Metadata] = None
+    error: Optional[str] = None
+
+class BatchResponse(BaseModel):
+    """
+    Pydantic model for the batch response.
+    """
+    results: List[BatchItemResult]
+    succeeded: int
+    failed: int
\ No newline at end of file
@@ -0,0 +1,272 @@
+# src/pipeline/bm25.py
+from collections import Counter
+from typing import Any, Callable, Counter as CounterType, Dict, List, Optional
+
+import numpy as np
+from scipy import sparse
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from common.index_format import bm25_idf, bm25_weights
+from pipeline.utils import init_logger
+
+logger = init_logger()
+
+
+def top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of the k highest scores, best first.
+
+    Uses a partial sort (`argpartition`) so only the k selected scores are
+    fully sorted.
+
+    Args:
+        scores (np.ndarray): Score per document.
+        k (int): Number of indices to return.
+
+    Returns:
+        np.ndarray: Indices of the top-k scores in descending order of score.
+    """
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.zeros(0, dtype=np.int64)
+    if k < len(scores):
+        candidates = np.argpartition(scores, -k)[-k:]
+    else:
+        candidates = np.arange(len(scores))
+    return candidates[np.argsort(scores[candidates])[::-1]]
+
+
+class BM25Matrix:
+    """
+    BM25 (Okapi) scorer over a sparse term-document weight matrix.
+
+    Every posting's BM25 contribution `idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * dl / avgdl))`
+    is query independent, so it is computed once into a CSR matrix with one
+    row per term. Scoring a query is then a sparse row selection and a single
+    vectorized sum, with no per-document Python work. Scores match rank_bm25's
+    `BM25Okapi`, including repeated query tokens counting repeatedly.
+    """
+
+    def __init__(self, weights: sparse.csr_matrix, vocab: Any):
+        """
+        Initialize the scorer.
+
+        Args:
+            weights (sparse.csr_matrix): BM25 weight per (term, document).
+            vocab (Any): Term -> row of `weights`; a dict, or any mapping with
+                `get` and `len` such as a persisted index's `TermVocab`.
+        """
+        self.weights = weights
+        self.vocab = vocab
+        self.num_docs = weights.shape[1]
+
+    @classmethod
+    def from_postings(
+        cls,
+        vocab: Dict[str, int],
+        indptr: np.ndarray,
+        postings_docs: np.ndarray,
+        postings_tf: np.ndarray,
+        idf: np.ndarray,
+        doc_lengths: np.ndarray,
+        k1: float = 1.5,
+        b: float = 0.75
+    ) -> "BM25Matrix":
+        """
+        Build the scorer from CSR postings lists of term frequencies.
+
+        Args:
+            vocab (Dict[str, int]): Term -> term id.
+            indptr (np.ndarray): Start of each term's postings.
+            postings_docs (np.ndarray): Document index per posting.
+            postings_tf (np.ndarray): Term frequency per posting.
+            idf (np.ndarray): IDF per term.
+            doc_lengths (np.ndarray): Token count per document.
+            k1 (float): BM25 term frequency saturation.
+            b (float): BM25 length normalization.
+
+        Returns:
+            BM25Matrix: The scorer.
+        """
+        indptr = np.asarray(indptr, dtype=np.int64)
+        docs = np.asarray(postings_docs, dtype=np.int32)
+        data = bm25_weights(indptr, docs, postings_tf, idf, doc_lengths, k1=k1, b=b)
+        weights = sparse.csr_matrix((data, docs, indptr), shape=(len(indptr) - 1, len(doc_lengths)))
+        return cls(weights, vocab)
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        tokenizer: Callable[[str], List[str]] = str.split,
+        k1: float = 1.5,
+        b: float = 0.75,
+        epsilon: float = 0.25
+    ) -> "BM25Matrix":
+        """
+        Build the scorer in memory from raw texts.
+
+        Args:
+            texts (List[str]): The documents.
+            tokenizer (Callable[[str], List[str]]): Tokenizer for documents and queries.
+            k1 (float): BM25 term frequency saturation.
+            b (float): BM25 length normalization.
+            epsilon (float): Floor for negative IDF, as a fraction of the mean IDF.
+
+        Returns:
+            BM25Matrix: The scorer.
+        """
+        vocab: Dict[str, int] = {}
+        rows, cols, counts = [], [], []
+        doc_lengths = np.zeros(len(texts), dtype=np.int32)
+        for doc_idx, text in enumerate(texts):
+            tokens = tokenizer(text)
+            doc_lengths[doc_idx] = len(tokens)
+            for term, tf in Counter(tokens).items():
+                rows.append(vocab.setdefault(term, len(vocab)))
+                cols.append(doc_idx)
+                counts.append(tf)
+
+        postings = sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float32), (np.asarray(rows, dtype=np.int64), np.asarray(cols, dtype=np.int64))),
+            shape=(len(vocab), len(texts))
+        )
+        postings.sort_indices()
+
+        idf = bm25_idf(np.diff(postings.indptr), len(texts), epsilon)
+
+        return cls.from_postings(vocab, postings.indptr, postings.indices, postings.data, idf, doc_lengths, k1=k1, b=b)
+
+    def _term_counts(self, tokens: List[str]) -> CounterType[int]:
+        """Occurrences per term id of the query tokens in the vocabulary"""
+        term_ids = (self.vocab.get(token) for token in tokens)
+        return Counter(term_id for term_id in term_ids if term_id is not None)
+
+    def get_scores(self, tokens: List[str]) -> np.ndarray:
+        """
+        Compute BM25 scores of every document for the query tokens.
+
+        Args:
+            tokens (List[str]): Query tokens.
+
+        Returns:
+            np.ndarray: Score per document.
+        """
+        term_counts = self._term_counts(tokens)
+        if not term_counts:
+            return np.zeros(self.num_docs, dtype=np.float32)
+        term_ids = np.fromiter(term_counts.keys(), dtype=np.int64, count=len(term_counts))
+        multiplicity = np.fromiter(term_counts.values(), dtype=np.float32, count=len(term_counts))
+        return np.asarray(self.weights[term_ids].T @ multiplicity, dtype=np.float32)
+
+    def top_k(self, tokens: List[str], k: int) -> np.ndarray:
+        """
+        Indices of the k best documents for the query tokens.
+
+        Args:
+            tokens (List[str]): Query tokens.
+            k (int): Number of documents.
+
+        Returns:
+            np.ndarray: Document indices, best first.
+        """
+        return top_k_indices(self.get_scores(tokens), k)
+
+    def get_scores_batch(self, token_lists: List[List[str]]) -> np.ndarray:
+        """
+        Compute BM25 scores for many queries with one sparse matrix product.
+
+        Args:
+            token_lists (List[List[str]]): Tokens of each query.
+
+        Returns:
+            np.ndarray: Scores of shape (num_queries, num_docs).
+        """
+        rows, cols, counts = [], [], []
+        for row, tokens in enumerate(token_lists):
+            term_counts = self._term_counts(tokens)
+            rows.extend([row] * len(term_counts))
+            cols.extend(term_counts.keys())
+            counts.extend(term_counts.values())
+        queries = sparse.csr_matrix(
+            (np.asarray(counts, dtype=np.float32), (rows, cols)),
+            shape=(len(token_lists), len(self.vocab))
+        )
+        return np.asarray((queries @ self.weights).toarray(), dtype=np.float32)
+
+    def top_k_batch(self, token_lists: List[List[str]], k: int) -> List[np.ndarray]:
+        """
+        Indices of the k best documents for each query.
+
+        Args:
+            token_lists (List[List[str]]): Tokens of each query.
+            k (int): Number of documents per query.
+
+        Returns:
+            List[np.ndarray]: Document indices per query, best first.
+        """
+        if not token_lists:
+            return []
+        return [top_k_indices(scores, k) for scores in self.get_scores_batch(token_lists)]
+
+
+class SparseBM25Retriever(BaseRetriever):
+    """
+    Drop-in replacement for `BM25Retriever` with vectorized scoring.
+
+    Used when no persisted keyword index is available; builds a `BM25Matrix`
+    from the documents in memory.
+    """
+
+    docs: List[Document]
+    matrix: Any
+    k: int = 4
+    tokenizer: Callable[[str], List[str]] = str.split
+
+    @classmethod
+    def from_documents(
+        cls,
+        documents: List[Document],
+        k: int = 4,
+        tokenizer: Optional[Callable[[str], List[str]]] = None,
+        **bm25_params: Any
+    ) -> "SparseBM25Retriever":
+        """
+        Build the retriever from documents.
+
+        Args:
+            documents (List[Document]): The documents to index.
+            k (int): Number of documents to return.
+            tokenizer (Callable): Tokenizer; defaults to whitespace splitting like `BM25Retriever`.
+            **bm25_params: `k1`, `b` and `epsilon` for `BM25Matrix.from_texts`.
+
+        Returns:
+            SparseBM25Retriever: The retriever.
+        """
+        tokenizer = tokenizer or str.split
+        matrix = BM25Matrix.from_texts([doc.page_content for doc in documents], tokenizer=tokenizer, **bm25_params)
+        logger.info(f"BM25 matrix built ({matrix.num_docs} chunks, {len(matrix.vocab)} terms, {matrix.weights.nnz} postings)")
+        return cls(docs=list(documents), matrix=matrix, k=k, tokenizer=tokenizer)
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        if not self.docs:
+            return []
+        return [self.docs[int(i)] for i in self.matrix.top_k(self.tokenizer(query), self.k)]
+
+    def search_batch(self, queries: List[str]) -> List[List[Document]]:
+        """
+        Retrieve documents for many queries with one scoring pass.
+
+        Args:
+            queries (List[str]): Queries.
+
+        Returns:
+            List[List[Document]]: Documents per query, best first.
+        """
+        if not self.docs:
+            return [[] for _ in queries]
+        tops = self.matrix.top_k_batch([self.tokenizer(query) for query in queries], self.k)
+        return [[self.docs[int(i)] for i in top] for top in tops]
@@ -0,0 +1,208 @@
+# src/pipeline/cache.py
+import json
+import time
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from pipeline.utils import init_logger
+
+logger = init_logger()
+
+# Rough per-entry bookkeeping cost (dict slot, dataclass, metadata object)
+_ENTRY_OVERHEAD_BYTES = 512
+
+
+@dataclass
+class CacheEntry:
+    answer: str
+    metadata: Any
+    method: str
+    index_version: str
+    created_at: float
+    size: int
+
+
+def _metadata_size(metadata: Any) -> int:
+    """Approximate the memory held by an entry's metadata from its serialized size"""
+    if metadata is None:
+        return 0
+    if hasattr(metadata, "model_dump_json"):
+        return len(metadata.model_dump_json())
+    return len(json.dumps(metadata, default=str))
+
+
+class SemanticCache:
+    """
+    Answer cache keyed on the query embedding.
+
+    A lookup hits when a cached query with the same retrieval method and index
+    version has a cosine similarity of at least `threshold` with the new query.
+    Entries expire after `ttl` seconds and are evicted least-recently-used
+    first once `max_entries` or `max_bytes` is exceeded.
+
+    Cached embeddings live in one matrix of `max_entries` rows, allocated on
+    the first insert; evicted rows are reused by later entries. A lookup only
+    holds the lock to take a view of the occupied rows and again to confirm
+    its best row was not replaced meanwhile; the similarity scores are
+    computed without it.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.95,
+        ttl: float = 3600,
+        max_entries: int = 1024,
+        max_bytes: int = 64 * 1024 * 1024
+    ):
+        """
+        Initialize the semantic cache.
+
+        Args:
+            threshold (float): Minimum cosine similarity for a hit.
+            ttl (float): Time-to-live of an entry in seconds.
+            max_entries (int): Maximum number of cached answers.
+            max_bytes (int): Approximate memory cap for cached entries,
+                counting their embedding, answer and metadata.
+        """
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._matrix: Optional[np.ndarray] = None
+        self._slots: List[Optional[CacheEntry]] = [None] * max_entries
+        # (method, index version) of each row as a small integer, -1 for free rows
+        self._keys = np.full(max_entries, -1, dtype=np.int32)
+        self._created = np.zeros(max_entries, dtype=np.float64)
+        self._key_ids: Dict[Tuple[str, str], int] = {}
+        self._order: "OrderedDict[int, CacheEntry]" = OrderedDict()
+        self._free: List[int] = []
+        self._used = 0
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _normalize(vector: List[float]) -> np.ndarray:
+        array = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(array)
+        return array / norm if norm > 0 else array
+
+    def _key_id(self, method: str, index_version: str) -> int:
+        return self._key_ids.setdefault((method, index_version), len(self._key_ids))
+
+    def _remove(self, slot: int) -> None:
+        entry = self._order.pop(slot)
+        self._slots[slot] = None
+        self._keys[slot] = -1
+        self._free.append(slot)
+        self._bytes -= entry.size
+
+    def _expire(self, now: float) -> None:
+        expired = [slot for slot, e in self._order.items() if now - e.created_at > self.ttl]
+        for slot in expired:
+            self._remove(slot)
+
+    def lookup(self, vector: List[float], method: str, index_version: str) -> Optional[Tuple[str, Any]]:
+        """
+        Find a cached answer for a semantically equivalent query.
+
+        Args:
+            vector (List[float]): Query embedding.
+            method (str): Retrieval method of the request.
+            index_version (str): Version of the index the answer was built from.
+
+        Returns:
+            Optional[Tuple[str, Any]]: Cached `(answer, metadata)` or None on a miss.
+        """
+        query = self._normalize(vector)
+        with self._lock:
+            key = self._key_ids.get((method, index_version))
+            used = self._used
+            if key is None or self._matrix is None or used == 0:
+                self.misses += 1
+                return None
+            matrix = self._matrix[:used]
+            keys = self._keys[:used].copy()
+            created = self._created[:used].copy()
+            entries = self._slots[:used]
+
+        scores = matrix @ query
+        scores[(keys != key) | (time.time() - created > self.ttl)] = -np.inf
+        best = int(np.argmax(scores))
+
+        with self._lock:
+            entry = entries[best]
+            # A row rewritten during the product scored another query
+            if scores[best] >= self.threshold and entry is not None and self._slots[best] is entry:
+                self._order.move_to_end(best)
+                self.hits += 1
+                return entry.answer, entry.metadata
+            self.misses += 1
+            return None
+
+    def add(self, vector: List[float], method: str, index_version: str, answer: str, metadata: Any) -> None:
+        """
+        Store an answer, evicting old entries to respect the size limits.
+
+        Args:
+            vector (List[float]): Query embedding.
+            method (str): Retrieval method of the request.
+            index_version (str): Version of the index the answer was built from.
+            answer (str): Generated answer.
+            metadata (Any): Response metadata returned alongside the answer.
+        """
+        normalized = self._normalize(vector)
+        size = (
+            normalized.nbytes
+            + len(answer.encode("utf-8"))
+            + _metadata_size(metadata)
+            + len(method) + len(index_version)
+            + _ENTRY_OVERHEAD_BYTES
+        )
+        if size > self.max_bytes or self.max_entries <= 0:
+            return
+
+        now = time.time()
+        entry = CacheEntry(
+            answer=answer,
+            metadata=metadata,
+            method=method,
+            index_version=index_version,
+            created_at=now,
+            size=size
+        )
+        with self._lock:
+            if self._matrix is None:
+                self._matrix = np.zeros((self.max_entries, normalized.shape[0]), dtype=np.float32)
+            self._expire(now)
+            while self._order and (len(self._order) >= self.max_entries or self._bytes + size > self.max_bytes):
+                self._remove(next(iter(self._order)))
+            if self._free:
+                slot = self._free.pop()
+            else:
+                slot = self._used
+                self._used += 1
+            self._matrix[slot] = normalized
+            self._keys[slot] = self._key_id(method, index_version)
+            self._created[slot] = now
+            self._slots[slot] = entry
+            self._order[slot] = entry
+            self._bytes += size
+
+    def clear(self) -> None:
+        """Drop every cached entry."""
+        with self._lock:
+            self._order.clear()
+            self._slots = [None] * self.max_entries
+            self._keys[:] = -1
+            self._key_ids.clear()
+            self._free = []
+            self._used = 0
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._order)
@@ -0,0 +1,243 @@
+# src/pipeline/context.py
+import re
+from dataclasses import dataclass, field
+from typing import List, Optional, Set, Tuple
+
+from langchain_core.documents import Document
+from pipeline.utils import init_logger
+
+logger = init_logger()
+
+_WORD_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+class TokenCounter:
+    """
+    Token counting and truncation for the context budget.
+
+    Uses tiktoken's `cl100k_base` when its encoding can be loaded. Otherwise
+    tokens are estimated from words and punctuation (about four characters
+    per token), which is close enough for budgeting.
+    """
+
+    def __init__(self, encoding_name: str = "cl100k_base"):
+        """
+        Initialize the counter.
+
+        Args:
+            encoding_name (str): The tiktoken encoding to use.
+        """
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(encoding_name)
+        except Exception as e:
+            logger.warning(f"tiktoken encoding {encoding_name} unavailable, estimating token counts: {e}")
+            self._encoding = None
+
+    @staticmethod
+    def _estimate(piece: str) -> int:
+        return max(1, (len(piece) + 3) // 4)
+
+    def count(self, text: str) -> int:
+        """
+        Count the tokens of a text.
+
+        Args:
+            text (str): The text.
+
+        Returns:
+            int: Number of tokens.
+        """
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return sum(self._estimate(match.group()) for match in _WORD_PATTERN.finditer(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """
+        Cut a text down to at most `max_tokens` tokens.
+
+        Args:
+            text (str): The text.
+            max_tokens (int): Maximum number of tokens to keep.
+
+        Returns:
+            str: The leading part of the text.
+        """
+        if self._encoding is not None:
+            tokens = self._encoding.encode(text, disallowed_special=())
+            return self._encoding.decode(tokens[:max_tokens]) if len(tokens) > max_tokens else text
+        used = 0
+        for match in _WORD_PATTERN.finditer(text):
+            used += self._estimate(match.group())
+            if used > max_tokens:
+                return text[:match.start()].rstrip()
+        return text
+
+
+@dataclass
+class AssembledContext:
+    text: str
+    passages: List[str] = field(default_factory=list)
+    tokens: int = 0
+    merged: int = 0
+    duplicates: int = 0
+    truncated: bool = False
+
+
+def _shingles(text: str, size: int = 3) -> Set[Tuple[str, ...]]:
+    words = text.lower().split()
+    if len(words) < size:
+        return {tuple(words)}
+    return {tuple(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _join_overlap(first: str, second: str, min_overlap: int) -> Optional[str]:
+    """Join two texts when a suffix of `first` of at least `min_overlap` characters starts `second`"""
+    anchor = second[:min_overlap]
+    if len(anchor) < min_overlap:
+        return None
+    position = first.find(anchor)
+    while position != -1:
+        if second.startswith(first[position:]):
+            return first + second[len(first) - position:]
+        position = first.find(anchor, position + 1)
+    return None
+
+
+class ContextAssembler:
+    """
+    Turns retrieved chunks into the prompt context.
+
+    Chunks are split with an overlap, and the hybrid path fuses vector and
+    BM25 results, so the retrieved chunks often repeat text. Chunks that
+    continue each other (a suffix of one is the prefix of the other) are
+    merged into one passage. Chunks whose word shingles are mostly contained
+    in a passage already kept are dropped. The passages keep the retrieval
+    order and are packed into `token_budget` tokens; the passage that crosses
+    the budget is truncated when enough room is left for it.
+    """
+
+    def __init__(
+        self,
+        token_budget: Optional[int] = 1500,
+        duplicate_threshold: float = 0.9,
+        min_overlap_chars: int = 50,
+        min_passage_tokens: int = 64,
+        separator: str = "\n\n",
+        counter: Optional[TokenCounter] = None
+    ):
+        """
+        Initialize the assembler.
+
+        Args:
+            token_budget (Optional[int]): Maximum context tokens, None for no limit.
+            duplicate_threshold (float): Share of a chunk's word shingles found in a kept
+                passage above which the chunk is dropped as a near-duplicate.
+            min_overlap_chars (int): Shortest suffix/prefix overlap that merges two chunks.
+            min_passage_tokens (int): Smallest truncated passage worth including.
+            separator (str): Text placed between passages.
+            counter (Optional[TokenCounter]): Token counter, created when not given.
+        """
+        self.token_budget = token_budget
+        self.duplicate_threshold = duplicate_threshold
+        self.min_overlap_chars = min_overlap_chars
+        self.min_passage_tokens = min_passage_tokens
+        self.separator = separator
+        self.counter = counter or TokenCounter()
+
+    def _is_covered(self, text: str, shingles: Set[Tuple[str, ...]], kept: str, kept_shingles: Set[Tuple[str, ...]]) -> bool:
+        if text in kept:
+            return True
+        return len(shingles & kept_shingles) >= self.duplicate_threshold * len(shingles)
+
+    def _combine(self, first: str, second: str) -> Optional[str]:
+        """Merge `second` into `first` if one covers or continues the other"""
+        first_shingles, second_shingles = _shingles(first), _shingles(second)
+        if self._is_covered(second, second_shingles, first, first_shingles):
+            return first
+        if self._is_covered(first, first_shingles, second, second_shingles):
+            return second
+        return (
+            _join_overlap(first, second, self.min_overlap_chars)
+            or _join_overlap(second, first, self.min_overlap_chars)
+        )
+
+    def deduplicate(self, documents: List[Document]) -> Tuple[List[str], int, int]:
+        """
+        Merge overlapping chunks and drop near-duplicates, keeping retrieval order.
+
+        Args:
+            documents (List[Document]): Retrieved chunks, best first.
+
+        Returns:
+            Tuple[List[str], int, int]: Passages, merged chunk count and dropped duplicate count.
+        """
+        passages: List[str] = []
+        merged = duplicates = 0
+        for doc in documents:
+            text = doc.page_content.strip()
+            if not text:
+                continue
+            for i, kept in enumerate(passages):
+                combined = self._combine(kept, text)
+                if combined is None:
+                    continue
+                if combined == kept:
+                    duplicates += 1
+                else:
+                    merged += 1
+                    passages[i] = combined
+                    # The grown passage may now cover or continue a later one
+                    j = i + 1
+                    while j < len(passages):
+                        joined = self._combine(passages[i], passages[j])
+                        if joined is None:
+                            j += 1
+                            continue
+                        passages[i] = joined
+                        del passages[j]
+                break
+            else:
+                passages.append(text)
+        return passages, merged, duplicates
+
+    def assemble(self, documents: List[Document]) -> AssembledContext:
+        """
+        Build the prompt context from retrieved chunks.
+
+        Args:
+            documents (List[Document]): Retrieved chunks, best first.
+
+        Returns:
+            AssembledContext: The context text and what was merged, dropped and cut.
+        """
+        passages, merged, duplicates = self.deduplicate(documents)
+
+        packed: List[str] = []
+        tokens = 0
+        truncated = False
+        separator_tokens = self.counter.count(self.separator)
+        for passage in passages:
+            cost = self.counter.count(passage) + (separator_tokens if packed else 0)
+            if self.token_budget is None or tokens + cost <= self.token_budget:
+                packed.append(passage)
+                tokens += cost
+                continue
+            remaining = self.token_budget - tokens - (separator_tokens if packed else 0)
+            if remaining >= self.min_passage_tokens:
+                tokens += cost - self.counter.count(passage)
+                passage = self.counter.truncate(passage, remaining)
+                packed.append(passage)
+                tokens += self.counter.count(passage)
+                truncated = True
+                break
+            # Too little room for this one; a shorter later passage may still fit
+
+        return AssembledContext(
+            text=self.separator.join(packed),
+            passages=packed,
+            tokens=tokens,
+            merged=merged,
+            duplicates=duplicates,
+            truncated=truncated
+        )
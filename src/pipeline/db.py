@@ -0,0 +1,39 @@
+# src/pipeline/db.py
+import os
+from functools import lru_cache
+
+from sqlalchemy.engine import Engine
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+from common.db import create_pooled_engine, get_connection_string, get_engine_args
+from pipeline.utils import init_logger
+
+logger = init_logger()
+
+
+def statement_timeout_ms() -> int:
+    """Per-statement timeout of API queries (`DB_STATEMENT_TIMEOUT_MS`)"""
+    return int(os.getenv("DB_STATEMENT_TIMEOUT_MS", "5000"))
+
+
+@lru_cache(maxsize=None)
+def get_engine() -> Engine:
+    """
+    Get the process-wide pooled sync engine.
+
+    Returns:
+        Engine: The shared engine.
+    """
+    return create_pooled_engine(statement_timeout_ms())
+
+
+@lru_cache(maxsize=None)
+def get_async_engine() -> AsyncEngine:
+    """
+    Get the process-wide pooled async engine.
+
+    Returns:
+        AsyncEngine: The shared async engine.
+    """
+    engine = create_async_engine(get_connection_string(), **get_engine_args(statement_timeout_ms()))
+    logger.info("Async database engine initialized")
+    return engine
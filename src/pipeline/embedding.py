@@ -1,22 +1,191 @@
-from langchain_huggingface import HuggingFaceEmbeddings
+import os
+import asyncio
+import queue
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Dict, List, Optional, Tuple
+from langchain_core.embeddings import Embeddings
+from common.embedding import DEFAULT_MODEL_NAME, load_embeddings, set_inference_threads
+from common.onnx_embedding import OnnxEmbeddings
 from pipeline.utils import init_logger
 
 logger = init_logger()
 
-def embedding_pipeline(model_name: str = "sentence-transformers/all-MiniLM-L6-v2"):
+def embedding_pipeline(model_name: str = DEFAULT_MODEL_NAME, backend: Optional[str] = None) -> Embeddings:
     """
     Initialize the embedding pipeline with the specified model name.
 
+    The model is created by `common.embedding.load_embeddings`, the same
+    function the indexer uses, so chunks and queries are embedded alike.
+
     Args:
         model_name (str): The name of the model to use for embedding.
+        backend (Optional[str]): "torch" or "onnx", `EMBEDDING_BACKEND` when not given.
 
     Returns:
-        HuggingFaceEmbeddings: The initialized embedding pipeline.
+        Embeddings: The initialized embedding pipeline.
+    """
+    return load_embeddings(model_name, backend)
+
+
+class BatchingEmbeddings(Embeddings):
+    """
+    Query embedding layer with an LRU cache and cross-request micro-batching.
+
+    Cache misses from concurrent requests are queued and embedded together in
+    one `embed_documents` call, collected for at most `max_wait_ms` or until
+    `max_batch_size` texts are waiting. Identical in-flight texts share a single
+    slot in the batch.
     """
-    embeddings = HuggingFaceEmbeddings(
-        model_name=model_name,
-        model_kwargs={"device": "cpu"}
-    )
-    logger.info("Embeddings initialized successfully")
-    return embeddings
 
+    def __init__(
+        self,
+        base: Embeddings,
+        cache_size: int = 2048,
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0
+    ):
+        """
+        Initialize the batching embeddings wrapper.
+
+        Args:
+            base (Embeddings): The underlying embedding model.
+            cache_size (int): Maximum number of memoized query vectors.
+            max_batch_size (int): Maximum number of texts per forward pass.
+            max_wait_ms (float): Maximum time to wait for a batch to fill.
+        """
+        self.base = base
+        self.cache_size = cache_size
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._cache: "OrderedDict[str, Tuple[float, ...]]" = OrderedDict()
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._queue: "queue.Queue[str]" = queue.Queue()
+        self._worker = None
+
+    def reset_after_fork(self, threads: Optional[int] = None) -> None:
+        """
+        Prepare the wrapper for a forked worker; the cache is kept.
+
+        Recreates the lock, queue and batching thread, and the model's
+        inference threads.
+
+        Args:
+            threads (Optional[int]): Inference threads for the model, None to keep the default.
+        """
+        self._pending = {}
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._worker = None
+        if isinstance(self.base, OnnxEmbeddings):
+            self.base.reset_after_fork(threads)
+        elif threads:
+            set_inference_threads(threads)
+
+    def _cache_get(self, text: str):
+        vector = self._cache.get(text)
+        if vector is not None:
+            self._cache.move_to_end(text)
+        return vector
+
+    def _cache_put(self, text: str, vector: List[float]) -> None:
+        self._cache[text] = tuple(vector)
+        self._cache.move_to_end(text)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _ensure_worker(self) -> None:
+        # Started lazily so the thread is created in the process that serves requests
+        if self._worker is None or not self._worker.is_alive():
+            self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+            self._worker.start()
+
+    def _submit(self, text: str) -> Future:
+        """Return a future for the text's vector, served from cache when possible"""
+        with self._lock:
+            vector = self._cache_get(text)
+            if vector is not None:
+                future = Future()
+                future.set_result(list(vector))
+                return future
+            future = self._pending.get(text)
+            if future is None:
+                future = Future()
+                self._pending[text] = future
+                self._queue.put(text)
+                self._ensure_worker()
+            return future
+
+    def _collect_batch(self) -> List[str]:
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self) -> None:
+        while True:
+            batch = self._collect_batch()
+            try:
+                vectors = self.base.embed_documents(batch)
+            except Exception as e:
+                logger.error(f"Error embedding batch of {len(batch)} queries: {e}")
+                with self._lock:
+                    futures = [self._pending.pop(text) for text in batch]
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            with self._lock:
+                futures = []
+                for text, vector in zip(batch, vectors):
+                    self._cache_put(text, vector)
+                    futures.append((self._pending.pop(text), vector))
+            for future, vector in futures:
+                future.set_result(list(vector))
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        """Embed documents directly with the underlying model (already batched)"""
+        return self.base.embed_documents(texts)
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed many queries at once, bypassing the micro-batcher.
+
+        Cache hits are served directly and all misses go through a single
+        `embed_documents` call. The results are cached, so later `embed_query`
+        calls for the same texts (e.g. inside a retriever) are cache hits.
+
+        Args:
+            texts (List[str]): Queries to embed.
+
+        Returns:
+            List[List[float]]: One vector per query, in input order.
+        """
+        with self._lock:
+            vectors = {text: self._cache_get(text) for text in texts}
+        misses = [text for text, vector in vectors.items() if vector is None]
+        if misses:
+            embedded = self.base.embed_documents(misses)
+            with self._lock:
+                for text, vector in zip(misses, embedded):
+                    self._cache_put(text, vector)
+                    vectors[text] = vector
+        return [list(vectors[text]) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        """Embed a query, waiting for the batch it was coalesced into"""
+        return self._submit(text).result()
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """Embed a query without blocking the event loop"""
+        return await asyncio.wrap_future(self._submit(text))
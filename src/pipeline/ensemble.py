@@ -0,0 +1,167 @@
+# src/pipeline/ensemble.py
+import time
+import asyncio
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import List, Optional
+
+from langchain.retrievers import EnsembleRetriever
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.runnables import RunnableConfig
+from langchain_core.runnables.config import patch_config
+from pydantic import PrivateAttr
+from pipeline.metrics import RETRIEVER_FAILURES, record_documents, timed_stage
+from pipeline.utils import init_logger
+
+logger = init_logger()
+
+
+class ConcurrentEnsembleRetriever(EnsembleRetriever):
+    """
+    `EnsembleRetriever` that queries its retrievers concurrently.
+
+    Each retriever gets its own timeout. A retriever that times out or fails
+    contributes no documents and the fusion runs over the branches that
+    finished, so hybrid latency is bounded by the slowest branch within its
+    timeout and a slow database still leaves keyword results. An error is
+    raised only when every branch fails.
+
+    The synchronous path gives each retriever its own thread pool: a timed-out
+    call cannot be cancelled and keeps its thread until it returns, so with a
+    shared pool a slow database would fill it and queue the keyword branch
+    past its own timeout.
+    """
+
+    timeouts: Optional[List[float]] = None
+    """Timeout in seconds per retriever, aligned with `retrievers`. None waits indefinitely."""
+    max_workers: int = 8
+    """Size of each retriever's thread pool used by the synchronous path."""
+    names: Optional[List[str]] = None
+    """Retriever names used in metrics, aligned with `retrievers`."""
+
+    _executors: Optional[List[ThreadPoolExecutor]] = PrivateAttr(default=None)
+
+    def _get_executors(self) -> List[ThreadPoolExecutor]:
+        if self._executors is None:
+            self._executors = [
+                ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=f"retriever-{self._name(i)}")
+                for i in range(len(self.retrievers))
+            ]
+        return self._executors
+
+    def reset_after_fork(self) -> None:
+        """Drop the thread pools inherited through fork(); new ones are created on first use"""
+        self._executors = None
+
+    def _timeout(self, i: int) -> Optional[float]:
+        return self.timeouts[i] if self.timeouts else None
+
+    def _name(self, i: int) -> str:
+        return self.names[i] if self.names else f"retriever_{i + 1}"
+
+    def _invoke(self, i: int, query: str, config: RunnableConfig) -> List[Document]:
+        with timed_stage(f"retrieve_{self._name(i)}"):
+            docs = self.retrievers[i].invoke(query, config)
+        record_documents(self._name(i), len(docs))
+        return docs
+
+    async def _ainvoke(self, i: int, query: str, config: RunnableConfig) -> List[Document]:
+        with timed_stage(f"retrieve_{self._name(i)}"):
+            docs = await self.retrievers[i].ainvoke(query, config)
+        record_documents(self._name(i), len(docs))
+        return docs
+
+    def fuse(self, results: List[object]) -> List[Document]:
+        """
+        Fuse per-retriever results, replacing failed branches with empty lists.
+
+        Args:
+            results (List[object]): Documents or the raised exception per retriever,
+                aligned with `retrievers`.
+
+        Returns:
+            List[Document]: Documents ordered by weighted reciprocal rank.
+        """
+        doc_lists = []
+        errors = []
+        for i, result in enumerate(results):
+            if isinstance(result, BaseException):
+                name = type(self.retrievers[i]).__name__
+                if isinstance(result, (asyncio.TimeoutError, FutureTimeoutError)):
+                    logger.warning(f"Retriever {i + 1} ({name}) timed out after {self._timeout(i)} s, skipping")
+                    RETRIEVER_FAILURES.inc(retriever=self._name(i), reason="timeout")
+                else:
+                    logger.warning(f"Retriever {i + 1} ({name}) failed, skipping: {result}")
+                    RETRIEVER_FAILURES.inc(retriever=self._name(i), reason="error")
+                errors.append(result)
+                doc_lists.append([])
+            else:
+                doc_lists.append([
+                    doc if isinstance(doc, Document) else Document(page_content=str(doc))
+                    for doc in result
+                ])
+        if len(errors) == len(results):
+            raise errors[0]
+        fused = self.weighted_reciprocal_rank(doc_lists)
+        record_documents("fusion", len(fused))
+        return fused
+
+    def rank_fusion(
+        self,
+        query: str,
+        run_manager: CallbackManagerForRetrieverRun,
+        *,
+        config: Optional[RunnableConfig] = None,
+    ) -> List[Document]:
+        executors = self._get_executors()
+        start = time.monotonic()
+        # Copy the context so branch timings land in the caller's request trace
+        futures = [
+            executors[i].submit(
+                contextvars.copy_context().run,
+                self._invoke,
+                i,
+                query,
+                patch_config(config, callbacks=run_manager.get_child(tag=f"retriever_{i + 1}")),
+            )
+            for i in range(len(self.retrievers))
+        ]
+
+        results: List[object] = []
+        for i, future in enumerate(futures):
+            timeout = self._timeout(i)
+            remaining = None if timeout is None else max(0.0, start + timeout - time.monotonic())
+            try:
+                results.append(future.result(timeout=remaining))
+            except Exception as e:
+                # A timed-out branch keeps running in its own pool; its result is dropped
+                future.cancel()
+                results.append(e)
+        return self.fuse(results)
+
+    async def arank_fusion(
+        self,
+        query: str,
+        run_manager: AsyncCallbackManagerForRetrieverRun,
+        *,
+        config: Optional[RunnableConfig] = None,
+    ) -> List[Document]:
+        results = await asyncio.gather(
+            *[
+                asyncio.wait_for(
+                    self._ainvoke(
+                        i,
+                        query,
+                        patch_config(config, callbacks=run_manager.get_child(tag=f"retriever_{i + 1}")),
+                    ),
+                    timeout=self._timeout(i),
+                )
+                for i in range(len(self.retrievers))
+            ],
+            return_exceptions=True,
+        )
+        return self.fuse(list(results))
@@ -0,0 +1,201 @@
+# src/pipeline/fulltext.py
+import re
+from typing import Any, List, Optional
+
+from sqlalchemy import text
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+from common.tables import COLLECTION_TABLE, EMBEDDING_TABLE, TSV_COLUMN
+from pipeline.metrics import record_documents, timed_stage
+from pipeline.utils import init_logger
+
+logger = init_logger()
+
+_COLLECTION_ID = f"(SELECT uuid FROM {COLLECTION_TABLE} WHERE name = :collection)"
+# A question rarely has all of its words in one chunk, so its words are ORed
+# (see `or_query`) and ts_rank orders the matches
+_TSQUERY = "websearch_to_tsquery(CAST(:config AS regconfig), {query})"
+_WORD = re.compile(r"\w+")
+
+_KEYWORD_BATCH_SQL = f"""
+SELECT qs.ord, m.id, m.document, m.cmetadata
+FROM unnest(CAST(:queries AS text[])) WITH ORDINALITY AS qs(query, ord)
+CROSS JOIN LATERAL (
+    SELECT e.id, e.document, e.cmetadata, ts_rank(e.{TSV_COLUMN}, tsq.q, 1) AS score
+    FROM {EMBEDDING_TABLE} e, (SELECT {_TSQUERY.format(query="qs.query")} AS q) tsq
+    WHERE e.collection_id = {_COLLECTION_ID} AND e.{TSV_COLUMN} @@ tsq.q
+    ORDER BY score DESC
+    LIMIT :k
+) m
+ORDER BY qs.ord, m.score DESC
+"""
+
+_HYBRID_SQL = f"""
+WITH vector AS (
+    SELECT id, row_number() OVER (ORDER BY distance) AS rank
+    FROM (
+        SELECT id, embedding <=> CAST(:embedding AS vector) AS distance
+        FROM {EMBEDDING_TABLE}
+        WHERE collection_id = {_COLLECTION_ID}
+        ORDER BY distance
+        LIMIT :vector_k
+    ) v
+),
+keyword AS (
+    SELECT id, row_number() OVER (ORDER BY score DESC) AS rank
+    FROM (
+        SELECT e.id, ts_rank(e.{TSV_COLUMN}, tsq.q, 1) AS score
+        FROM {EMBEDDING_TABLE} e, (SELECT {_TSQUERY.format(query=":query")} AS q) tsq
+        WHERE e.collection_id = {_COLLECTION_ID} AND e.{TSV_COLUMN} @@ tsq.q
+        ORDER BY score DESC
+        LIMIT :keyword_k
+    ) k
+)
+SELECT e.id, e.document, e.cmetadata,
+    COALESCE(CAST(:vector_weight AS float8) / (:c + vector.rank), 0)
+    + COALESCE(CAST(:keyword_weight AS float8) / (:c + keyword.rank), 0) AS score
+FROM vector
+FULL OUTER JOIN keyword ON keyword.id = vector.id
+JOIN {EMBEDDING_TABLE} e ON e.id = COALESCE(vector.id, keyword.id)
+ORDER BY score DESC, vector.rank NULLS LAST
+LIMIT :k
+"""
+
+
+def or_query(query: str) -> str:
+    """
+    Rewrite a question as a `websearch_to_tsquery` query matching any of its words.
+
+    Only word characters are kept, so quotes and leading `-` in the question
+    cannot turn into phrase or negation operators; the words are joined with
+    the `or` operator and the text search configuration normalizes each one.
+
+    Args:
+        query (str): The question.
+
+    Returns:
+        str: The words joined with ` or `; empty when the question has none.
+    """
+    return " or ".join(word for word in _WORD.findall(query) if word.lower() != "or")
+
+
+def _to_document(row) -> Document:
+    return Document(id=row.id, page_content=row.document, metadata=row.cmetadata or {})
+
+
+class PostgresKeywordRetriever(BaseRetriever):
+    """
+    Keyword retriever over the PGVector collection's full-text index.
+
+    Matches the query against the `document_tsv` column (a stored
+    `tsvector` of each chunk with a GIN index, created by
+    `etl/ann_index.py fulltext`) and ranks matches with `ts_rank`. The corpus
+    stays in Postgres, so API workers hold no copy of it.
+    """
+
+    engine: Any
+    collection_name: str
+    k: int = 4
+    config: str = "simple"
+    """Text search configuration; must match the one the column was built with."""
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.search_batch([query])[0]
+
+    def search_batch(self, queries: List[str]) -> List[List[Document]]:
+        """
+        Retrieve documents for many queries in one round-trip.
+
+        Args:
+            queries (List[str]): Queries.
+
+        Returns:
+            List[List[Document]]: Documents per query, best first.
+        """
+        results: List[List[Document]] = [[] for _ in queries]
+        if not queries:
+            return results
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text(_KEYWORD_BATCH_SQL),
+                {
+                    "queries": [or_query(q) for q in queries],
+                    "collection": self.collection_name,
+                    "config": self.config,
+                    "k": self.k,
+                }
+            )
+            for row in rows:
+                results[row.ord - 1].append(_to_document(row))
+        return results
+
+
+class PostgresHybridRetriever(BaseRetriever):
+    """
+    Hybrid retriever that fuses vector and keyword results inside Postgres.
+
+    One statement runs the ANN search on the embedding column and the
+    full-text search on `document_tsv`, then combines both rankings with
+    weighted reciprocal rank fusion (`weight / (c + rank)`, as
+    `EnsembleRetriever` does in process). Hybrid retrieval costs a single
+    round-trip and no in-process corpus, at the price of the per-branch
+    timeouts: the statement is bounded by `DB_STATEMENT_TIMEOUT_MS` as a whole.
+    """
+
+    engine: Any
+    collection_name: str
+    embeddings: Embeddings
+    vector_k: int = 3
+    keyword_k: int = 3
+    k: Optional[int] = None
+    """Fused documents to return, None for all of them."""
+    weights: List[float] = [0.5, 0.5]
+    c: int = 60
+    config: str = "simple"
+
+    def reset_after_fork(self) -> None:
+        """Nothing to recreate; connections come from the pipeline's engine, disposed after fork"""
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self.search_by_vectors([query], [self.embeddings.embed_query(query)])[0]
+
+    def search_by_vectors(self, queries: List[str], vectors: List[List[float]]) -> List[List[Document]]:
+        """
+        Retrieve fused documents for already embedded queries.
+
+        Args:
+            queries (List[str]): Queries.
+            vectors (List[List[float]]): Query embeddings aligned with `queries`.
+
+        Returns:
+            List[List[Document]]: Fused documents per query, best first.
+        """
+        results = []
+        with self.engine.connect() as conn:
+            for query, vector in zip(queries, vectors):
+                with timed_stage("retrieve_hybrid_sql"):
+                    rows = conn.execute(
+                        text(_HYBRID_SQL),
+                        {
+                            "query": or_query(query),
+                            "embedding": "[" + ",".join(str(float(x)) for x in vector) + "]",
+                            "collection": self.collection_name,
+                            "config": self.config,
+                            "vector_k": self.vector_k,
+                            "keyword_k": self.keyword_k,
+                            "vector_weight": self.weights[0],
+                            "keyword_weight": self.weights[1],
+                            "c": self.c,
+                            "k": self.k if self.k is not None else self.vector_k + self.keyword_k,
+                        }
+                    ).all()
+                docs = [_to_document(row) for row in rows]
+                record_documents("fusion", len(docs))
+                results.append(docs)
+        return results
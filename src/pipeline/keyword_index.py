@@ -0,0 +1,172 @@
+# src/pipeline/keyword_index.py
+import os
+import json
+import mmap
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from scipy import sparse
+from common.index_format import KEYWORD_INDEX_FORMAT, ChunkStore, tokenize
+from pipeline.bm25 import BM25Matrix, top_k_indices
+from pipeline.utils import init_logger
+
+logger = init_logger()
+
+
+class TermVocab:
+    """
+    Term -> term id lookup over the sorted term list of a persisted index (`terms.bin` plus byte offsets).
+
+    Terms are stored in byte order and a term's position is its id, so a
+    lookup is a binary search over the memory-mapped file; nothing is loaded
+    into the heap.
+    """
+
+    def __init__(self, index_dir: str):
+        """
+        Open the term list of an index.
+
+        Args:
+            index_dir (str): Directory containing `terms.bin` and `term_offsets.npy`.
+        """
+        self.offsets = np.load(os.path.join(index_dir, "term_offsets.npy"), mmap_mode="r")
+        self._size = len(self.offsets) - 1
+        with open(os.path.join(index_dir, "terms.bin"), "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.offsets[-1] else b""
+
+    def _term(self, term_id: int) -> bytes:
+        return self._data[self.offsets[term_id]:self.offsets[term_id + 1]]
+
+    def get(self, term: str, default: Optional[int] = None) -> Optional[int]:
+        """
+        Look a term up.
+
+        Args:
+            term (str): The term.
+            default (Optional[int]): Returned when the term is not in the index.
+
+        Returns:
+            Optional[int]: The term id, or `default`.
+        """
+        key = term.encode("utf-8")
+        lo, hi = 0, self._size
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._term(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo if lo < self._size and self._term(lo) == key else default
+
+    def __contains__(self, term: str) -> bool:
+        return self.get(term) is not None
+
+    def __len__(self) -> int:
+        return self._size
+
+
+class KeywordIndex:
+    """
+    Read-only BM25 index written by `etl/indexing.py`.
+
+    The BM25 weight matrix, the term list and the chunk records are all
+    memory-mapped: the sparse matrix wraps the persisted arrays without a
+    copy, terms are found by binary search and chunks are decoded only when
+    they are returned. Loading is cheap and the pages are shared through the
+    page cache between worker processes.
+    """
+
+    def __init__(self, index_dir: str):
+        """
+        Load the index from the specified directory.
+
+        Args:
+            index_dir (str): Directory containing the persisted index.
+        """
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != KEYWORD_INDEX_FORMAT:
+            raise ValueError(f"Unsupported keyword index format: {meta.get('format')}")
+
+        self.index_dir = index_dir
+        self.version = meta["version"]
+        self.k1 = meta["k1"]
+        self.b = meta["b"]
+        self.avgdl = meta["avgdl"]
+        self.num_docs = meta["num_docs"]
+
+        load = lambda name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r")
+        self.idf = load("idf")
+        self.doc_lengths = load("doc_lengths")
+        self.indptr = load("postings_indptr")
+        self.postings_docs = load("postings_docs")
+        self.postings_weights = load("postings_weights")
+        self.vocab = TermVocab(index_dir)
+        self.chunks = ChunkStore(index_dir, self.num_docs)
+
+        # BM25 weights are computed at build time; indices and indptr share a
+        # dtype, so the CSR matrix is a view of the memory-mapped arrays
+        weights = sparse.csr_matrix(
+            (self.postings_weights, self.postings_docs, self.indptr),
+            shape=(len(self.vocab), self.num_docs),
+            copy=False
+        )
+        self.matrix = BM25Matrix(weights, self.vocab)
+        logger.info(f"Keyword index {self.version} loaded from {index_dir} ({self.num_docs} chunks)")
+
+    def get_scores(self, tokens: List[str]) -> np.ndarray:
+        """
+        Compute BM25 (Okapi) scores of every chunk for the query tokens.
+
+        Args:
+            tokens (List[str]): Query tokens.
+
+        Returns:
+            np.ndarray: Score per chunk.
+        """
+        return self.matrix.get_scores(tokens)
+
+    def get_document(self, doc_idx: int) -> Document:
+        """
+        Decode a chunk from the index.
+
+        Args:
+            doc_idx (int): Position of the chunk in the index.
+
+        Returns:
+            Document: The chunk with its id and metadata.
+        """
+        return self.chunks.get(doc_idx)
+
+
+class KeywordIndexRetriever(BaseRetriever):
+    """Drop-in replacement for `BM25Retriever` backed by a persisted `KeywordIndex`."""
+
+    index: Any
+    k: int = 4
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        if not self.index.num_docs:
+            return []
+        top = top_k_indices(self.index.get_scores(tokenize(query)), self.k)
+        return [self.index.get_document(int(i)) for i in top]
+
+    def search_batch(self, queries: List[str]) -> List[List[Document]]:
+        """
+        Retrieve chunks for many queries with one scoring pass.
+
+        Args:
+            queries (List[str]): Queries.
+
+        Returns:
+            List[List[Document]]: Chunks per query, best first.
+        """
+        if not self.index.num_docs:
+            return [[] for _ in queries]
+        tops = self.index.matrix.top_k_batch([tokenize(query) for query in queries], self.k)
+        return [[self.index.get_document(int(i)) for i in top] for top in tops]
@@ -1,5 +1,6 @@
 # src/pipeline/llm.py
 import os
+from typing import Optional
 from langchain_groq import ChatGroq
 from pipeline.utils import init_logger
 from dotenv import load_dotenv, find_dotenv
@@ -8,12 +9,13 @@ load_dotenv(find_dotenv())
 
 logger = init_logger()
 
-def get_llm(model: str = "llama-3.1-8b-instant"):
+def get_llm(model: str = "llama-3.1-8b-instant", base_url: Optional[str] = None):
     """
     Initialize the LLM pipeline with the specified model name.
 
     Args:
         model (str): The name of the model to use for LLM.
+        base_url (Optional[str]): API base URL; defaults to `GROQ_BASE_URL` or the Groq API.
 
     Returns:
         ChatGroq: The initialized LLM pipeline.
@@ -22,6 +24,7 @@ def get_llm(model: str = "llama-3.1-8b-instant"):
         model=model,
         temperature=0.1,
         api_key=os.getenv("GROQ_API_KEY"),
+        base_url=base_url or os.getenv("GROQ_BASE_URL") or None,
         max_retries=3,
         streaming=True,
     )
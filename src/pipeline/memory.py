@@ -0,0 +1,66 @@
+# src/pipeline/memory.py
+import os
+from typing import Dict, List, Union
+
+# Fields of /proc/<pid>/smaps_rollup, in kB
+_SMAPS_FIELDS = {
+    "Rss": "rss",
+    "Pss": "pss",
+    "Shared_Clean": "shared",
+    "Shared_Dirty": "shared",
+    "Private_Clean": "private",
+    "Private_Dirty": "private",
+    "Swap": "swap",
+}
+
+
+def read_process_memory(pid: Union[int, str] = "self") -> Dict[str, int]:
+    """
+    Read the memory breakdown of a process (Linux).
+
+    `rss` counts every resident page, including pages shared with the parent
+    and the other workers. `pss` divides shared pages among the processes
+    sharing them, so the PSS of all workers adds up to their real footprint.
+    `private` (USS) is what the process alone holds, i.e. the memory freed
+    when it exits, which is the per-worker cost of pre-fork serving.
+
+    Args:
+        pid (Union[int, str]): Process id, or "self".
+
+    Returns:
+        Dict[str, int]: Bytes per kind (rss, pss, shared, private, swap);
+            only rss when smaps_rollup is unavailable.
+    """
+    memory = {kind: 0 for kind in _SMAPS_FIELDS.values()}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup", encoding="ascii") as f:
+            for line in f:
+                name, _, value = line.partition(":")
+                kind = _SMAPS_FIELDS.get(name)
+                if kind is not None:
+                    memory[kind] += int(value.split()[0]) * 1024
+        return memory
+    except OSError:
+        pass
+    with open(f"/proc/{pid}/status", encoding="ascii") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return {"rss": int(line.split()[1]) * 1024}
+    return {}
+
+
+def collect_memory_metrics() -> List[str]:
+    """Exposition lines for the memory of the current process"""
+    try:
+        memory = read_process_memory()
+    except OSError:
+        return []
+    lines = [
+        "# HELP rag_process_memory_bytes Memory of this worker process by kind (rss, pss, shared, private).",
+        "# TYPE rag_process_memory_bytes gauge",
+    ]
+    lines += [
+        f'rag_process_memory_bytes{{kind="{kind}",pid="{os.getpid()}"}} {value}'
+        for kind, value in sorted(memory.items())
+    ]
+    return lines
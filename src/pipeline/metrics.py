@@ -0,0 +1,346 @@
+# src/pipeline/metrics.py
+import os
+import glob
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+from pipeline.utils import init_logger
+
+logger = init_logger()
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096)
+
+
+def _format_labels(labelnames: Sequence[str], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(labelnames, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    return str(int(value)) if float(value).is_integer() else repr(float(value))
+
+
+def _add_label(line: str, label: str) -> str:
+    """Add a label to an exposition sample line; comments are returned unchanged"""
+    if not line or line.startswith("#"):
+        return line
+    series, value = line.split(" ", 1)
+    if "{" in series:
+        series = series.replace("{", "{" + label + ",", 1)
+    else:
+        series = series + "{" + label + "}"
+    return f"{series} {value}"
+
+
+def _merge_expositions(texts: List[str]) -> List[str]:
+    """
+    Merge expositions of several processes into one.
+
+    Samples of a metric are grouped under a single HELP/TYPE header, as the
+    text format requires.
+
+    Args:
+        texts (List[str]): Expositions with distinct label sets (e.g. one `worker` each).
+
+    Returns:
+        List[str]: Exposition lines.
+    """
+    headers: Dict[str, List[str]] = {}
+    samples: Dict[str, List[str]] = {}
+    for text in texts:
+        name = ""
+        for line in text.splitlines():
+            if not line:
+                continue
+            if line.startswith("# "):
+                name = line.split(" ", 3)[2]
+                if line not in headers.setdefault(name, []):
+                    headers[name].append(line)
+                samples.setdefault(name, [])
+            else:
+                headers.setdefault(name, [])
+                samples.setdefault(name, []).append(line)
+    lines = []
+    for name, header in headers.items():
+        lines.extend(header)
+        lines.extend(samples[name])
+    return lines
+
+
+def shared_metrics_path(directory: str, worker: str) -> str:
+    """File a worker publishes its metrics to (see `Registry.share`)"""
+    return os.path.join(directory, f"worker-{worker}.prom")
+
+
+class Counter:
+    """Monotonic counter with labels, rendered in the Prometheus text format."""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """Cumulative histogram with labels, rendered in the Prometheus text format."""
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = LATENCY_BUCKETS
+    ):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: bucket counts (non-cumulative, plus +Inf), sum
+        self._series: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = len(self.buckets)
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                index = i
+                break
+        with self._lock:
+            counts, total = self._series.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._series.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else _format_value(bound)
+                    labels = _format_labels(self.labelnames, key, f'le="{le}"')
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _format_labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {_format_value(total[0])}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+class Registry:
+    """
+    Collection of metrics exposed by `/api/v1/metrics`.
+
+    In a single process the exposition is this process's metrics. Pre-forked
+    workers (`src/prefork.py`) each call `share` with the same directory: a
+    scrape lands on whichever worker accepts it, and that worker renders
+    the metrics of every worker, each series labelled with its `worker`.
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+        self._shared_dir: Optional[str] = None
+        self._worker: Optional[str] = None
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector) -> None:
+        """Add a callable returning extra exposition lines (e.g. gauges read at scrape time)."""
+        self._collectors.append(collector)
+
+    def share(self, directory: str, worker: str, interval: float = 5.0) -> None:
+        """
+        Publish this process's metrics to a directory shared with sibling workers.
+
+        The worker's exposition, labelled `worker`, is rewritten every
+        `interval` seconds and on every scrape it serves, so series of the
+        other workers are at most `interval` seconds old.
+
+        Args:
+            directory (str): Directory shared by all workers.
+            worker (str): Stable name of this worker (its slot), kept across restarts.
+            interval (float): Seconds between publications.
+        """
+        self._shared_dir = directory
+        self._worker = worker
+        self._publish()
+        thread = threading.Thread(target=self._publish_loop, args=(interval,), name="metrics-publisher", daemon=True)
+        thread.start()
+
+    def _render_local(self) -> List[str]:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for collector in self._collectors:
+            try:
+                lines.extend(collector())
+            except Exception as e:
+                logger.warning(f"Metrics collector failed: {e}")
+        return lines
+
+    def _publish(self) -> None:
+        label = f'worker="{self._worker}"'
+        text = "\n".join(_add_label(line, label) for line in self._render_local()) + "\n"
+        path = shared_metrics_path(self._shared_dir, self._worker)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+
+    def _publish_loop(self, interval: float) -> None:
+        while True:
+            time.sleep(interval)
+            try:
+                self._publish()
+            except OSError as e:
+                logger.warning(f"Publishing metrics failed: {e}")
+
+    def render(self) -> str:
+        if self._shared_dir is None:
+            return "\n".join(self._render_local()) + "\n"
+        self._publish()
+        texts = []
+        for path in sorted(glob.glob(shared_metrics_path(self._shared_dir, "*"))):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    texts.append(f.read())
+            except FileNotFoundError:
+                continue
+        return "\n".join(_merge_expositions(texts)) + "\n"
+
+
+REGISTRY = Registry()
+REQUESTS = REGISTRY.register(Counter(
+    "rag_requests_total", "Questions processed, by retrieval method and outcome.", ("method", "status")
+))
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    "rag_stage_duration_seconds", "Duration of each pipeline stage.", ("stage", "method")
+))
+DOCUMENTS = REGISTRY.register(Histogram(
+    "rag_stage_documents", "Candidate documents produced by a retrieval stage.", ("stage", "method"), COUNT_BUCKETS
+))
+RETRIEVER_FAILURES = REGISTRY.register(Counter(
+    "rag_retriever_failures_total", "Hybrid branches skipped after a timeout or error.", ("retriever", "reason")
+))
+LLM_TTFT_SECONDS = REGISTRY.register(Histogram(
+    "rag_llm_time_to_first_token_seconds", "Time from the LLM call to its first answer token.", ("model",)
+))
+LLM_TOKENS = REGISTRY.register(Histogram(
+    "rag_llm_tokens", "Tokens per LLM call.", ("model", "kind"), TOKEN_BUCKETS
+))
+
+_current_trace: ContextVar[Optional["RequestTrace"]] = ContextVar("rag_request_trace", default=None)
+
+
+class RequestTrace:
+    """
+    Per-request timings and counts.
+
+    Every recorded value also feeds the process-wide metrics. While a trace is
+    active (see `activate`), retrievers record into it through `timed_stage`
+    and `record_documents` without it being passed down explicitly.
+    """
+
+    def __init__(self, method: str):
+        self.method = method
+        self.stages_ms: Dict[str, float] = {}
+        self.documents: Dict[str, int] = {}
+        self.time_to_first_token_ms: Optional[float] = None
+        self.prompt_tokens: Optional[int] = None
+        self.completion_tokens: Optional[int] = None
+
+    def record(self, stage: str, seconds: float) -> None:
+        self.stages_ms[stage] = round(self.stages_ms.get(stage, 0.0) + seconds * 1000, 3)
+        STAGE_SECONDS.observe(seconds, stage=stage, method=self.method)
+
+    def count(self, stage: str, documents: int) -> None:
+        self.documents[stage] = documents
+        DOCUMENTS.observe(documents, stage=stage, method=self.method)
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def llm_usage(self, model: str, ttft_seconds: Optional[float], prompt_tokens: Optional[int], completion_tokens: Optional[int]) -> None:
+        if ttft_seconds is not None:
+            self.time_to_first_token_ms = round(ttft_seconds * 1000, 3)
+            LLM_TTFT_SECONDS.observe(ttft_seconds, model=model)
+        if prompt_tokens is not None:
+            self.prompt_tokens = prompt_tokens
+            LLM_TOKENS.observe(prompt_tokens, model=model, kind="prompt")
+        if completion_tokens is not None:
+            self.completion_tokens = completion_tokens
+            LLM_TOKENS.observe(completion_tokens, model=model, kind="completion")
+
+    @contextmanager
+    def activate(self) -> Iterator["RequestTrace"]:
+        token = _current_trace.set(self)
+        try:
+            yield self
+        finally:
+            _current_trace.reset(token)
+
+    def summary(self) -> Dict:
+        return {
+            "stages_ms": dict(self.stages_ms),
+            "documents": dict(self.documents),
+            "time_to_first_token_ms": self.time_to_first_token_ms,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+        }
+
+
+def current_trace() -> Optional[RequestTrace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def timed_stage(name: str) -> Iterator[None]:
+    """Time a stage into the active request trace, or only into the metrics when there is none."""
+    trace = current_trace()
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - start
+        if trace is not None:
+            trace.record(name, elapsed)
+        else:
+            STAGE_SECONDS.observe(elapsed, stage=name, method="")
+
+
+def record_documents(stage: str, documents: int) -> None:
+    """Record the candidate count of a retrieval stage."""
+    trace = current_trace()
+    if trace is not None:
+        trace.count(stage, documents)
+    else:
+        DOCUMENTS.observe(documents, stage=stage, method="")
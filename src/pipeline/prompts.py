@@ -0,0 +1,23 @@
+# src/pipeline/prompts.py
+from langchain_core.prompts import ChatPromptTemplate
+
+# Vendored copy of the "rlm/rag-prompt" prompt from the LangChain Hub, so
+# startup does not depend on the network
+RAG_PROMPT_TEMPLATE = (
+    "You are an assistant for question-answering tasks. Use the following pieces of retrieved context "
+    "to answer the question. If you don't know the answer, just say that you don't know. "
+    "Use three sentences maximum and keep the answer concise.\n"
+    "Question: {question} \n"
+    "Context: {context} \n"
+    "Answer:"
+)
+
+
+def get_rag_prompt() -> ChatPromptTemplate:
+    """
+    Get the prompt used by the generation chain.
+
+    Returns:
+        ChatPromptTemplate: The RAG prompt with `context` and `question` inputs.
+    """
+    return ChatPromptTemplate.from_messages([("human", RAG_PROMPT_TEMPLATE)])
@@ -1,49 +1,401 @@
 import os
-from typing import Dict, Any
+import time
+import asyncio
+import hashlib
+import threading
+import contextvars
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, List, AsyncIterator, Iterator, Optional, Union
 from dotenv import load_dotenv, find_dotenv
-from langchain import hub
-from langchain.schema.runnable import RunnablePassthrough
-from langchain.schema.output_parser import StrOutputParser
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_unstructured import UnstructuredLoader
+from langchain.schema import Document
+from langchain_core.rate_limiters import InMemoryRateLimiter
 
-from pipeline.embedding import embedding_pipeline
+from pipeline.cache import SemanticCache
+from pipeline.context import ContextAssembler
+from pipeline.embedding import embedding_pipeline, BatchingEmbeddings
 from pipeline.llm import get_llm
-from pipeline.retriever import get_vector_store, get_native_retriever, get_hybrid_retriever
+from pipeline.prompts import get_rag_prompt
+from pipeline.metrics import REGISTRY, REQUESTS, RequestTrace, record_documents, timed_stage
+from pipeline.db import get_engine, get_async_engine
+from pipeline.keyword_index import KeywordIndex
+from pipeline.singleflight import SingleFlight, normalize_query
+from pipeline.snapshot import IndexSnapshot
+from common.chunking import load_corpus_chunks, load_document_chunks
+from common.snapshot import read_current_snapshot, resolve_index_dirs
+from pipeline.vector_index import VectorIndex
+from pipeline.retriever import (
+    apply_search_settings,
+    get_vector_store,
+    get_native_retriever,
+    get_keyword_retriever,
+    get_fulltext_retriever,
+    get_hybrid_retriever,
+    get_reranker,
+    get_sql_hybrid_retriever,
+    get_memmap_retriever
+)
 from pipeline.utils import init_logger
-from models import RetrievalMethod, Metadata
+from models import RetrievalMethod, Metadata, QuestionRequest, Timings
 
 load_dotenv(find_dotenv())
 
 logger = init_logger()
 
 class RAGPipeline:
-    def __init__(self, PATH: str):
+    def __init__(
+        self,
+        PATH: str,
+        keyword_index_dir: Optional[str] = None,
+        vector_index_dir: Optional[str] = None,
+        snapshots_dir: Optional[str] = None
+    ):
         """
         Initialize the RAG pipeline with the specified path.
 
         Args:
-            PATH (str): The path to the documents to be used for keyword search.
-        """
-        self.connection_string = (
-            f"postgresql+psycopg://"
-            f"{os.getenv('POSTGRES_USER')}:"
-            f"{os.getenv('POSTGRES_PASSWORD')}@"
-            f"{os.getenv('POSTGRES_HOST')}:"
-            f"{os.getenv('POSTGRES_PORT')}/"
-            f"{os.getenv('POSTGRES_DB')}"
-        )
+            PATH (str): The directory of per-document text files written by
+                `etl/indexing.py` (or a single text file), used for keyword search.
+            keyword_index_dir (Optional[str]): The persisted keyword index written by
+                `etl/indexing.py`. When present it is memory-mapped instead of
+                re-splitting PATH and rebuilding BM25 at startup.
+            vector_index_dir (Optional[str]): The embedding matrix exported by
+                `etl/indexing.py`. When present it enables the in-process
+                `memmap` retrieval method.
+            snapshots_dir (Optional[str]): The versioned index snapshots published by
+                `etl/indexing.py`. When one is published, its indexes are used instead
+                of the two directories above, and `reload` swaps in newer ones.
+        """
         self.collection_name = os.getenv('COLLECTION_NAME')
         self.path = PATH
-        self.embeddings = embedding_pipeline()
+        self.embeddings = BatchingEmbeddings(
+            embedding_pipeline(),
+            cache_size=int(os.getenv("EMBEDDING_CACHE_SIZE", "2048")),
+            max_batch_size=int(os.getenv("EMBEDDING_BATCH_SIZE", "32")),
+            max_wait_ms=float(os.getenv("EMBEDDING_MAX_WAIT_MS", "5"))
+        )
         self.model = "llama-3.1-8b-instant"
 
-        self.chunks = self.load_split_documents(self.path)
-        self.vector_store = get_vector_store(self.embeddings, self.collection_name, self.connection_string)
+        # "memory" keeps a BM25 index in each worker; "postgres" searches the
+        # collection's full-text index, so no corpus is loaded here
+        self.keyword_backend = os.getenv("KEYWORD_BACKEND", "memory").lower()
+        self.hybrid_fusion = os.getenv("HYBRID_FUSION", "client").lower()
+        self.fulltext_config = os.getenv("FULLTEXT_CONFIG", "simple")
+        if self.keyword_backend not in ("memory", "postgres"):
+            raise ValueError(f"Unknown keyword backend: {self.keyword_backend}. Valid backends are: ['memory', 'postgres']")
+        if self.hybrid_fusion not in ("client", "sql"):
+            raise ValueError(f"Unknown hybrid fusion: {self.hybrid_fusion}. Valid values are: ['client', 'sql']")
+        if self.hybrid_fusion == "sql" and self.keyword_backend != "postgres":
+            raise ValueError("HYBRID_FUSION=sql requires KEYWORD_BACKEND=postgres")
+
+        # Process-wide defaults set on every pooled connection, not per request
+        self.ef_search = int(os.getenv("VECTOR_DEFAULT_EF_SEARCH") or 0) or None
+        self.probes = int(os.getenv("VECTOR_DEFAULT_PROBES") or 0) or None
+        self.engine = get_engine()
+        self.async_engine = get_async_engine()
+        apply_search_settings(self.engine, ef_search=self.ef_search, probes=self.probes)
+        apply_search_settings(self.async_engine.sync_engine, ef_search=self.ef_search, probes=self.probes)
+
+        self.vector_store = get_vector_store(self.embeddings, self.collection_name, self.engine)
         self.native_retriever = get_native_retriever(self.vector_store)
-        self.hybrid_retriever = get_hybrid_retriever(self.native_retriever, self.chunks)
+        # Async-only store so the native path awaits Postgres instead of using a thread
+        self.async_vector_store = get_vector_store(self.embeddings, self.collection_name, self.async_engine)
+        self.async_native_retriever = get_native_retriever(self.async_vector_store)
+        self.vector_timeout = float(os.getenv("HYBRID_VECTOR_TIMEOUT_MS", "2000")) / 1000
+        self.keyword_timeout = float(os.getenv("HYBRID_KEYWORD_TIMEOUT_MS", "1000")) / 1000
+        self.compressor = get_reranker()
+
+        # Retrieval (embedding, PGVector, BM25, Flashrank, memmap scans) is
+        # blocking, so the async path runs it on a bounded pool instead of the
+        # event loop.
+        self.executor_workers = int(os.getenv("RAG_EXECUTOR_WORKERS", "4"))
+        self.executor = ThreadPoolExecutor(max_workers=self.executor_workers, thread_name_prefix="rag-worker")
+
+        # Index-dependent retrievers live in a snapshot that `reload` replaces
+        self.keyword_index_dir = keyword_index_dir
+        self.vector_index_dir = vector_index_dir
+        self.snapshots_dir = snapshots_dir
+        self.reloads = 0
+        self._reload_lock = threading.Lock()
+        self.snapshot = self._load_snapshot(*resolve_index_dirs(snapshots_dir, keyword_index_dir, vector_index_dir))
         self.llm = get_llm(self.model)
         self._init_chains()
+        self.context_assembler = ContextAssembler(
+            token_budget=int(os.getenv("CONTEXT_TOKEN_BUDGET", "1500")) or None,
+            duplicate_threshold=float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.9")),
+            min_overlap_chars=int(os.getenv("CONTEXT_MIN_OVERLAP_CHARS", "50"))
+        )
+
+        self.max_concurrency = int(os.getenv("RAG_MAX_CONCURRENCY", "32"))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.in_flight = 0
+
+        # Batch requests answer their questions concurrently; the LLM calls of
+        # all batches share one rate limit so bulk work stays within the
+        # provider's quota
+        self.batch_llm_concurrency = int(os.getenv("BATCH_LLM_CONCURRENCY", "8"))
+        requests_per_second = float(os.getenv("BATCH_LLM_REQUESTS_PER_SECOND", "0"))
+        self.batch_rate_limiter = InMemoryRateLimiter(
+            requests_per_second=requests_per_second,
+            check_every_n_seconds=0.05,
+            max_bucket_size=self.batch_llm_concurrency
+        ) if requests_per_second > 0 else None
+
+        self.expose_timings = os.getenv("RESPONSE_TIMINGS_ENABLED", "false").lower() == "true"
+        self.answer_cache = None
+        if os.getenv("SEMANTIC_CACHE_ENABLED", "false").lower() == "true":
+            self.answer_cache = SemanticCache(
+                threshold=float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.95")),
+                ttl=float(os.getenv("SEMANTIC_CACHE_TTL", "3600")),
+                max_entries=int(os.getenv("SEMANTIC_CACHE_MAX_ENTRIES", "1024")),
+                max_bytes=int(float(os.getenv("SEMANTIC_CACHE_MAX_MB", "64")) * 1024 * 1024)
+            )
+        # Identical questions asked while one is being answered wait for that
+        # answer instead of repeating retrieval and the LLM call
+        self.inflight = None
+        if os.getenv("QUERY_COALESCING_ENABLED", "true").lower() == "true":
+            self.inflight = SingleFlight()
+        REGISTRY.add_collector(self._collect_metrics)
+
+    def warmup(self) -> None:
+        """
+        Exercise each component once so the first request does not pay for
+        lazy initialization (model graphs, database connections, index pages).
+
+        Returns:
+            None
+        """
+        start = time.perf_counter()
+        # embed_queries runs on this thread, so no batching thread is started
+        # in a pre-fork master
+        vector = self.embeddings.embed_queries(["warmup"])[0]
+        candidates = self._warm_snapshot(self.snapshot, vector)
+        self.compressor.compress_documents(candidates, "warmup")
+        try:
+            with self.engine.connect():
+                pass
+            if self.keyword_backend == "postgres":
+                # Also fails early when the full-text column was never created
+                self.snapshot.keyword_retriever.invoke("warmup")
+        except Exception as e:
+            # Retrieval reconnects on demand; keyword and memmap methods still work
+            logger.warning(f"Database warmup failed: {e}")
+        logger.info(f"RAG pipeline warmed up in {time.perf_counter() - start:.1f} s")
+
+    def reset_after_fork(self, threads: Optional[int] = None) -> None:
+        """
+        Prepare a pipeline inherited through fork() for use in a worker.
+
+        The read-only assets (embedding weights, indexes, chunks, cached
+        answers) stay shared copy-on-write with the parent. Thread pools,
+        locks, pooled connections and inference sessions are per-process
+        and are recreated.
+
+        Args:
+            threads (Optional[int]): Inference threads per model in this worker, None to keep the default.
+
+        Returns:
+            None
+        """
+        # Connections opened by the parent must not be used by the children
+        self.engine.dispose(close=False)
+        self.async_engine.sync_engine.dispose(close=False)
+        self.executor = ThreadPoolExecutor(max_workers=self.executor_workers, thread_name_prefix="rag-worker")
+        if self.snapshot.memmap_retriever is not None:
+            self.snapshot.memmap_retriever.executor = self.executor
+        self.embeddings.reset_after_fork(threads)
+        self.snapshot.hybrid_retriever.base_retriever.reset_after_fork()
+        self.compressor.reset_after_fork(threads)
+        self._reload_lock = threading.Lock()
+
+    def _load_snapshot(
+        self, name: Optional[str], keyword_index_dir: Optional[str], vector_index_dir: Optional[str]
+    ) -> IndexSnapshot:
+        """
+        Load one version of the indexes and build the retrievers over them.
+
+        The embedding model, reranker and database engines are shared by
+        every snapshot; only the indexes and the retrievers using them are new.
+
+        Args:
+            name (Optional[str]): Snapshot name, None for the unversioned directories.
+            keyword_index_dir (Optional[str]): The persisted keyword index.
+            vector_index_dir (Optional[str]): The exported embedding matrix.
+
+        Returns:
+            IndexSnapshot: The retrieval state of this version.
+        """
+        keyword_index = None
+        chunks = None
+        if self.keyword_backend == "memory":
+            if keyword_index_dir and os.path.exists(os.path.join(keyword_index_dir, "meta.json")):
+                keyword_index = KeywordIndex(keyword_index_dir)
+            else:
+                logger.warning("Persisted keyword index not found, building BM25 from documents")
+                chunks = self.load_split_documents(self.path)
+
+        vector_index = None
+        memmap_retriever = None
+        if vector_index_dir and os.path.exists(os.path.join(vector_index_dir, "meta.json")):
+            vector_index = VectorIndex(
+                vector_index_dir,
+                use_int8=os.getenv("VECTOR_INDEX_INT8", "true").lower() == "true",
+                rescore_factor=int(os.getenv("VECTOR_INDEX_RESCORE_FACTOR", "4"))
+            )
+            memmap_retriever = get_memmap_retriever(vector_index, self.embeddings, executor=self.executor)
+        else:
+            logger.warning("Exported vector index not found, memmap retrieval is disabled")
+
+        if self.keyword_backend == "postgres":
+            keyword_retriever = get_fulltext_retriever(self.engine, self.collection_name, config=self.fulltext_config)
+        else:
+            keyword_retriever = get_keyword_retriever(chunks=chunks, index=keyword_index)
+        if self.hybrid_fusion == "sql":
+            hybrid_retriever = get_sql_hybrid_retriever(
+                self.engine, self.collection_name, self.embeddings, config=self.fulltext_config, compressor=self.compressor
+            )
+        else:
+            hybrid_retriever = get_hybrid_retriever(
+                self.native_retriever,
+                keyword_retriever,
+                vector_timeout=self.vector_timeout,
+                keyword_timeout=self.keyword_timeout,
+                compressor=self.compressor
+            )
+
+        if keyword_index is not None:
+            version = f"{self.collection_name}:{keyword_index.version}"
+        elif name is not None:
+            version = f"{self.collection_name}:{name}"
+        else:
+            version = self._compute_index_version(self.path)
+        return IndexSnapshot(
+            name=name,
+            version=version,
+            keyword_retriever=keyword_retriever,
+            hybrid_retriever=hybrid_retriever,
+            keyword_index=keyword_index,
+            chunks=chunks,
+            vector_index=vector_index,
+            memmap_retriever=memmap_retriever
+        )
+
+    def _warm_snapshot(self, snapshot: IndexSnapshot, vector: List[float]) -> List[Document]:
+        """Touch the in-process indexes of a snapshot; returns keyword candidates to warm the reranker with"""
+        candidates = [Document(page_content="warmup")]
+        if self.keyword_backend == "memory":
+            candidates = snapshot.keyword_retriever.invoke("warmup") or candidates
+        if snapshot.vector_index is not None:
+            snapshot.vector_index.search(vector, k=1)
+        return candidates
+
+    def snapshot_changed(self) -> bool:
+        """
+        Check whether `etl/indexing.py` has published a snapshot other than the loaded one.
+
+        Returns:
+            bool: True when `reload` would swap in a new snapshot.
+        """
+        name = read_current_snapshot(self.snapshots_dir)
+        return name is not None and name != self.snapshot.name
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        Load the current index snapshot and swap it in (blocking).
+
+        The new indexes are loaded and warmed up while requests keep being
+        served from the old snapshot, then replace it with one assignment.
+        Requests already in flight finish on the snapshot they started with;
+        its memory is released once the last of them completes. Answers
+        cached for the old version are no longer returned.
+
+        Args:
+            force (bool): Reload even when the published snapshot is already
+                loaded, e.g. after rewriting unversioned index directories.
+
+        Returns:
+            bool: Whether a new snapshot was swapped in.
+        """
+        with self._reload_lock:
+            name, keyword_index_dir, vector_index_dir = resolve_index_dirs(
+                self.snapshots_dir, self.keyword_index_dir, self.vector_index_dir
+            )
+            if not force and (name is None or name == self.snapshot.name):
+                return False
+            start = time.perf_counter()
+            snapshot = self._load_snapshot(name, keyword_index_dir, vector_index_dir)
+            self._warm_snapshot(snapshot, self.embeddings.embed_queries(["warmup"])[0])
+            previous, self.snapshot = self.snapshot, snapshot
+            self.reloads += 1
+        logger.info(
+            f"Index snapshot {snapshot.name or 'unversioned'} ({snapshot.version}) swapped in for "
+            f"{previous.name or 'unversioned'} ({previous.version}) in {time.perf_counter() - start:.1f} s"
+        )
+        return True
+
+    async def _acquire_slot(self) -> None:
+        """Wait for one of the `RAG_MAX_CONCURRENCY` processing slots"""
+        await self._semaphore.acquire()
+        self.in_flight += 1
+
+    def _release_slot(self) -> None:
+        """Give back a slot taken with `_acquire_slot`"""
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def _collect_metrics(self) -> List[str]:
+        """Gauges and counters read at scrape time"""
+        lines = [
+            "# HELP rag_requests_in_flight Questions holding a concurrency slot.",
+            "# TYPE rag_requests_in_flight gauge",
+            f"rag_requests_in_flight {self.in_flight}",
+        ]
+        if self.answer_cache is not None:
+            lines += [
+                "# HELP rag_semantic_cache_entries Answers held by the semantic cache.",
+                "# TYPE rag_semantic_cache_entries gauge",
+                f"rag_semantic_cache_entries {len(self.answer_cache)}",
+                "# HELP rag_semantic_cache_lookups_total Semantic cache lookups by result.",
+                "# TYPE rag_semantic_cache_lookups_total counter",
+                f'rag_semantic_cache_lookups_total{{result="hit"}} {self.answer_cache.hits}',
+                f'rag_semantic_cache_lookups_total{{result="miss"}} {self.answer_cache.misses}',
+            ]
+        if self.inflight is not None:
+            lines += [
+                "# HELP rag_coalesced_queries_in_flight Distinct questions being answered for coalesced requests.",
+                "# TYPE rag_coalesced_queries_in_flight gauge",
+                f"rag_coalesced_queries_in_flight {len(self.inflight)}",
+                "# HELP rag_coalesced_requests_total Requests answered by an identical question already in flight.",
+                "# TYPE rag_coalesced_requests_total counter",
+                f"rag_coalesced_requests_total {self.inflight.shared}",
+            ]
+        snapshot = self.snapshot
+        lines += [
+            "# HELP rag_index_snapshot_info Index snapshot serving new requests.",
+            "# TYPE rag_index_snapshot_info gauge",
+            f'rag_index_snapshot_info{{snapshot="{snapshot.name or ""}",version="{snapshot.version}"}} 1',
+            "# HELP rag_index_snapshot_loaded_timestamp_seconds When the serving snapshot was loaded.",
+            "# TYPE rag_index_snapshot_loaded_timestamp_seconds gauge",
+            f"rag_index_snapshot_loaded_timestamp_seconds {snapshot.loaded_at}",
+            "# HELP rag_index_reloads_total Index snapshots swapped in since startup.",
+            "# TYPE rag_index_reloads_total counter",
+            f"rag_index_reloads_total {self.reloads}",
+        ]
+        return lines
+
+    def _compute_index_version(self, path: str) -> str:
+        """Fingerprint the keyword corpus and collection so cached answers are scoped to them"""
+        digest = hashlib.sha256()
+        if os.path.isdir(path):
+            files = [os.path.join(path, name) for name in sorted(os.listdir(path)) if name.endswith(".txt")]
+        else:
+            files = [path]
+        for file in files:
+            digest.update(os.path.basename(file).encode("utf-8") + b"\0")
+            with open(file, "rb") as f:
+                for block in iter(lambda: f.read(1 << 20), b""):
+                    digest.update(block)
+        return f"{self.collection_name}:{digest.hexdigest()[:16]}"
 
     def _get_retriever_config(self, method: RetrievalMethod) -> Dict[str, Any]:
         """Get retriever configuration based on method"""
@@ -53,78 +405,498 @@ class RAGPipeline:
                 "top_k": 3,
                 "collection": self.collection_name
             }
+        elif method == RetrievalMethod.MEMMAP:
+            return {
+                "type": "memmap",
+                "top_k": 3,
+                "collection": self.collection_name
+            }
         else:
             return {
                 "type": "hybrid",
                 "top_k": 3,
                 "vector_store_top_k": 3,
                 "bm25_top_k": 3,
+                "keyword_backend": self.keyword_backend,
+                "fusion": self.hybrid_fusion,
                 "weights": [0.5, 0.5],
                 "rerank_top_n": 5,
                 "collection": self.collection_name
             }
 
-    def load_split_documents(self, path: str):
+    @staticmethod
+    def load_split_documents(path: str):
         """
         Load documents from the specified path and split them into chunks.
 
+        Chunking goes through `common.chunking`, one document at a time, so the
+        chunks match the ones `etl/indexing.py` writes to the keyword index.
+
         Args:
-            path (str): The path to the documents to be used for keyword search.
+            path (str): A directory of per-document text files, or a single text file.
 
         Returns:
             list: A list of documents.
         """
-        text = UnstructuredLoader(path).load()
-    
-        text_splitter = RecursiveCharacterTextSplitter.from_tiktoken_encoder(
-            chunk_size=500,
-            chunk_overlap=100,
-            separators=[
-                "\n\n",
-                "\n",
-                " ",
-                ".",
-                ",",
-                "\u200b",  # Zero-width space
-                "\uff0c",  # Fullwidth comma
-                "\u3001",  # Ideographic comma
-                "\uff0e",  # Fullwidth full stop
-                "\u3002",  # Ideographic full stop
-                "",
-            ],
-        )
-        return text_splitter.split_documents(text)
+        if os.path.isdir(path):
+            return load_corpus_chunks(path)
+        return load_document_chunks(path)
 
     def _init_chains(self):
         """
-        Initialize both RAG chains.
+        Initialize the generation chain shared by both retrieval methods.
 
         Returns:
             None
         """
-        prompt = hub.pull("rlm/rag-prompt")
+        prompt = get_rag_prompt()
+
+        # Message chunks rather than strings, so token usage and the first
+        # token can be observed
+        self.generation_chain = prompt | self.llm
         
-        # Native chain
-        self.native_chain = (
-            {"context": self.native_retriever, "question": RunnablePassthrough()}
-            | prompt
-            | self.llm
-            | StrOutputParser()
+        logger.info("RAG chains initialized successfully")
+
+    def _validate_method(self, method: RetrievalMethod, snapshot: IndexSnapshot) -> None:
+        """
+        Validate the retrieval method.
+
+        Args:
+            method (RetrievalMethod): Retrieval method to validate
+            snapshot (IndexSnapshot): Index snapshot the request runs on
+
+        Raises:
+            ValueError: If the method is not supported
+        """
+        valid_methods = {RetrievalMethod.NATIVE, RetrievalMethod.HYBRID}
+        if snapshot.memmap_retriever is not None:
+            valid_methods.add(RetrievalMethod.MEMMAP)
+        if method not in valid_methods:
+            raise ValueError(
+                f"Invalid retrieval method: {method}. "
+                f"Valid methods are: {[m.name for m in valid_methods]}"
+            )
+
+    def validate_method(self, method: RetrievalMethod) -> None:
+        """
+        Check that the serving snapshot supports a retrieval method, before a request is accepted.
+
+        Args:
+            method (RetrievalMethod): Retrieval method to validate
+
+        Raises:
+            ValueError: If the method is not supported
+        """
+        self._validate_method(method, self.snapshot)
+
+    def _get_metadata(self, method: RetrievalMethod) -> Metadata:
+        """Build response metadata for the given method"""
+        return Metadata(
+            method=method,
+            model=self.model,
+            retriever_config=self._get_retriever_config(method)
         )
-        
-        # Hybrid chain
-        self.hybrid_chain = (
-            {"context": self.hybrid_retriever, "question": RunnablePassthrough()}
-            | prompt
-            | self.llm
-            | StrOutputParser()
+
+    def _cache_lookup(
+        self, vector: Optional[List[float]], method: RetrievalMethod, snapshot: IndexSnapshot
+    ) -> Optional[tuple[str, Metadata]]:
+        """Return a cached answer for a near-duplicate question, if any"""
+        if vector is None:
+            return None
+        hit = self.answer_cache.lookup(vector, method.value, snapshot.version)
+        if hit is None:
+            return None
+        answer, metadata = hit
+        return answer, metadata.model_copy(update={"cached": True})
+
+    def _cache_store(
+        self, vector: Optional[List[float]], method: RetrievalMethod, snapshot: IndexSnapshot, answer: str, metadata: Metadata
+    ) -> None:
+        """Remember a generated answer for later near-duplicate questions"""
+        if vector is not None:
+            self.answer_cache.add(vector, method.value, snapshot.version, answer, metadata)
+
+    def embed_for_cache(self, query: str) -> Optional[List[float]]:
+        """
+        Embed the query for the semantic cache.
+
+        Args:
+            query (str): User question
+
+        Returns:
+            Optional[List[float]]: Query embedding, or None when the cache is disabled
+        """
+        if self.answer_cache is None:
+            return None
+        return self.embeddings.embed_query(query)
+
+    async def aembed_for_cache(self, query: str) -> Optional[List[float]]:
+        """Async variant of `embed_for_cache`; the query joins the next embedding batch"""
+        if self.answer_cache is None:
+            return None
+        return await self.embeddings.aembed_query(query)
+
+    def retrieve(self, query: str, method: RetrievalMethod, snapshot: Optional[IndexSnapshot] = None) -> List[Document]:
+        """
+        Retrieve context documents for a query (blocking).
+
+        Args:
+            query (str): User question
+            method (RetrievalMethod): Retrieval method to use
+            snapshot (Optional[IndexSnapshot]): Index snapshot to search, the current one when not given
+
+        Returns:
+            List[Document]: Retrieved context documents
+        """
+        snapshot = snapshot or self.snapshot
+        if method == RetrievalMethod.NATIVE:
+            return self.native_retriever.invoke(query)
+        if method == RetrievalMethod.MEMMAP:
+            return snapshot.memmap_retriever.invoke(query)
+        return snapshot.hybrid_retriever.invoke(query)
+
+    async def aretrieve(
+        self, query: str, method: RetrievalMethod, snapshot: Optional[IndexSnapshot] = None
+    ) -> List[Document]:
+        """
+        Retrieve context documents without blocking the event loop.
+
+        Args:
+            query (str): User question
+            method (RetrievalMethod): Retrieval method to use
+            snapshot (Optional[IndexSnapshot]): Index snapshot to search, the current one when not given
+
+        Returns:
+            List[Document]: Retrieved context documents
+        """
+        snapshot = snapshot or self.snapshot
+        if method == RetrievalMethod.NATIVE:
+            return await self.async_native_retriever.ainvoke(query)
+        if method == RetrievalMethod.MEMMAP:
+            return await snapshot.memmap_retriever.ainvoke(query)
+        # Hybrid fans out to both retrievers itself; Flashrank is CPU-bound,
+        # so the whole call stays on the bounded executor
+        # Copy the context so the request trace reaches the retrievers
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, context.run, self.retrieve, query, method, snapshot)
+
+    async def _asearch_vector(self, vector: List[float]) -> List[Document]:
+        """PGVector search for an already embedded query"""
+        with timed_stage("retrieve_vector"):
+            docs = await self.async_vector_store.asimilarity_search_by_vector(
+                vector, **self.async_native_retriever.search_kwargs
+            )
+        record_documents("vector", len(docs))
+        return docs
+
+    async def _afuse_batch(
+        self, queries: List[str], vectors: List[List[float]], snapshot: IndexSnapshot
+    ) -> List[Union[List[Document], Exception]]:
+        """Hybrid candidates of many queries, fused in process from the vector and keyword branches"""
+        loop = asyncio.get_running_loop()
+        ensemble = snapshot.hybrid_retriever.base_retriever
+
+        def search_keyword() -> List[List[Document]]:
+            with timed_stage("retrieve_keyword"):
+                return snapshot.keyword_retriever.search_batch(queries)
+
+        context = contextvars.copy_context()
+        vector_results, keyword_results = await asyncio.gather(
+            asyncio.gather(
+                *[asyncio.wait_for(self._asearch_vector(vector), self.vector_timeout) for vector in vectors],
+                return_exceptions=True
+            ),
+            # The keyword pass covers the whole batch; on timeout every query
+            # falls back to its vector results (the thread finishes on its own)
+            asyncio.wait_for(
+                loop.run_in_executor(self.executor, context.run, search_keyword), self.keyword_timeout
+            ),
+            return_exceptions=True
         )
-        
-        logger.info("RAG chains initialized successfully")
+        if isinstance(keyword_results, Exception):
+            keyword_results = [keyword_results] * len(queries)
+
+        results: List[Union[List[Document], Exception]] = []
+        for vector_docs, keyword_docs in zip(vector_results, keyword_results):
+            try:
+                results.append(ensemble.fuse([vector_docs, keyword_docs]))
+            except Exception as e:
+                results.append(e)
+        return results
+
+    async def _aretrieve_batch(
+        self, queries: List[str], vectors: List[List[float]], method: RetrievalMethod, snapshot: IndexSnapshot
+    ) -> List[Union[List[Document], Exception]]:
+        """
+        Retrieve context documents for many queries of the same method at once.
+
+        The query vectors are computed once by the caller. Memmap searches the
+        whole batch with one matrix product. Native runs the PGVector queries
+        concurrently on the pool. Hybrid combines the vector queries with one
+        keyword pass over all queries (or runs the fused SQL per query on one
+        connection), then reranks all candidates in shared Flashrank batches.
+
+        Args:
+            queries (List[str]): User questions
+            vectors (List[List[float]]): Query embeddings aligned with `queries`
+            method (RetrievalMethod): Retrieval method to use
+            snapshot (IndexSnapshot): Index snapshot to search
+
+        Returns:
+            List[Union[List[Document], Exception]]: Documents, or the error, per query
+        """
+        loop = asyncio.get_running_loop()
+        if method == RetrievalMethod.MEMMAP:
+            context = contextvars.copy_context()
+            return await loop.run_in_executor(
+                self.executor, context.run, snapshot.memmap_retriever.search_by_vectors, vectors
+            )
+        if method == RetrievalMethod.NATIVE:
+            return list(await asyncio.gather(
+                *[self._asearch_vector(vector) for vector in vectors], return_exceptions=True
+            ))
+
+        if self.hybrid_fusion == "sql":
+            context = contextvars.copy_context()
+            try:
+                results: List[Union[List[Document], Exception]] = await loop.run_in_executor(
+                    self.executor, context.run, snapshot.hybrid_retriever.base_retriever.search_by_vectors, queries, vectors
+                )
+            except Exception as e:
+                results = [e] * len(queries)
+        else:
+            results = await self._afuse_batch(queries, vectors, snapshot)
+
+        fused = [i for i, result in enumerate(results) if not isinstance(result, Exception)]
+        if fused:
+            context = contextvars.copy_context()
+            reranked = await loop.run_in_executor(
+                self.executor,
+                context.run,
+                self.compressor.compress_documents_batch,
+                [results[i] for i in fused],
+                [queries[i] for i in fused]
+            )
+            for i, docs in zip(fused, reranked):
+                results[i] = docs
+        return results
+
+    async def abatch_response(self, questions: List[QuestionRequest]) -> List[Union[tuple[str, Metadata], Exception]]:
+        """
+        Answer many questions together.
+
+        All queries are embedded in one forward pass and checked against the
+        semantic cache. The remaining questions are retrieved together per
+        method, and their LLM calls run concurrently: at most
+        `BATCH_LLM_CONCURRENCY` per batch, each holding a regular concurrency
+        slot, and within `BATCH_LLM_REQUESTS_PER_SECOND` when set. A failing
+        question does not fail the others.
+
+        Args:
+            questions (List[QuestionRequest]): The questions to answer
+
+        Returns:
+            List[Union[tuple[str, Metadata], Exception]]: Answer and metadata, or the error, per question
+        """
+        start = time.perf_counter()
+        snapshot = self.snapshot
+        results: List[Any] = [None] * len(questions)
+        pending = []
+        for i, question in enumerate(questions):
+            try:
+                self._validate_method(question.method, snapshot)
+                pending.append(i)
+            except ValueError as e:
+                REQUESTS.inc(method=question.method.value, status="error")
+                results[i] = e
+
+        logger.info(f"Processing batch of {len(questions)} questions")
+        batch_trace = RequestTrace("batch")
+        loop = asyncio.get_running_loop()
+        vectors: Dict[int, List[float]] = {}
+        contexts: Dict[int, List[Document]] = {}
+        with batch_trace.activate():
+            if pending:
+                try:
+                    with batch_trace.stage("embed"):
+                        embedded = await loop.run_in_executor(
+                            self.executor, self.embeddings.embed_queries, [questions[i].query for i in pending]
+                        )
+                    vectors = dict(zip(pending, embedded))
+                except Exception as e:
+                    logger.error(f"Error embedding batch of {len(pending)} questions: {e}")
+                    for i in pending:
+                        REQUESTS.inc(method=questions[i].method.value, status="error")
+                        results[i] = e
+                    pending = []
+
+            if self.answer_cache is not None:
+                with batch_trace.stage("cache_lookup"):
+                    for i in list(pending):
+                        cached = self._cache_lookup(vectors[i], questions[i].method, snapshot)
+                        if cached is not None:
+                            REQUESTS.inc(method=questions[i].method.value, status="cached")
+                            results[i] = cached
+                            pending.remove(i)
+
+            by_method: Dict[RetrievalMethod, List[int]] = {}
+            for i in pending:
+                by_method.setdefault(questions[i].method, []).append(i)
+            with batch_trace.stage("retrieve"):
+                retrieved = await asyncio.gather(
+                    *[
+                        self._aretrieve_batch(
+                            [questions[i].query for i in indices], [vectors[i] for i in indices], method, snapshot
+                        )
+                        for method, indices in by_method.items()
+                    ],
+                    return_exceptions=True
+                )
+            for indices, documents in zip(by_method.values(), retrieved):
+                if isinstance(documents, Exception):
+                    documents = [documents] * len(indices)
+                for i, docs in zip(indices, documents):
+                    if isinstance(docs, Exception):
+                        logger.error(f"Error retrieving context for session {questions[i].session_id}: {docs}")
+                        REQUESTS.inc(method=questions[i].method.value, status="error")
+                        results[i] = docs
+                    else:
+                        contexts[i] = docs
+
+        llm_slots = asyncio.Semaphore(self.batch_llm_concurrency)
+
+        async def answer(i: int) -> Union[tuple[str, Metadata], Exception]:
+            question = questions[i]
+            trace = RequestTrace(question.method.value)
+            trace.count("retrieve", len(contexts[i]))
+            try:
+                with trace.stage("total"):
+                    with trace.stage("queue"):
+                        await llm_slots.acquire()
+                        if self.batch_rate_limiter is not None:
+                            await self.batch_rate_limiter.aacquire()
+                        await self._acquire_slot()
+                    try:
+                        response = "".join(
+                            [token async for token in self._astream_answer(contexts[i], question.query, trace)]
+                        )
+                    finally:
+                        self._release_slot()
+                        llm_slots.release()
+                metadata = self._get_metadata(question.method)
+                self._cache_store(vectors[i], question.method, snapshot, response, metadata)
+                return response, self._finish(trace, metadata, "ok")
+            except Exception as e:
+                REQUESTS.inc(method=trace.method, status="error")
+                logger.error(f"Error processing question for session {question.session_id}: {e}")
+                return e
+
+        answers = await asyncio.gather(*[answer(i) for i in contexts])
+        for i, result in zip(contexts, answers):
+            results[i] = result
+
+        failed = sum(isinstance(result, Exception) for result in results)
+        logger.info(
+            f"Answered batch of {len(questions)} questions ({failed} failed) "
+            f"in {(time.perf_counter() - start) * 1000:.0f} ms: {batch_trace.stages_ms}"
+        )
+        return results
+
+    def _assemble_context(self, context: List[Document], trace: RequestTrace) -> str:
+        """Merge overlapping chunks, drop near-duplicates and pack the rest into the token budget"""
+        with trace.stage("assemble"):
+            assembled = self.context_assembler.assemble(context)
+        trace.count("context", len(assembled.passages))
+        logger.debug(
+            f"Context: {len(context)} chunks -> {len(assembled.passages)} passages, {assembled.tokens} tokens "
+            f"({assembled.merged} merged, {assembled.duplicates} duplicates, truncated={assembled.truncated})"
+        )
+        return assembled.text
+
+    def _stream_answer(self, context: List[Document], query: str, trace: RequestTrace) -> Iterator[str]:
+        """Stream answer tokens from the LLM, recording latency, time to first token and token usage"""
+        prompt_context = self._assemble_context(context, trace)
+        start = time.perf_counter()
+        ttft, usage, chunks = None, None, 0
+        with trace.stage("llm"):
+            for chunk in self.generation_chain.stream({"context": prompt_context, "question": query}):
+                usage = chunk.usage_metadata or usage
+                if chunk.content:
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    chunks += 1
+                    yield chunk.content
+        self._record_llm_usage(trace, ttft, usage, chunks)
+
+    async def _astream_answer(self, context: List[Document], query: str, trace: RequestTrace) -> AsyncIterator[str]:
+        """Async variant of `_stream_answer`"""
+        prompt_context = self._assemble_context(context, trace)
+        start = time.perf_counter()
+        ttft, usage, chunks = None, None, 0
+        with trace.stage("llm"):
+            async for chunk in self.generation_chain.astream({"context": prompt_context, "question": query}):
+                usage = chunk.usage_metadata or usage
+                if chunk.content:
+                    if ttft is None:
+                        ttft = time.perf_counter() - start
+                    chunks += 1
+                    yield chunk.content
+        self._record_llm_usage(trace, ttft, usage, chunks)
+
+    def _record_llm_usage(self, trace: RequestTrace, ttft: Optional[float], usage: Optional[Dict[str, int]], chunks: int) -> None:
+        """Token counts come from the provider's usage report; streamed chunks approximate them otherwise"""
+        trace.llm_usage(
+            self.model,
+            ttft,
+            usage.get("input_tokens") if usage else None,
+            usage.get("output_tokens") if usage else chunks
+        )
+
+    def _finish(self, trace: RequestTrace, metadata: Metadata, status: str) -> Metadata:
+        """Count the request and attach its timings to the metadata when enabled"""
+        REQUESTS.inc(method=trace.method, status=status)
+        if self.expose_timings:
+            metadata = metadata.model_copy(update={"timings": Timings(**trace.summary())})
+        return metadata
+
+    def _inflight_key(self, query: str, method: RetrievalMethod, snapshot: IndexSnapshot) -> tuple:
+        """Requests with the same key get the same answer"""
+        return normalize_query(query), method.value, snapshot.version
+
+    def _coalesced(self, session_id: str, metadata: Metadata) -> tuple[Metadata, str]:
+        """Mark an answer shared from an identical request in flight"""
+        logger.info(f"Question for session {session_id} answered by an identical one in flight")
+        return metadata.model_copy(update={"coalesced": True}), "coalesced"
+
+    def _answer(
+        self, session_id: str, query: str, method: RetrievalMethod, snapshot: IndexSnapshot, trace: RequestTrace
+    ) -> tuple[str, Metadata, str]:
+        """Answer one question: cache lookup, retrieval and generation (blocking)"""
+        logger.info(f"Processing question for session {session_id} using {method} method")
+
+        with trace.stage("embed"):
+            vector = self.embed_for_cache(query)
+        with trace.stage("cache_lookup"):
+            cached = self._cache_lookup(vector, method, snapshot)
+        if cached is not None:
+            logger.info(f"Semantic cache hit for session {session_id}")
+            return *cached, "cached"
+
+        with trace.stage("retrieve"):
+            context = self.retrieve(query, method, snapshot)
+        trace.count("retrieve", len(context))
+        response = "".join(self._stream_answer(context, query, trace))
+        metadata = self._get_metadata(method)
+        self._cache_store(vector, method, snapshot, response, metadata)
+        return response, metadata, "ok"
 
     def get_response(self, session_id: str, query: str, method: RetrievalMethod) -> tuple[str, Metadata]:
         """
         Get response from RAG pipeline using specified method
+
+        Concurrent requests for the same question (ignoring case and
+        whitespace) and method share one computation.
         
         Args:
             session_id (str): Session identifier
@@ -134,29 +906,187 @@ class RAGPipeline:
         Returns:
             tuple[str, Metadata]: Response containing answer and metadata
         """
+        trace = RequestTrace(method.value)
+        # Read once: a reload swaps the snapshot, this request keeps its own
+        snapshot = self.snapshot
         try:
-            valid_methods = {RetrievalMethod.NATIVE, RetrievalMethod.HYBRID}
-            if method not in valid_methods:
-                raise ValueError(
-                    f"Invalid retrieval method: {method}. "
-                    f"Valid methods are: {[m.name for m in valid_methods]}"
-                )
+            self._validate_method(method, snapshot)
 
-            logger.info(f"Processing question for session {session_id} using {method} method")
-            
-            if method == RetrievalMethod.NATIVE:
-                response = self.native_chain.invoke(query)
-            elif method == RetrievalMethod.HYBRID:  
-                response = self.hybrid_chain.invoke(query)
-    
-            metadata = Metadata(
-                method=method,
-                model=self.model,
-                retriever_config=self._get_retriever_config(method)
-            )
-            
-            return response, metadata
+            with trace.activate(), trace.stage("total"):
+                answer = partial(self._answer, session_id, query, method, snapshot, trace)
+                if self.inflight is None:
+                    response, metadata, status = answer()
+                else:
+                    (response, metadata, status), leader = self.inflight.do(
+                        self._inflight_key(query, method, snapshot), answer
+                    )
+                    if not leader:
+                        metadata, status = self._coalesced(session_id, metadata)
+            if status == "ok":
+                logger.info(f"Answered session {session_id} in {trace.stages_ms['total']:.0f} ms: {trace.stages_ms}")
+
+            return response, self._finish(trace, metadata, status)
             
         except Exception as e:
+            REQUESTS.inc(method=trace.method, status="error")
+            logger.error(f"Error processing question for session {session_id}: {e}")
+            raise
+
+    async def _aanswer(
+        self, session_id: str, query: str, method: RetrievalMethod, snapshot: IndexSnapshot, trace: RequestTrace
+    ) -> tuple[str, Metadata, str]:
+        """Async variant of `_answer`, holding a concurrency slot"""
+        with trace.stage("queue"):
+            await self._acquire_slot()
+        try:
+            logger.info(f"Processing question for session {session_id} using {method} method")
+
+            with trace.stage("embed"):
+                vector = await self.aembed_for_cache(query)
+            with trace.stage("cache_lookup"):
+                cached = self._cache_lookup(vector, method, snapshot)
+            if cached is not None:
+                logger.info(f"Semantic cache hit for session {session_id}")
+                return *cached, "cached"
+
+            with trace.stage("retrieve"):
+                context = await self.aretrieve(query, method, snapshot)
+            trace.count("retrieve", len(context))
+            response = "".join([token async for token in self._astream_answer(context, query, trace)])
+        finally:
+            self._release_slot()
+
+        metadata = self._get_metadata(method)
+        self._cache_store(vector, method, snapshot, response, metadata)
+        return response, metadata, "ok"
+
+    async def aget_response(self, session_id: str, query: str, method: RetrievalMethod) -> tuple[str, Metadata]:
+        """
+        Async variant of `get_response`.
+
+        Retrieval runs on the bounded executor and the LLM is called through
+        `astream`, so the event loop stays free while a request is in flight.
+        At most `RAG_MAX_CONCURRENCY` requests are processed at once; the rest
+        wait for a slot. Requests waiting for an identical question in flight
+        do not take a slot.
+
+        Args:
+            session_id (str): Session identifier
+            query (str): User question
+            method (RetrievalMethod): Retrieval method to use
+
+        Returns:
+            tuple[str, Metadata]: Response containing answer and metadata
+        """
+        trace = RequestTrace(method.value)
+        # Read once: a reload swaps the snapshot, this request keeps its own
+        snapshot = self.snapshot
+        try:
+            self._validate_method(method, snapshot)
+
+            with trace.activate(), trace.stage("total"):
+                answer = partial(self._aanswer, session_id, query, method, snapshot, trace)
+                if self.inflight is None:
+                    response, metadata, status = await answer()
+                else:
+                    (response, metadata, status), leader = await self.inflight.ado(
+                        self._inflight_key(query, method, snapshot), answer
+                    )
+                    if not leader:
+                        metadata, status = self._coalesced(session_id, metadata)
+            if status == "ok":
+                logger.info(f"Answered session {session_id} in {trace.stages_ms['total']:.0f} ms: {trace.stages_ms}")
+            return response, self._finish(trace, metadata, status)
+
+        except Exception as e:
+            REQUESTS.inc(method=trace.method, status="error")
             logger.error(f"Error processing question for session {session_id}: {e}")
-            raise
\ No newline at end of file
+            raise
+
+    async def astream_response(
+        self, session_id: str, query: str, method: RetrievalMethod
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream the response as events: retrieval metadata first, then answer
+        tokens as the LLM produces them, then a final `done` event.
+
+        When timings are exposed, the `done` event carries them, since the LLM
+        stages finish after the metadata event has been sent.
+
+        Args:
+            session_id (str): Session identifier
+            query (str): User question
+            method (RetrievalMethod): Retrieval method to use
+
+        Yields:
+            Dict[str, Any]: Events with an `event` key of `metadata`, `token` or `done`
+        """
+        trace = RequestTrace(method.value)
+        # Read once: a reload swaps the snapshot, this request keeps its own
+        snapshot = self.snapshot
+        try:
+            self._validate_method(method, snapshot)
+
+            start = time.perf_counter()
+            with trace.stage("queue"):
+                await self._acquire_slot()
+            try:
+                logger.info(f"Streaming question for session {session_id} using {method} method")
+
+                with trace.stage("embed"):
+                    vector = await self.aembed_for_cache(query)
+                with trace.stage("cache_lookup"):
+                    cached = self._cache_lookup(vector, method, snapshot)
+                if cached is not None:
+                    logger.info(f"Semantic cache hit for session {session_id}")
+                    answer, metadata = cached
+                    trace.record("total", time.perf_counter() - start)
+                    metadata = self._finish(trace, metadata, "cached")
+                    yield {
+                        "event": "metadata",
+                        "session_id": session_id,
+                        "query": query,
+                        "documents": 0,
+                        "metadata": metadata.model_dump(mode="json")
+                    }
+                    yield {"event": "token", "content": answer}
+                    yield self._done_event(trace)
+                    return
+
+                # Activated only around retrieval: a context variable must not
+                # stay set across the yields of this generator
+                with trace.activate(), trace.stage("retrieve"):
+                    context = await self.aretrieve(query, method, snapshot)
+                trace.count("retrieve", len(context))
+                metadata = self._get_metadata(method)
+                yield {
+                    "event": "metadata",
+                    "session_id": session_id,
+                    "query": query,
+                    "documents": len(context),
+                    "metadata": metadata.model_dump(mode="json")
+                }
+
+                tokens = []
+                async for token in self._astream_answer(context, query, trace):
+                    tokens.append(token)
+                    yield {"event": "token", "content": token}
+            finally:
+                self._release_slot()
+            trace.record("total", time.perf_counter() - start)
+
+            self._cache_store(vector, method, snapshot, "".join(tokens), metadata)
+            self._finish(trace, metadata, "ok")
+            yield self._done_event(trace)
+
+        except Exception as e:
+            REQUESTS.inc(method=trace.method, status="error")
+            logger.error(f"Error streaming question for session {session_id}: {e}")
+            raise
+
+    def _done_event(self, trace: RequestTrace) -> Dict[str, Any]:
+        """Final stream event, with the request timings when they are exposed"""
+        event = {"event": "done"}
+        if self.expose_timings:
+            event["timings"] = trace.summary()
+        return event
@@ -1,20 +1,174 @@
 # src/pipeline/retriever.py
+from typing import Optional
+
+import numpy as np
+from pydantic import model_validator
+from sqlalchemy import event
+from langchain_core.documents import Document
 from langchain_postgres import PGVector
-from langchain_community.retrievers import BM25Retriever
-from langchain.retrievers import EnsembleRetriever, ContextualCompressionRetriever
+from langchain.retrievers import ContextualCompressionRetriever
 from langchain.retrievers.document_compressors import FlashrankRerank
+from pipeline.bm25 import SparseBM25Retriever
+from pipeline.ensemble import ConcurrentEnsembleRetriever
+from pipeline.fulltext import PostgresHybridRetriever, PostgresKeywordRetriever
+from pipeline.keyword_index import KeywordIndex, KeywordIndexRetriever
+from pipeline.metrics import record_documents, timed_stage
+from pipeline.vector_index import VectorIndexRetriever
 from pipeline.utils import init_logger
 
 logger = init_logger()
 
-def get_vector_store(embeddings, collection_name, connection_string):
+
+class TimedFlashrankRerank(FlashrankRerank):
+    """`FlashrankRerank` that records its duration and output size in the request trace."""
+
+    model_path: Optional[str] = None
+    """ONNX model file of the client's session, used to recreate it after fork."""
+
+    @model_validator(mode="after")
+    def resolve_model_path(self) -> "TimedFlashrankRerank":
+        """Remember where the client loaded its ONNX model from"""
+        if self.model_path is None and self.model and self.client.llm_model is None:
+            from flashrank.Config import model_file_map
+
+            self.model_path = str(self.client.model_dir / model_file_map[self.model])
+        return self
+
+    def compress_documents(self, documents, query, callbacks=None):
+        with timed_stage("rerank"):
+            reranked = super().compress_documents(documents, query, callbacks=callbacks)
+        record_documents("rerank", len(reranked))
+        return reranked
+
+    def reset_after_fork(self, threads=None):
+        """
+        Recreate the ONNX Runtime session in a forked worker.
+
+        An inference session is not fork-safe: its thread pool does not exist
+        in the child. The model file is small and stays in the page cache, so
+        each worker loads its own session.
+
+        Args:
+            threads (int): Intra-op threads for the session, None for the default.
+        """
+        if self.client.llm_model is not None:
+            return
+        if self.model_path is None:
+            logger.warning("Reranker model path unknown, keeping the session created before fork")
+            return
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        self.client.session = ort.InferenceSession(self.model_path, options)
+
+    def _score_pairs(self, pairs):
+        """Cross-encoder relevance of (query, passage) pairs, as in `Ranker.rerank` of flashrank 0.2.10"""
+        encoded = self.client.tokenizer.encode_batch(pairs)
+        onnx_input = {
+            "input_ids": np.array([e.ids for e in encoded], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encoded], dtype=np.int64),
+        }
+        token_type_ids = np.array([e.type_ids for e in encoded], dtype=np.int64)
+        if not np.all(token_type_ids == 0):
+            onnx_input["token_type_ids"] = token_type_ids
+        logits = self.client.session.run(None, onnx_input)[0]
+        if logits.shape[1] == 1:
+            return 1 / (1 + np.exp(-logits.flatten()))
+        exp_logits = np.exp(logits)
+        return exp_logits[:, 1] / np.sum(exp_logits, axis=1)
+
+    def compress_documents_batch(self, document_lists, queries, batch_size=64):
+        """
+        Rerank the candidates of many queries in shared model batches.
+
+        The (query, passage) pairs of all queries are scored together, `batch_size`
+        pairs per forward pass, instead of one pass per query.
+
+        Args:
+            document_lists (list[list[Document]]): Candidates per query.
+            queries (list[str]): Queries aligned with `document_lists`.
+            batch_size (int): Pairs per forward pass.
+
+        Returns:
+            list[list[Document]]: Reranked documents per query.
+        """
+        if self.client.llm_model is not None:
+            # Listwise LLM rankers take one query at a time
+            return [self.compress_documents(docs, query) for docs, query in zip(document_lists, queries)]
+
+        with timed_stage("rerank"):
+            pairs = [(query, doc.page_content) for docs, query in zip(document_lists, queries) for doc in docs]
+            scores = np.concatenate(
+                [self._score_pairs(pairs[i:i + batch_size]) for i in range(0, len(pairs), batch_size)]
+            ) if pairs else np.zeros(0)
+
+            results, offset = [], 0
+            for docs in document_lists:
+                doc_scores = scores[offset:offset + len(docs)]
+                offset += len(docs)
+                order = sorted(range(len(docs)), key=lambda i: doc_scores[i], reverse=True)[:self.top_n]
+                results.append([
+                    Document(
+                        page_content=docs[i].page_content,
+                        metadata={
+                            self.prefix_metadata + "id": i,
+                            self.prefix_metadata + "relevance_score": doc_scores[i],
+                            **docs[i].metadata,
+                        },
+                    )
+                    for i in order
+                    if doc_scores[i] >= self.score_threshold
+                ])
+        for reranked in results:
+            record_documents("rerank", len(reranked))
+        return results
+
+
+def apply_search_settings(engine, ef_search=None, probes=None):
     """
-    Initialize the vector store with the specified embeddings, collection name, and connection string.
+    Set default ANN search parameters on every connection of the engine.
+
+    `hnsw.ef_search` and `ivfflat.probes` trade recall for latency on the
+    HNSW and IVFFlat indexes created by `etl/ann_index.py`. They are set once
+    per pooled connection, so they apply process-wide to every query; they
+    cannot be tuned per request.
+
+    Args:
+        engine (Engine): The engine used by the vector store (for an async
+            engine, pass its `sync_engine`).
+        ef_search (int): HNSW candidate list size at query time.
+        probes (int): Number of IVFFlat lists probed at query time.
+
+    Returns:
+        None
+    """
+    settings = {}
+    if ef_search:
+        settings["hnsw.ef_search"] = int(ef_search)
+    if probes:
+        settings["ivfflat.probes"] = int(probes)
+    if not settings:
+        return
+
+    @event.listens_for(engine, "connect")
+    def set_search_settings(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in settings.items():
+            cursor.execute(f"SET {name} = {value}")
+        cursor.close()
+        dbapi_connection.commit()
+
+def get_vector_store(embeddings, collection_name, connection):
+    """
+    Initialize the vector store with the specified embeddings, collection name, and connection.
 
     Args:
         embeddings (HuggingFaceEmbeddings): The embeddings to use for the vector store.
         collection_name (str): The name of the collection to use for the vector store.
-        connection_string (str): The connection string to use for the vector store.
+        connection (str | Engine | AsyncEngine): The connection string or pooled engine
+            to use for the vector store. An async engine gives an async-only store.
 
     Returns:
         PGVector: The initialized vector store.
@@ -22,7 +176,7 @@ def get_vector_store(embeddings, collection_name, connection_string):
     vector_store = PGVector(
         embeddings=embeddings,
         collection_name=collection_name,
-        connection=connection_string,
+        connection=connection,
         use_jsonb=True,
     )
     logger.info("Vector store initialized successfully")
@@ -41,30 +195,152 @@ def get_native_retriever(vector_store, k=3):
     """
     return vector_store.as_retriever(search_kwargs={"k": k})
 
-def get_hybrid_retriever(native_retriever, chunks, k=3, weights=[0.5, 0.5], rerank_top_n=5):
+def get_memmap_retriever(index, embeddings, k=3, executor=None):
+    """
+    Get the in-process vector retriever over the exported embedding matrix.
+
+    Args:
+        index (VectorIndex): The memory-mapped vector index.
+        embeddings (Embeddings): The embeddings used to embed queries.
+        k (int): The number of results to return.
+        executor (ThreadPoolExecutor): The pool running scans of the async path, None for the loop's default one.
+
+    Returns:
+        VectorIndexRetriever: The initialized memmap retriever.
+    """
+    logger.info("Memmap vector retriever initialized successfully")
+    return VectorIndexRetriever(index=index, embeddings=embeddings, k=k, executor=executor)
+
+def get_keyword_retriever(chunks=None, index=None, k=3):
+    """
+    Get the keyword (BM25) retriever.
+
+    Uses the persisted index written by `etl/indexing.py` when available and
+    falls back to building a sparse BM25 matrix from the chunks in memory.
+
+    Args:
+        chunks (list): The list of chunks to index in memory.
+        index (KeywordIndex): The persisted keyword index.
+        k (int): The number of results to return.
+
+    Returns:
+        BaseRetriever: The initialized keyword retriever.
+    """
+    if index is not None:
+        keyword_retriever = KeywordIndexRetriever(index=index, k=k)
+    else:
+        keyword_retriever = SparseBM25Retriever.from_documents(chunks, k=k)
+    logger.info("Keyword retriever initialized successfully")
+    return keyword_retriever
+
+def get_fulltext_retriever(engine, collection_name, config="simple", k=3):
+    """
+    Get the keyword retriever backed by the collection's Postgres full-text index.
+
+    Args:
+        engine (Engine): The pooled engine to query.
+        collection_name (str): The PGVector collection to search.
+        config (str): The text search configuration of the `document_tsv` column.
+        k (int): The number of results to return.
+
+    Returns:
+        PostgresKeywordRetriever: The initialized full-text retriever.
+    """
+    logger.info(f"Full-text keyword retriever initialized successfully ({config})")
+    return PostgresKeywordRetriever(engine=engine, collection_name=collection_name, config=config, k=k)
+
+def get_reranker(top_n=5):
+    """
+    Get the Flashrank reranker used by the hybrid retriever.
+
+    Args:
+        top_n (int): The number of results to keep.
+
+    Returns:
+        TimedFlashrankRerank: The initialized reranker.
+    """
+    return TimedFlashrankRerank(top_n=top_n)
+
+def get_hybrid_retriever(
+    native_retriever,
+    keyword_retriever,
+    weights=[0.5, 0.5],
+    rerank_top_n=5,
+    vector_timeout=None,
+    keyword_timeout=None,
+    compressor=None
+):
     """
     Get the hybrid retriever from the vector store.
 
+    The vector and keyword retrievers are queried concurrently. A branch that
+    exceeds its timeout or fails is skipped and the other branch's results are
+    fused and reranked on their own.
+
     Args:
         native_retriever (PGVectorRetriever): The native retriever to use for the hybrid retriever.
-        chunks (list): The list of chunks to use for the hybrid retriever.
-        k (int): The number of results to return.
+        keyword_retriever (BaseRetriever): The keyword retriever to use for the hybrid retriever.
         weights (list): The weights to use for the hybrid retriever.
         rerank_top_n (int): The number of results to rerank.
+        vector_timeout (float): Timeout in seconds for the vector retriever.
+        keyword_timeout (float): Timeout in seconds for the keyword retriever.
+        compressor (TimedFlashrankRerank): A reranker to reuse instead of loading a new one.
 
     Returns:
         ContextualCompressionRetriever: The initialized hybrid retriever.
     """
-    compressor = FlashrankRerank(top_n=rerank_top_n)
-    keyword_retriever = BM25Retriever.from_documents(chunks)
-    keyword_retriever.k = k
-    ensemble_retriever = EnsembleRetriever(
+    compressor = compressor or get_reranker(rerank_top_n)
+    ensemble_retriever = ConcurrentEnsembleRetriever(
         retrievers=[native_retriever, keyword_retriever],
-        weights=weights
+        weights=weights,
+        timeouts=[vector_timeout, keyword_timeout],
+        names=["vector", "keyword"]
     )
     hybrid_retriever = ContextualCompressionRetriever(
         base_compressor=compressor,
         base_retriever=ensemble_retriever
     )
     logger.info("Hybrid retriever initialized successfully")
-    return hybrid_retriever
\ No newline at end of file
+    return hybrid_retriever
+
+def get_sql_hybrid_retriever(
+    engine,
+    collection_name,
+    embeddings,
+    config="simple",
+    k=3,
+    weights=[0.5, 0.5],
+    rerank_top_n=5,
+    compressor=None
+):
+    """
+    Get the hybrid retriever whose vector and keyword fusion runs in Postgres.
+
+    Args:
+        engine (Engine): The pooled engine to query.
+        collection_name (str): The PGVector collection to search.
+        embeddings (Embeddings): The embeddings used to embed queries.
+        config (str): The text search configuration of the `document_tsv` column.
+        k (int): The number of results per branch before fusion.
+        weights (list): The weights of the vector and keyword rankings.
+        rerank_top_n (int): The number of results to rerank.
+        compressor (TimedFlashrankRerank): A reranker to reuse instead of loading a new one.
+
+    Returns:
+        ContextualCompressionRetriever: The initialized hybrid retriever.
+    """
+    fused_retriever = PostgresHybridRetriever(
+        engine=engine,
+        collection_name=collection_name,
+        embeddings=embeddings,
+        vector_k=k,
+        keyword_k=k,
+        weights=weights,
+        config=config
+    )
+    hybrid_retriever = ContextualCompressionRetriever(
+        base_compressor=compressor or get_reranker(rerank_top_n),
+        base_retriever=fused_retriever
+    )
+    logger.info("SQL hybrid retriever initialized successfully")
+    return hybrid_retriever
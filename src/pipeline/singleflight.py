@@ -0,0 +1,104 @@
+# src/pipeline/singleflight.py
+import asyncio
+import threading
+from concurrent.futures import Future
+from typing import Awaitable, Callable, Dict, Hashable, Tuple, TypeVar
+
+from pipeline.utils import init_logger
+
+logger = init_logger()
+
+T = TypeVar("T")
+
+
+def normalize_query(query: str) -> str:
+    """Case-fold the query and collapse its whitespace"""
+    return " ".join(query.split()).casefold()
+
+
+class SingleFlight:
+    """
+    Share one in-flight computation among concurrent callers with the same key.
+
+    The first caller for a key (the leader) runs the computation; callers
+    arriving while it runs wait for it and receive the same result, or the
+    same exception. Nothing is kept once the computation finishes: later
+    callers start a new one. Sync callers (`do`) and async callers (`ado`)
+    are tracked separately.
+    """
+
+    def __init__(self):
+        """
+        Initialize the in-flight call registry.
+        """
+        self._calls: Dict[Hashable, Future] = {}
+        self._tasks: Dict[Hashable, asyncio.Future] = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key: Hashable, fn: Callable[[], T]) -> Tuple[T, bool]:
+        """
+        Run `fn` in this thread, or wait for the identical call in flight.
+
+        Args:
+            key (Hashable): Identifies identical calls.
+            fn (Callable[[], T]): The computation.
+
+        Returns:
+            Tuple[T, bool]: The result, and whether this caller computed it.
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = self._calls[key] = Future()
+            else:
+                self.shared += 1
+        if not leader:
+            return future.result(), False
+
+        try:
+            result = fn()
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(result)
+            return result, True
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def ado(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> Tuple[T, bool]:
+        """
+        Async variant of `do`.
+
+        The leader's computation runs as its own task, so a caller that is
+        cancelled (e.g. its client disconnected) stops waiting without
+        cancelling the computation the others are waiting for.
+
+        Args:
+            key (Hashable): Identifies identical calls.
+            fn (Callable[[], Awaitable[T]]): Creates the computation.
+
+        Returns:
+            Tuple[T, bool]: The result, and whether this caller started it.
+        """
+        task = self._tasks.get(key)
+        leader = task is None
+        if leader:
+            task = self._tasks[key] = asyncio.ensure_future(fn())
+            task.add_done_callback(lambda done: self._finish_task(key, done))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task), leader
+
+    def _finish_task(self, key: Hashable, task: asyncio.Future) -> None:
+        """Forget the finished task; its exception counts as retrieved even if every caller left"""
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
+        if not task.cancelled():
+            task.exception()
+
+    def __len__(self) -> int:
+        return len(self._calls) + len(self._tasks)
@@ -0,0 +1,26 @@
+# src/pipeline/snapshot.py
+import time
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+
+@dataclass
+class IndexSnapshot:
+    """
+    Retrieval state built from one version of the indexes.
+
+    Everything that changes when the corpus is re-indexed lives here, so a
+    reload swaps it with a single assignment. A request reads the pipeline's
+    snapshot once and uses it throughout, so requests in flight during a
+    swap finish on the version they started with.
+    """
+
+    name: Optional[str]
+    version: str
+    keyword_retriever: Any
+    hybrid_retriever: Any
+    keyword_index: Any = None
+    chunks: Optional[List[Any]] = None
+    vector_index: Any = None
+    memmap_retriever: Any = None
+    loaded_at: float = field(default_factory=time.time)
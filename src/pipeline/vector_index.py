@@ -0,0 +1,203 @@
+# src/pipeline/vector_index.py
+import os
+import json
+import asyncio
+import contextvars
+from typing import Any, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.callbacks import (
+    AsyncCallbackManagerForRetrieverRun,
+    CallbackManagerForRetrieverRun,
+)
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from common.index_format import VECTOR_INDEX_FORMAT, ChunkStore
+from pipeline.bm25 import top_k_indices
+from pipeline.utils import init_logger
+
+logger = init_logger()
+
+# Rows converted from int8 to float32 at a time while scanning
+_SCAN_BLOCK_ROWS = 8192
+
+
+class VectorIndex:
+    """
+    Read-only embedding matrix exported by `etl/indexing.py`.
+
+    The normalized float32 matrix (and the optional int8 codes) are
+    memory-mapped, so every worker process shares them through the page
+    cache. Search is a vectorized dot product followed by `argpartition`.
+    With int8 codes the whole matrix is scanned at a quarter of the memory
+    traffic and only the best candidates are rescored against float32 rows.
+    """
+
+    def __init__(self, index_dir: str, use_int8: bool = True, rescore_factor: int = 4):
+        """
+        Load the index from the specified directory.
+
+        Args:
+            index_dir (str): Directory containing the exported index.
+            use_int8 (bool): Scan the int8 codes when the index has them.
+            rescore_factor (int): Candidates rescored in float32 per returned result.
+        """
+        with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("format") != VECTOR_INDEX_FORMAT:
+            raise ValueError(f"Unsupported vector index format: {meta.get('format')}")
+
+        self.index_dir = index_dir
+        self.version = meta["version"]
+        self.dimension = meta["dimension"]
+        self.num_docs = meta["num_docs"]
+        self.rescore_factor = rescore_factor
+
+        load = lambda name: np.load(os.path.join(index_dir, f"{name}.npy"), mmap_mode="r")
+        self.vectors = load("vectors")
+        self.quantized = bool(meta.get("quantized")) and use_int8
+        self.codes = load("vectors_int8") if self.quantized else None
+        self.scales = load("scales") if self.quantized else None
+        self.chunks = ChunkStore(index_dir, self.num_docs)
+        logger.info(
+            f"Vector index {self.version} loaded from {index_dir} "
+            f"({self.num_docs} chunks, {'int8' if self.quantized else 'float32'})"
+        )
+
+    def _scan_int8(self, query: np.ndarray) -> np.ndarray:
+        scores = np.empty(self.num_docs, dtype=np.float32)
+        for start in range(0, self.num_docs, _SCAN_BLOCK_ROWS):
+            end = min(start + _SCAN_BLOCK_ROWS, self.num_docs)
+            scores[start:end] = (self.codes[start:end].astype(np.float32) @ query) * self.scales[start:end]
+        return scores
+
+    def _scan_int8_batch(self, queries: np.ndarray) -> np.ndarray:
+        scores = np.empty((self.num_docs, len(queries)), dtype=np.float32)
+        for start in range(0, self.num_docs, _SCAN_BLOCK_ROWS):
+            end = min(start + _SCAN_BLOCK_ROWS, self.num_docs)
+            block = self.codes[start:end].astype(np.float32) @ queries.T
+            scores[start:end] = block * self.scales[start:end, None]
+        return scores
+
+    def _rescore(self, candidates: np.ndarray, query: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        # Fancy indexing needs sorted rows to read the memmap sequentially
+        candidates = np.sort(candidates)
+        exact = self.vectors[candidates] @ query
+        order = top_k_indices(exact, k)
+        return candidates[order], exact[order]
+
+    def search(self, vector: List[float], k: int = 3) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the chunks most similar to a query embedding.
+
+        Args:
+            vector (List[float]): Query embedding.
+            k (int): Number of results.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Chunk positions and cosine similarities, best first.
+        """
+        if not self.num_docs:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        if not self.quantized:
+            scores = np.asarray(self.vectors @ query)
+            top = top_k_indices(scores, k)
+            return top, scores[top]
+
+        candidates = top_k_indices(self._scan_int8(query), k * self.rescore_factor)
+        return self._rescore(candidates, query, k)
+
+    def search_batch(self, vectors: List[List[float]], k: int = 3) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Search many query embeddings with one matrix product over the index.
+
+        The matrix is streamed once for the whole batch instead of once per
+        query.
+
+        Args:
+            vectors (List[List[float]]): Query embeddings.
+            k (int): Number of results per query.
+
+        Returns:
+            List[Tuple[np.ndarray, np.ndarray]]: Chunk positions and cosine similarities per query, best first.
+        """
+        if not self.num_docs or not len(vectors):
+            return [(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)) for _ in vectors]
+        queries = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(queries, axis=1, keepdims=True)
+        queries = queries / np.where(norms > 0, norms, 1.0)
+
+        if not self.quantized:
+            scores = np.asarray(self.vectors @ queries.T)
+            results = []
+            for j in range(len(queries)):
+                top = top_k_indices(scores[:, j], k)
+                results.append((top, scores[top, j]))
+            return results
+
+        scores = self._scan_int8_batch(queries)
+        return [
+            self._rescore(top_k_indices(scores[:, j], k * self.rescore_factor), queries[j], k)
+            for j in range(len(queries))
+        ]
+
+    def get_document(self, doc_idx: int) -> Document:
+        """
+        Decode a chunk from the index.
+
+        Args:
+            doc_idx (int): Position of the chunk in the index.
+
+        Returns:
+            Document: The chunk with its id and metadata.
+        """
+        return self.chunks.get(doc_idx)
+
+
+class VectorIndexRetriever(BaseRetriever):
+    """Vector retriever answering from a memory-mapped `VectorIndex` instead of PGVector."""
+
+    index: Any
+    embeddings: Any
+    k: int = 3
+    executor: Optional[Any] = None
+    """Pool running the scan on the async path; None uses the event loop's default executor."""
+
+    def _search(self, vector: List[float]) -> List[Document]:
+        top, _ = self.index.search(vector, self.k)
+        return [self.index.get_document(int(i)) for i in top]
+
+    def search_by_vectors(self, vectors: List[List[float]]) -> List[List[Document]]:
+        """
+        Retrieve chunks for many already embedded queries in one pass.
+
+        Args:
+            vectors (List[List[float]]): Query embeddings.
+
+        Returns:
+            List[List[Document]]: Chunks per query, best first.
+        """
+        return [
+            [self.index.get_document(int(i)) for i in top]
+            for top, _ in self.index.search_batch(vectors, self.k)
+        ]
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        return self._search(self.embeddings.embed_query(query))
+
+    async def _aget_relevant_documents(
+        self, query: str, *, run_manager: AsyncCallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        vector = await self.embeddings.aembed_query(query)
+        # The scan grows linearly with the corpus, keep it off the event loop
+        # Copy the context so the request trace reaches the executor thread
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, context.run, self._search, vector)
@@ -0,0 +1,224 @@
+import gc
+
+# Keep the collector from compacting the heap while the models load, so the
+# pages the workers inherit are not rewritten after fork (see gc.freeze)
+gc.disable()
+
+import os
+import sys
+import time
+import shutil
+import socket
+import signal
+import argparse
+import tempfile
+from typing import Dict
+
+import uvicorn
+from pipeline.memory import read_process_memory
+from pipeline.metrics import REGISTRY, shared_metrics_path
+from pipeline.utils import init_logger
+
+logger = init_logger()
+
+MB = 1024 * 1024
+
+
+def create_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        description='Serve the API from pre-forked workers sharing one loaded pipeline'
+    )
+    parser.add_argument('--host', type=str, default='0.0.0.0', help='Address to bind')
+    parser.add_argument('--port', type=int, default=8000, help='Port to bind')
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=int(os.getenv("PREFORK_WORKERS") or os.cpu_count() or 1),
+        help='Number of worker processes'
+    )
+    parser.add_argument(
+        '--threads',
+        type=int,
+        default=int(os.getenv("PREFORK_WORKER_THREADS") or 0),
+        help='Inference threads per worker (default: cores / workers)'
+    )
+    return parser
+
+
+def bind_socket(host: str, port: int) -> socket.socket:
+    """Create the listening socket shared by every worker"""
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(sock: socket.socket, threads: int, slot: int, metrics_dir: str, metrics_interval: float) -> None:
+    """Serve requests in a forked worker; never returns"""
+    import service
+
+    gc.enable()
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    status = 0
+    try:
+        service.rag_pipeline.reset_after_fork(threads)
+        REGISTRY.share(metrics_dir, worker=str(slot), interval=metrics_interval)
+        server = uvicorn.Server(uvicorn.Config(service.app, lifespan="on"))
+        server.run(sockets=[sock])
+    except Exception as e:
+        logger.error(f"Worker {os.getpid()} failed: {e}")
+        status = 1
+    finally:
+        os._exit(status)
+
+
+class Master:
+    """
+    Pre-fork master process.
+
+    The pipeline (embedding model, Flashrank, keyword and vector indexes,
+    chunks) is loaded and warmed up once. The heap is then frozen and N
+    workers are forked, so the read-only assets are shared copy-on-write
+    instead of being loaded N times. The master only supervises: it
+    restarts workers that exit, reports their memory and forwards
+    SIGTERM/SIGINT for a graceful shutdown.
+
+    Workers publish their metrics to a directory created by the master, so
+    a scrape served by any worker reports all of them (see `Registry.share`).
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        threads: int,
+        uss_target_mb: float,
+        report_seconds: float,
+        metrics_interval: float = 5.0
+    ):
+        """
+        Initialize the master.
+
+        Args:
+            workers (int): Number of worker processes.
+            threads (int): Inference threads per worker.
+            uss_target_mb (float): Private memory per worker above which a warning is logged.
+            report_seconds (float): Interval between memory reports.
+            metrics_interval (float): Seconds between metric publications of each worker.
+        """
+        self.num_workers = workers
+        self.threads = threads
+        self.uss_target_mb = uss_target_mb
+        self.report_seconds = report_seconds
+        self.metrics_interval = metrics_interval
+        self.metrics_dir = None
+        self.workers: Dict[int, int] = {}
+        self.stopping = False
+        self.sock = None
+
+    def spawn(self, slot: int) -> None:
+        pid = os.fork()
+        if pid == 0:
+            run_worker(self.sock, self.threads, slot, self.metrics_dir, self.metrics_interval)
+        self.workers[pid] = slot
+        logger.info(f"Started worker {slot} (pid {pid})")
+
+    def stop(self, signum, frame) -> None:
+        if not self.stopping:
+            logger.info(f"Received signal {signum}, stopping {len(self.workers)} workers")
+        self.stopping = True
+        for pid in self.workers:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def report_memory(self) -> None:
+        """Log RSS, PSS and private memory (USS) of the master and each worker"""
+        total_pss = 0
+        for name, pid in [("master", os.getpid())] + [(f"worker {slot}", pid) for pid, slot in sorted(self.workers.items())]:
+            try:
+                memory = read_process_memory(pid)
+            except OSError:
+                continue
+            total_pss += memory.get("pss", 0)
+            logger.info(
+                f"Memory {name} (pid {pid}): rss {memory['rss'] / MB:.0f} MB, pss {memory.get('pss', 0) / MB:.0f} MB, "
+                f"shared {memory.get('shared', 0) / MB:.0f} MB, private {memory.get('private', 0) / MB:.0f} MB"
+            )
+            if name != "master" and memory.get("private", 0) > self.uss_target_mb * MB:
+                logger.warning(
+                    f"Worker {pid} holds {memory['private'] / MB:.0f} MB of private memory, "
+                    f"over the {self.uss_target_mb:.0f} MB target"
+                )
+        logger.info(f"Memory total (pss, master + {len(self.workers)} workers): {total_pss / MB:.0f} MB")
+
+    def run(self, host: str, port: int) -> None:
+        import service
+
+        start = time.perf_counter()
+        service.rag_pipeline = service.load_pipeline()
+        service.startup_seconds["warmup"] = time.perf_counter() - start
+        logger.info(f"Pipeline loaded in the master in {service.startup_seconds['warmup']:.1f} s")
+
+        self.sock = bind_socket(host, port)
+        self.metrics_dir = tempfile.mkdtemp(prefix="rag-metrics-")
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        # Move everything loaded so far out of the collector's reach, so
+        # collections in the workers do not write to the shared pages
+        gc.freeze()
+        for slot in range(self.num_workers):
+            self.spawn(slot)
+        logger.info(f"Serving on {host}:{port} with {self.num_workers} workers ({self.threads} threads each)")
+
+        next_report = time.monotonic() + min(self.report_seconds, 30)
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                break
+            if pid == 0:
+                if time.monotonic() >= next_report and not self.stopping:
+                    self.report_memory()
+                    next_report = time.monotonic() + self.report_seconds
+                time.sleep(0.5)
+                continue
+            slot = self.workers.pop(pid)
+            # The replacement starts its counters from zero under the same worker label
+            try:
+                os.remove(shared_metrics_path(self.metrics_dir, str(slot)))
+            except FileNotFoundError:
+                pass
+            if not self.stopping:
+                logger.warning(f"Worker {slot} (pid {pid}) exited with status {os.waitstatus_to_exitcode(status)}, restarting")
+                self.spawn(slot)
+        shutil.rmtree(self.metrics_dir, ignore_errors=True)
+        logger.info("All workers stopped")
+
+
+def main():
+    args = create_parser().parse_args()
+    if sys.platform == "win32":
+        raise SystemExit("Pre-fork serving needs os.fork; run service.py instead")
+    workers = max(1, args.workers)
+    threads = args.threads or max(1, (os.cpu_count() or 1) // workers)
+    # The master runs single-threaded inference only: OpenMP and the Rust
+    # tokenizers are not fork-safe once their thread pools exist. Workers
+    # set their own thread count after fork.
+    os.environ.setdefault("OMP_NUM_THREADS", "1")
+    os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+    master = Master(
+        workers=workers,
+        threads=threads,
+        uss_target_mb=float(os.getenv("PREFORK_WORKER_USS_TARGET_MB", "250")),
+        report_seconds=float(os.getenv("PREFORK_MEMORY_REPORT_SECONDS", "300")),
+        metrics_interval=float(os.getenv("PREFORK_METRICS_INTERVAL_SECONDS", "5"))
+    )
+    master.run(args.host, args.port)
+
+
+if __name__ == "__main__":
+    main()
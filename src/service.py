@@ -1,23 +1,157 @@
+import time
+
+_IMPORT_STARTED = time.perf_counter()
+
 import os
+import json
+import asyncio
+import secrets
+from contextlib import asynccontextmanager
+from typing import TYPE_CHECKING, Optional
+
 import uvicorn
-from fastapi import FastAPI, HTTPException, APIRouter
-from pipeline.rag import RAGPipeline
-from models import QuestionRequest, Response
+from fastapi import FastAPI, Header, HTTPException, APIRouter
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pipeline.memory import collect_memory_metrics
+from pipeline.metrics import REGISTRY
+from models import BatchItemResult, BatchQuestionRequest, BatchResponse, QuestionRequest, Response
 from pipeline.utils import init_logger
 
+# The pipeline module pulls in LangChain, SQLAlchemy, Flashrank and the
+# embedding stack; it is imported by the warmup, not at module import
+if TYPE_CHECKING:
+    from pipeline.rag import RAGPipeline
+
 logger = init_logger()
 
+PROJECT_DIR = os.path.dirname(os.path.dirname(__file__))
+WARMUP_RETRY_SECONDS = float(os.getenv("WARMUP_RETRY_SECONDS", "10"))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "64"))
+INDEX_WATCH_SECONDS = float(os.getenv("INDEX_WATCH_SECONDS", "30"))
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+rag_pipeline: Optional["RAGPipeline"] = None
+warmup_error: Optional[str] = None
+startup_seconds = {}
+
+
+def load_pipeline() -> "RAGPipeline":
+    """
+    Build and warm up the RAG pipeline (blocking).
+
+    Returns:
+        RAGPipeline: The ready pipeline.
+    """
+    from pipeline.rag import RAGPipeline
+
+    pipeline = RAGPipeline(
+        os.path.join(PROJECT_DIR, "output", "documents"),
+        keyword_index_dir=os.path.join(PROJECT_DIR, "output", "keyword_index"),
+        vector_index_dir=os.path.join(PROJECT_DIR, "output", "vector_index"),
+        snapshots_dir=os.path.join(PROJECT_DIR, "output", "snapshots")
+    )
+    pipeline.warmup()
+    return pipeline
+
+
+async def warmup() -> None:
+    """Load the pipeline in a worker thread, retrying until it succeeds."""
+    global rag_pipeline, warmup_error
+    start = time.perf_counter()
+    while rag_pipeline is None:
+        try:
+            rag_pipeline = await asyncio.to_thread(load_pipeline)
+        except Exception as e:
+            warmup_error = str(e)
+            logger.error(f"Warmup failed, retrying in {WARMUP_RETRY_SECONDS:.0f} s: {e}")
+            await asyncio.sleep(WARMUP_RETRY_SECONDS)
+    warmup_error = None
+    startup_seconds["warmup"] = time.perf_counter() - start
+    logger.info(f"RAG pipeline ready in {startup_seconds['warmup']:.1f} s")
+
+
+async def watch_index() -> None:
+    """Swap in the indexes of each snapshot `etl/indexing.py` publishes, without a restart."""
+    while True:
+        await asyncio.sleep(INDEX_WATCH_SECONDS)
+        pipeline = rag_pipeline
+        if pipeline is None:
+            continue
+        try:
+            if pipeline.snapshot_changed():
+                await asyncio.to_thread(pipeline.reload)
+        except Exception as e:
+            logger.error(f"Index reload failed, still serving snapshot {pipeline.snapshot.name}: {e}")
+
+
+def collect_startup_metrics():
+    lines = [
+        "# HELP rag_startup_seconds Time spent in each startup phase.",
+        "# TYPE rag_startup_seconds gauge",
+    ]
+    lines += [f'rag_startup_seconds{{phase="{phase}"}} {seconds}' for phase, seconds in startup_seconds.items()]
+    lines += [
+        "# HELP rag_ready Whether the pipeline has finished warming up.",
+        "# TYPE rag_ready gauge",
+        f"rag_ready {int(rag_pipeline is not None)}",
+    ]
+    return lines
+
+
+REGISTRY.add_collector(collect_startup_metrics)
+REGISTRY.add_collector(collect_memory_metrics)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    logger.info(f"Service module imported in {startup_seconds['import'] * 1000:.0f} ms")
+    # A pre-fork worker inherits a warmed up pipeline from its parent
+    task = asyncio.create_task(warmup()) if rag_pipeline is None else None
+    watcher = asyncio.create_task(watch_index()) if INDEX_WATCH_SECONDS > 0 else None
+    yield
+    for background in (task, watcher):
+        if background is not None:
+            background.cancel()
+
+
+def get_pipeline() -> "RAGPipeline":
+    """
+    Get the pipeline, or fail with 503 while it is still warming up.
+
+    Returns:
+        RAGPipeline: The ready pipeline.
+    """
+    if rag_pipeline is None:
+        raise HTTPException(status_code=503, detail=warmup_error or "Service is warming up")
+    return rag_pipeline
+
+
+def validate_method(pipeline: "RAGPipeline", request: QuestionRequest) -> None:
+    """
+    Reject a question whose retrieval method the serving indexes do not support.
+
+    Args:
+        pipeline (RAGPipeline): The ready pipeline.
+        request (QuestionRequest): The question request.
+
+    Raises:
+        HTTPException: 400 when the method is not supported.
+    """
+    try:
+        pipeline.validate_method(request.method)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
 app = FastAPI(
     title="RAG API",
     description="API for Question Answering using RAG with multiple retrieval methods",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 router = APIRouter(prefix="/api/v1")
 
-PROJECT_DIR = os.path.dirname(os.path.dirname(__file__))
-rag_pipeline = RAGPipeline(os.path.join(PROJECT_DIR, "output", "combined_output.txt"))
-
 @router.post("/ask", response_model=Response)
 async def ask_question(request: QuestionRequest):
     """
@@ -29,10 +163,12 @@ async def ask_question(request: QuestionRequest):
     Returns:
         Response: The response from the RAG system.
     """
+    pipeline = get_pipeline()
+    validate_method(pipeline, request)
     try:
         logger.info(f"Received question for session {request.session_id} using {request.method}")
         
-        answer, metadata = rag_pipeline.get_response(
+        answer, metadata = await pipeline.aget_response(
             session_id=request.session_id,
             query=request.query,
             method=request.method
@@ -42,19 +178,7 @@ async def ask_question(request: QuestionRequest):
             "session_id": request.session_id,
             "query": request.query,
             "answer": answer,
-            "metadata": {
-                "method": metadata.method,
-                "model": metadata.model,
-                "retriever_config": {
-                    "type": metadata.retriever_config.type,
-                    "collection": metadata.retriever_config.collection,
-                    "top_k": metadata.retriever_config.top_k,
-                    "vector_store_top_k": metadata.retriever_config.vector_store_top_k,
-                    "bm25_top_k": metadata.retriever_config.bm25_top_k,
-                    "weights": metadata.retriever_config.weights,
-                    "rerank_top_n": metadata.retriever_config.rerank_top_n
-                }
-            }
+            "metadata": metadata
         }
         
         return Response(**response_data)
@@ -63,18 +187,150 @@ async def ask_question(request: QuestionRequest):
         logger.error(f"Error processing request for session {request.session_id}: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/ask/batch", response_model=BatchResponse)
+async def ask_batch(request: BatchQuestionRequest):
+    """
+    Endpoint to answer many questions in one request.
+
+    Queries are embedded, retrieved and reranked together and the LLM calls
+    run concurrently under a rate limit. Every question gets its own result;
+    a failed question carries an `error` instead of an answer.
+
+    Args:
+        request (BatchQuestionRequest): The questions to answer.
+
+    Returns:
+        BatchResponse: One result per question, in request order.
+    """
+    pipeline = get_pipeline()
+    if not request.questions:
+        raise HTTPException(status_code=400, detail="The batch has no questions")
+    if len(request.questions) > BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=400,
+            detail=f"The batch has {len(request.questions)} questions, the maximum is {BATCH_MAX_SIZE}"
+        )
+    try:
+        logger.info(f"Received batch of {len(request.questions)} questions")
+        outcomes = await pipeline.abatch_response(request.questions)
+    except Exception as e:
+        logger.error(f"Error processing batch request: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+    results = []
+    for index, (question, outcome) in enumerate(zip(request.questions, outcomes)):
+        result = BatchItemResult(index=index, session_id=question.session_id, query=question.query)
+        if isinstance(outcome, Exception):
+            result.error = str(outcome)
+        else:
+            result.answer, result.metadata = outcome
+        results.append(result)
+    failed = sum(result.error is not None for result in results)
+    return BatchResponse(results=results, succeeded=len(results) - failed, failed=failed)
+
+@router.post("/ask/stream")
+async def ask_question_stream(request: QuestionRequest):
+    """
+    Endpoint to ask questions and stream the answer as NDJSON.
+
+    The first line carries the retrieval metadata, followed by one line per
+    answer token and a final `done` line. An unsupported method is rejected
+    with 400 before the stream starts; errors after it has started are
+    reported as an `error` line.
+
+    Args:
+        request (QuestionRequest): The question request.
+
+    Returns:
+        StreamingResponse: Newline-delimited JSON events.
+    """
+    pipeline = get_pipeline()
+    validate_method(pipeline, request)
+    logger.info(f"Received streaming question for session {request.session_id} using {request.method}")
+
+    async def event_stream():
+        try:
+            async for event in pipeline.astream_response(
+                session_id=request.session_id,
+                query=request.query,
+                method=request.method
+            ):
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            logger.error(f"Error streaming request for session {request.session_id}: {e}")
+            yield json.dumps({"event": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
+@router.post("/admin/reload")
+async def reload_index(force: bool = False, x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Endpoint to load the latest index snapshot and swap it in.
+
+    The new indexes are loaded and warmed up in a worker thread while
+    requests keep being served from the current ones; requests in flight
+    finish on the snapshot they started with. Requires the `X-Admin-Token`
+    header to match `ADMIN_TOKEN`; disabled when it is not set.
+
+    Args:
+        force (bool): Reload even when the latest snapshot is already loaded.
+        x_admin_token (Optional[str]): The admin token.
+
+    Returns:
+        dict: Whether a new snapshot was swapped in, and the serving snapshot.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled, set ADMIN_TOKEN")
+    if not secrets.compare_digest(x_admin_token or "", ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+    pipeline = get_pipeline()
+    try:
+        reloaded = await asyncio.to_thread(pipeline.reload, force)
+    except Exception as e:
+        logger.error(f"Index reload failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"reloaded": reloaded, "snapshot": pipeline.snapshot.name, "version": pipeline.snapshot.version}
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def metrics():
+    """
+    Prometheus metrics endpoint: per-stage latency histograms, candidate
+    counts, LLM time to first token and token counts, and cache statistics.
+
+    Returns:
+        PlainTextResponse: Metrics in the Prometheus text exposition format.
+    """
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
 @router.get("/health")
 async def health_check():
     """
-    Health check endpoint.
+    Health check endpoint (liveness): the process is up and serving.
 
     Returns:
         dict: The health check response.
     """
     return {"status": "healthy"}
 
+@router.get("/ready")
+async def readiness_check():
+    """
+    Readiness endpoint: 200 once the pipeline has warmed up, 503 before.
+
+    Returns:
+        JSONResponse: The readiness status.
+    """
+    if rag_pipeline is not None:
+        return {"status": "ready"}
+    content = {"status": "warming_up"}
+    if warmup_error:
+        content["detail"] = warmup_error
+    return JSONResponse(status_code=503, content=content)
+
 
 app.include_router(router)
 
+startup_seconds["import"] = time.perf_counter() - _IMPORT_STARTED
+
 if __name__ == "__main__":
     uvicorn.run("service:app", host="0.0.0.0", port=8000)
\ No newline at end of file
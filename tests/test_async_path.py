@@ -0,0 +1,104 @@
+import asyncio
+
+import pytest
+
+rag = pytest.importorskip("pipeline.rag")
+
+from models import Metadata, RetrievalMethod, RetrieverConfig
+from pipeline.snapshot import IndexSnapshot
+
+
+def make_pipeline(max_concurrency: int, retrieve_delay: float = 0.05):
+    """RAGPipeline whose retrieval sleeps on the event loop and records how many requests overlap"""
+    pipeline = rag.RAGPipeline.__new__(rag.RAGPipeline)
+    pipeline.snapshot = IndexSnapshot(name=None, version="v1", keyword_retriever=None, hybrid_retriever=None)
+    pipeline.inflight = None
+    pipeline.answer_cache = None
+    pipeline.expose_timings = False
+    pipeline.max_concurrency = max_concurrency
+    pipeline._semaphore = asyncio.Semaphore(max_concurrency)
+    pipeline.in_flight = 0
+    pipeline.reloads = 0
+    pipeline.active = 0
+    pipeline.peak = 0
+    pipeline.gauges = []
+
+    async def aretrieve(query, method, snapshot):
+        pipeline.active += 1
+        pipeline.peak = max(pipeline.peak, pipeline.active)
+        pipeline.gauges.append(next(
+            line for line in pipeline._collect_metrics() if line.startswith("rag_requests_in_flight ")
+        ))
+        try:
+            await asyncio.sleep(retrieve_delay)
+            if query == "gagal":
+                raise RuntimeError("retrieval failed")
+            return []
+        finally:
+            pipeline.active -= 1
+
+    async def astream_answer(context, query, trace):
+        for token in ["jawaban ", query]:
+            yield token
+
+    pipeline.aretrieve = aretrieve
+    pipeline._astream_answer = astream_answer
+    pipeline._get_metadata = lambda method: Metadata(
+        method=method, model="stub", retriever_config=RetrieverConfig(type="native", collection="test")
+    )
+    return pipeline
+
+
+def test_requests_beyond_max_concurrency_wait_for_a_slot():
+    pipeline = make_pipeline(max_concurrency=2)
+
+    async def ask_all():
+        return await asyncio.gather(*[
+            pipeline.aget_response(f"s{i}", f"q{i}", RetrievalMethod.NATIVE) for i in range(6)
+        ])
+
+    results = asyncio.run(ask_all())
+
+    assert [answer for answer, _ in results] == [f"jawaban q{i}" for i in range(6)]
+    assert pipeline.peak == 2
+    assert set(pipeline.gauges) == {"rag_requests_in_flight 1", "rag_requests_in_flight 2"}
+    assert pipeline.in_flight == 0
+
+
+def test_event_loop_keeps_running_while_requests_wait():
+    pipeline = make_pipeline(max_concurrency=1, retrieve_delay=0.05)
+    ticks = []
+
+    async def heartbeat():
+        for _ in range(5):
+            ticks.append(len(ticks))
+            await asyncio.sleep(0.02)
+
+    async def run():
+        await asyncio.gather(
+            heartbeat(), *[pipeline.aget_response("s", f"q{i}", RetrievalMethod.NATIVE) for i in range(3)]
+        )
+
+    asyncio.run(run())
+
+    assert len(ticks) == 5
+
+
+def test_failed_request_releases_its_slot():
+    pipeline = make_pipeline(max_concurrency=1)
+
+    async def ask(query):
+        return await pipeline.aget_response("s", query, RetrievalMethod.NATIVE)
+
+    with pytest.raises(RuntimeError, match="retrieval failed"):
+        asyncio.run(ask("gagal"))
+    assert pipeline.in_flight == 0
+    assert asyncio.run(ask("lagi"))[0] == "jawaban lagi"
+
+
+def test_unsupported_method_is_rejected_before_taking_a_slot():
+    pipeline = make_pipeline(max_concurrency=1)
+
+    with pytest.raises(ValueError, match="Invalid retrieval method"):
+        asyncio.run(pipeline.aget_response("s", "q", RetrievalMethod.MEMMAP))
+    assert pipeline.peak == 0
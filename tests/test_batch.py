@@ -0,0 +1,67 @@
+import asyncio
+
+import httpx
+import pytest
+
+import service
+from models import Metadata, RetrievalMethod, RetrieverConfig
+
+
+class StubPipeline:
+    """Answers every question except those containing "gagal", which fail on their own"""
+
+    def __init__(self):
+        self.batches = []
+
+    async def abatch_response(self, questions):
+        self.batches.append([question.query for question in questions])
+        metadata = Metadata(
+            method=RetrievalMethod.HYBRID, model="stub", retriever_config=RetrieverConfig(type="hybrid", collection="test")
+        )
+        return [
+            RuntimeError(f"tidak bisa menjawab {q.query}") if "gagal" in q.query else (f"jawaban {q.query}", metadata)
+            for q in questions
+        ]
+
+
+def post_batch(queries, pipeline):
+    async def post():
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            questions = [{"session_id": f"s{i}", "query": q, "method": "hybrid"} for i, q in enumerate(queries)]
+            return await client.post("/api/v1/ask/batch", json={"questions": questions})
+
+    service.rag_pipeline = pipeline
+    try:
+        return asyncio.run(post())
+    finally:
+        service.rag_pipeline = None
+
+
+def test_failed_questions_do_not_fail_the_batch():
+    response = post_batch(["cuti", "gagal lembur", "gaji"], StubPipeline())
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["succeeded"], body["failed"]) == (2, 1)
+    assert [result["index"] for result in body["results"]] == [0, 1, 2]
+    assert [result["answer"] for result in body["results"]] == ["jawaban cuti", None, "jawaban gaji"]
+    assert body["results"][1]["error"] == "tidak bisa menjawab gagal lembur"
+    assert body["results"][1]["session_id"] == "s1"
+
+
+@pytest.mark.parametrize("size, status", [(0, 400), (3, 200), (4, 400)])
+def test_batch_size_is_limited(monkeypatch, size, status):
+    monkeypatch.setattr(service, "BATCH_MAX_SIZE", 3)
+    pipeline = StubPipeline()
+
+    response = post_batch([f"q{i}" for i in range(size)], pipeline)
+
+    assert response.status_code == status
+    assert len(pipeline.batches) == (status == 200)
+
+
+def test_batch_is_rejected_while_warming_up():
+    response = post_batch(["cuti"], None)
+
+    assert response.status_code == 503
@@ -0,0 +1,58 @@
+import random
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from rank_bm25 import BM25Okapi
+
+from pipeline.bm25 import BM25Matrix, SparseBM25Retriever, top_k_indices
+
+WORDS = ["cuti", "lembur", "gaji", "izin", "sakit", "tahunan", "atasan", "formulir", "hari", "kerja", "karyawan", "HRD"]
+# Rare terms keep IDF positive for most words, as in a real corpus
+VOCAB = WORDS + [f"istilah{i}" for i in range(300)]
+
+
+@pytest.fixture
+def corpus():
+    rng = random.Random(7)
+    return [" ".join(rng.choices(VOCAB, k=rng.randint(3, 40))) for _ in range(200)]
+
+
+QUERIES = ["cuti tahunan", "lembur hari kerja", "gaji gaji karyawan", "formulir izin istilah7 atasan", "tidak ada"]
+
+
+def test_scores_match_rank_bm25(corpus):
+    reference = BM25Okapi([text.split() for text in corpus])
+    matrix = BM25Matrix.from_texts(corpus)
+
+    for query in QUERIES:
+        expected = reference.get_scores(query.split())
+        np.testing.assert_allclose(matrix.get_scores(query.split()), expected, rtol=1e-6, atol=1e-6)
+
+
+def test_batch_scores_match_single_queries(corpus):
+    matrix = BM25Matrix.from_texts(corpus)
+    batch = matrix.get_scores_batch([query.split() for query in QUERIES])
+
+    for scores, query in zip(batch, QUERIES):
+        np.testing.assert_allclose(scores, matrix.get_scores(query.split()), rtol=1e-6)
+
+
+def test_top_k_indices_are_sorted_best_first():
+    scores = np.array([0.5, 3.0, 1.0, 2.0, 0.0], dtype=np.float32)
+
+    assert top_k_indices(scores, 3).tolist() == [1, 3, 2]
+    assert top_k_indices(scores, 10).tolist() == [1, 3, 2, 0, 4]
+    assert top_k_indices(scores, 0).tolist() == []
+
+
+def test_retriever_returns_the_same_documents_as_rank_bm25(corpus):
+    documents = [Document(page_content=text) for text in corpus]
+    retriever = SparseBM25Retriever.from_documents(documents, k=4)
+    reference = BM25Okapi([text.split() for text in corpus])
+
+    for query, docs in zip(QUERIES[:4], retriever.search_batch(QUERIES[:4])):
+        expected = reference.get_scores(query.split())
+        assert [expected[corpus.index(doc.page_content)] for doc in docs] == pytest.approx(
+            sorted(expected, reverse=True)[:4], rel=1e-6
+        )
@@ -0,0 +1,92 @@
+import pytest
+
+from pipeline import cache as cache_module
+from pipeline.cache import SemanticCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(cache_module.time, "time", clock)
+    return clock
+
+
+def test_lookup_hits_above_threshold_only(clock):
+    cache = SemanticCache(threshold=0.9)
+    cache.add([1.0, 0.0, 0.0], "hybrid", "v1", "jawaban", {"model": "stub"})
+
+    assert cache.lookup([2.0, 0.1, 0.0], "hybrid", "v1") == ("jawaban", {"model": "stub"})
+    assert cache.lookup([1.0, 1.0, 0.0], "hybrid", "v1") is None
+    assert cache.lookup([1.0, 0.0, 0.0], "native", "v1") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = SemanticCache(ttl=60)
+    cache.add([1.0, 0.0], "hybrid", "v1", "jawaban", None)
+
+    clock.now += 59
+    assert cache.lookup([1.0, 0.0], "hybrid", "v1") is not None
+    clock.now += 2
+    assert cache.lookup([1.0, 0.0], "hybrid", "v1") is None
+
+    cache.add([0.0, 1.0], "hybrid", "v1", "baru", None)
+    assert len(cache) == 1
+
+
+def test_least_recently_used_entry_is_evicted(clock):
+    cache = SemanticCache(max_entries=2)
+    cache.add([1.0, 0.0, 0.0], "hybrid", "v1", "a", None)
+    cache.add([0.0, 1.0, 0.0], "hybrid", "v1", "b", None)
+    assert cache.lookup([1.0, 0.0, 0.0], "hybrid", "v1")[0] == "a"
+
+    cache.add([0.0, 0.0, 1.0], "hybrid", "v1", "c", None)
+
+    assert len(cache) == 2
+    assert cache.lookup([0.0, 1.0, 0.0], "hybrid", "v1") is None
+    assert cache.lookup([1.0, 0.0, 0.0], "hybrid", "v1")[0] == "a"
+    assert cache.lookup([0.0, 0.0, 1.0], "hybrid", "v1")[0] == "c"
+
+
+def test_new_index_version_does_not_see_old_answers(clock):
+    cache = SemanticCache()
+    cache.add([1.0, 0.0], "hybrid", "v1", "lama", None)
+
+    assert cache.lookup([1.0, 0.0], "hybrid", "v2") is None
+
+    cache.add([1.0, 0.0], "hybrid", "v2", "baru", None)
+    assert cache.lookup([1.0, 0.0], "hybrid", "v2")[0] == "baru"
+    assert cache.lookup([1.0, 0.0], "hybrid", "v1")[0] == "lama"
+
+
+def test_byte_cap_counts_metadata(clock):
+    cache = SemanticCache(max_bytes=4096)
+    cache.add([1.0, 0.0], "hybrid", "v1", "a", {"sources": "x" * 2000})
+    cache.add([0.0, 1.0], "hybrid", "v1", "b", {"sources": "x" * 2000})
+
+    assert len(cache) == 1
+    assert cache.lookup([1.0, 0.0], "hybrid", "v1") is None
+    assert cache.lookup([0.0, 1.0], "hybrid", "v1")[0] == "b"
+
+    cache.add([1.0, 1.0], "hybrid", "v1", "terlalu besar", {"sources": "x" * 5000})
+    assert cache.lookup([1.0, 1.0], "hybrid", "v1") is None
+
+
+def test_evicted_rows_are_reused(clock):
+    cache = SemanticCache(max_entries=2)
+    for i in range(5):
+        vector = [0.0] * 5
+        vector[i] = 1.0
+        cache.add(vector, "hybrid", "v1", str(i), None)
+
+    assert cache._matrix.shape == (2, 5)
+    assert [cache.lookup([1.0 if j == i else 0.0 for j in range(5)], "hybrid", "v1") is not None
+            for i in range(5)] == [False, False, False, True, True]
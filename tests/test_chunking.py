@@ -0,0 +1,59 @@
+import pytest
+from langchain_core.documents import Document
+
+from common import chunking
+from common.chunking import chunk_ids, load_corpus_chunks, load_document_chunks, split_documents
+
+
+def chunks(*texts):
+    return [Document(page_content=text) for text in texts]
+
+
+def test_chunk_ids_are_stable_and_tell_duplicates_apart():
+    ids = chunk_ids("a.pdf", chunks("cuti", "lembur", "cuti"))
+
+    assert ids == chunk_ids("a.pdf", chunks("cuti", "lembur", "cuti"))
+    assert len(set(ids)) == 3
+    assert chunk_ids("b.pdf", chunks("cuti")) != ids[:1]
+
+
+def test_chunk_ids_survive_edits_elsewhere_in_the_document():
+    before = chunk_ids("a.pdf", chunks("cuti", "lembur", "gaji"))
+    after = chunk_ids("a.pdf", chunks("cuti", "lembur diubah", "gaji"))
+
+    assert (after[0], after[2]) == (before[0], before[2])
+    assert after[1] != before[1]
+
+
+def test_chunks_never_cross_documents():
+    tiktoken = pytest.importorskip("tiktoken")
+    try:
+        tiktoken.get_encoding("gpt2")
+    except Exception:
+        pytest.skip("tiktoken encoding is not available offline")
+    first = " ".join(["cuti"] * 400)
+    second = " ".join(["lembur"] * 400)
+
+    split = split_documents([Document(page_content=first), Document(page_content=second)])
+
+    assert len(split) > 2
+    assert all(set(chunk.page_content.split()) in ({"cuti"}, {"lembur"}) for chunk in split)
+
+
+def test_empty_document_has_no_chunks(tmp_path):
+    path = tmp_path / "kosong.txt"
+    path.write_text("")
+
+    assert load_document_chunks(str(path)) == []
+
+
+def test_corpus_is_chunked_one_document_at_a_time(tmp_path, monkeypatch):
+    loaded = []
+    monkeypatch.setattr(chunking, "load_document_chunks", lambda path: loaded.append(path) or chunks(path))
+    for name in ["b.txt", "a.txt", "a.md"]:
+        (tmp_path / name).write_text("cuti")
+
+    corpus = load_corpus_chunks(str(tmp_path))
+
+    assert loaded == [str(tmp_path / "a.txt"), str(tmp_path / "b.txt")]
+    assert [chunk.page_content for chunk in corpus] == loaded
@@ -0,0 +1,69 @@
+import asyncio
+
+import httpx
+import pytest
+
+rag = pytest.importorskip("pipeline.rag")
+
+import service
+from models import Metadata, RetrievalMethod, RetrieverConfig
+from pipeline.singleflight import SingleFlight
+from pipeline.snapshot import IndexSnapshot
+
+
+def make_pipeline(answer_delay: float):
+    """RAGPipeline without models or databases; answering sleeps and counts its calls"""
+    pipeline = rag.RAGPipeline.__new__(rag.RAGPipeline)
+    pipeline.snapshot = IndexSnapshot(name=None, version="v1", keyword_retriever=None, hybrid_retriever=None)
+    pipeline.inflight = SingleFlight()
+    pipeline.expose_timings = False
+    pipeline.answered = []
+
+    async def answer(session_id, query, method, snapshot, trace):
+        pipeline.answered.append(session_id)
+        await asyncio.sleep(answer_delay)
+        metadata = Metadata(
+            method=method, model="stub", retriever_config=RetrieverConfig(type="native", collection="test")
+        )
+        return f"answer to {query}", metadata, "ok"
+
+    pipeline._aanswer = answer
+    return pipeline
+
+
+async def ask(client: httpx.AsyncClient, session_id: str, query: str) -> dict:
+    response = await client.post(
+        "/api/v1/ask", json={"session_id": session_id, "query": query, "method": RetrievalMethod.NATIVE.value}
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+async def ask_concurrently(pipeline, queries: list[str]) -> list[dict]:
+    service.rag_pipeline = pipeline
+    try:
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await asyncio.gather(*[ask(client, f"s{i}", q) for i, q in enumerate(queries)])
+    finally:
+        service.rag_pipeline = None
+
+
+def test_identical_concurrent_questions_share_one_answer():
+    pipeline = make_pipeline(answer_delay=0.2)
+    first, second = asyncio.run(
+        ask_concurrently(pipeline, ["Bagaimana prosedur cuti?", "  bagaimana PROSEDUR   cuti? "])
+    )
+
+    assert len(pipeline.answered) == 1
+    assert first["answer"] == second["answer"]
+    assert sorted([first["metadata"]["coalesced"], second["metadata"]["coalesced"]]) == [False, True]
+    assert len(pipeline.inflight) == 0
+
+
+def test_different_questions_are_not_coalesced():
+    pipeline = make_pipeline(answer_delay=0.05)
+    results = asyncio.run(ask_concurrently(pipeline, ["Bagaimana prosedur cuti?", "Siapa yang menyetujui?"]))
+
+    assert len(pipeline.answered) == 2
+    assert not any(result["metadata"]["coalesced"] for result in results)
@@ -0,0 +1,78 @@
+from langchain_core.documents import Document
+
+from pipeline.context import ContextAssembler
+
+
+class WordCounter:
+    """One token per whitespace-separated word"""
+
+    def count(self, text: str) -> int:
+        return len(text.split())
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        return " ".join(text.split()[:max_tokens])
+
+
+def docs(*texts):
+    return [Document(page_content=text) for text in texts]
+
+
+def words(start: int, end: int) -> str:
+    return " ".join(f"kata{i}" for i in range(start, end))
+
+
+def make_assembler(**kwargs) -> ContextAssembler:
+    return ContextAssembler(counter=WordCounter(), min_overlap_chars=20, **kwargs)
+
+
+def test_overlapping_chunks_are_merged_in_either_order():
+    first, second = words(0, 30), words(20, 50)
+
+    for chunks in [(first, second), (second, first)]:
+        context = make_assembler().assemble(docs(*chunks))
+        assert context.passages == [words(0, 50)]
+        assert context.merged == 1
+
+
+def test_near_duplicates_are_dropped_and_order_is_kept():
+    context = make_assembler(duplicate_threshold=0.9).assemble(
+        docs(words(100, 120), words(0, 40), words(0, 39) + " lain", words(200, 210), "   ")
+    )
+
+    assert context.passages == [words(100, 120), words(0, 40), words(200, 210)]
+    assert context.duplicates == 1
+    assert context.text == "\n\n".join(context.passages)
+
+
+def test_merged_passage_absorbs_later_passages_it_now_continues():
+    context = make_assembler().assemble(docs(words(0, 30), words(50, 80), words(20, 60)))
+
+    assert context.passages == [words(0, 80)]
+
+
+def test_passages_are_packed_into_the_token_budget():
+    context = make_assembler(token_budget=50, min_passage_tokens=5).assemble(
+        docs(words(0, 30), words(100, 130), words(200, 205))
+    )
+
+    # The second passage crosses the budget and is cut to the remaining room
+    assert context.passages == [words(0, 30), words(100, 120)]
+    assert context.truncated
+    assert context.tokens == 50
+
+
+def test_passage_with_too_little_room_is_skipped_for_a_shorter_one():
+    context = make_assembler(token_budget=40, min_passage_tokens=20).assemble(
+        docs(words(0, 30), words(100, 130), words(200, 205))
+    )
+
+    assert context.passages == [words(0, 30), words(200, 205)]
+    assert not context.truncated
+    assert context.tokens == 35
+
+
+def test_no_budget_keeps_everything():
+    context = make_assembler(token_budget=None).assemble(docs(words(0, 300), words(400, 700)))
+
+    assert context.tokens == 600
+    assert len(context.passages) == 2
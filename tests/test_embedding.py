@@ -0,0 +1,93 @@
+import asyncio
+import threading
+from typing import List
+
+import pytest
+from langchain_core.embeddings import Embeddings
+
+from pipeline.embedding import BatchingEmbeddings
+
+
+class CountingEmbeddings(Embeddings):
+    """Embeds a text as [len(text)] and records every batch it receives"""
+
+    def __init__(self, fail: bool = False):
+        self.batches: List[List[str]] = []
+        self.fail = fail
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model down")
+        return [[float(len(text))] for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
+
+
+def test_concurrent_queries_share_one_batch():
+    base = CountingEmbeddings()
+    embeddings = BatchingEmbeddings(base, max_batch_size=8, max_wait_ms=200)
+    texts = ["a", "bb", "ccc", "bb"]
+    results = [None] * len(texts)
+    barrier = threading.Barrier(len(texts))
+
+    def embed(i):
+        barrier.wait()
+        results[i] = embeddings.embed_query(texts[i])
+
+    threads = [threading.Thread(target=embed, args=(i,)) for i in range(len(texts))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [[1.0], [2.0], [3.0], [2.0]]
+    assert len(base.batches) == 1
+    assert sorted(base.batches[0]) == ["a", "bb", "ccc"]
+
+
+def test_batches_are_capped_at_max_batch_size():
+    base = CountingEmbeddings()
+    embeddings = BatchingEmbeddings(base, max_batch_size=2, max_wait_ms=200)
+
+    async def embed_all():
+        return await asyncio.gather(*[embeddings.aembed_query("x" * n) for n in range(1, 6)])
+
+    assert asyncio.run(embed_all()) == [[float(n)] for n in range(1, 6)]
+    assert all(len(batch) <= 2 for batch in base.batches)
+    assert sum(len(batch) for batch in base.batches) == 5
+
+
+def test_cache_evicts_least_recently_used_queries():
+    base = CountingEmbeddings()
+    embeddings = BatchingEmbeddings(base, cache_size=2, max_wait_ms=0)
+    embeddings.embed_query("a")
+    embeddings.embed_query("bb")
+    embeddings.embed_query("a")
+    embeddings.embed_query("ccc")
+
+    embeddings.embed_query("a")
+    assert len(base.batches) == 3
+    embeddings.embed_query("bb")
+    assert base.batches[-1] == ["bb"]
+
+
+def test_embed_queries_embeds_misses_in_one_call_and_caches_them():
+    base = CountingEmbeddings()
+    embeddings = BatchingEmbeddings(base, max_wait_ms=0)
+    embeddings.embed_query("a")
+
+    assert embeddings.embed_queries(["a", "bb", "ccc", "bb"]) == [[1.0], [2.0], [3.0], [2.0]]
+    assert base.batches[-1] == ["bb", "ccc"]
+    embeddings.embed_query("ccc")
+    assert len(base.batches) == 2
+
+
+def test_model_errors_reach_every_waiting_query():
+    embeddings = BatchingEmbeddings(CountingEmbeddings(fail=True), max_wait_ms=0)
+
+    with pytest.raises(RuntimeError, match="model down"):
+        embeddings.embed_query("a")
+    with pytest.raises(RuntimeError, match="model down"):
+        embeddings.embed_query("a")
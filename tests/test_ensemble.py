@@ -0,0 +1,56 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import List
+
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+
+from pipeline.ensemble import ConcurrentEnsembleRetriever
+
+
+class StubRetriever(BaseRetriever):
+    """Returns one document after sleeping"""
+
+    name: str
+    delay: float = 0.0
+
+    def _get_relevant_documents(
+        self, query: str, *, run_manager: CallbackManagerForRetrieverRun
+    ) -> List[Document]:
+        time.sleep(self.delay)
+        return [Document(page_content=f"{self.name}: {query}")]
+
+
+def make_ensemble(vector_delay: float, max_workers: int = 2) -> ConcurrentEnsembleRetriever:
+    return ConcurrentEnsembleRetriever(
+        retrievers=[StubRetriever(name="vector", delay=vector_delay), StubRetriever(name="keyword")],
+        weights=[0.5, 0.5],
+        timeouts=[0.05, 0.3],
+        names=["vector", "keyword"],
+        max_workers=max_workers
+    )
+
+
+def test_both_branches_are_fused():
+    docs = make_ensemble(vector_delay=0).invoke("cuti")
+
+    assert sorted(doc.page_content for doc in docs) == ["keyword: cuti", "vector: cuti"]
+
+
+def test_slow_vector_branch_does_not_starve_keyword_branch():
+    # More concurrent calls than pool threads: the timed-out vector calls keep
+    # their threads for a second, the keyword branch must still answer in time
+    ensemble = make_ensemble(vector_delay=1.0, max_workers=2)
+
+    def ask(i: int):
+        start = time.perf_counter()
+        docs = ensemble.invoke(f"q{i}")
+        return docs, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=8) as callers:
+        results = list(callers.map(ask, range(8)))
+
+    for i, (docs, elapsed) in enumerate(results):
+        assert [doc.page_content for doc in docs] == [f"keyword: q{i}"]
+        assert elapsed < 0.3
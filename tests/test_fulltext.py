@@ -0,0 +1,94 @@
+from types import SimpleNamespace
+
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+
+from pipeline.ensemble import ConcurrentEnsembleRetriever
+from pipeline.fulltext import PostgresHybridRetriever, PostgresKeywordRetriever, or_query
+
+
+class FakeResult(list):
+    def all(self):
+        return list(self)
+
+
+class FakeEngine:
+    """Engine whose connections record the statements and parameters they execute"""
+
+    def __init__(self, rows):
+        self.rows = rows
+        self.executed = []
+
+    def connect(self):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params):
+        self.executed.append((str(statement), params))
+        return FakeResult(self.rows)
+
+
+def row(id, ord=1):
+    return SimpleNamespace(id=id, document=f"isi {id}", cmetadata={"source": id}, ord=ord)
+
+
+def test_or_query_keeps_only_words():
+    assert or_query("Bagaimana prosedur cuti?") == "Bagaimana or prosedur or cuti"
+    assert or_query('"cuti" -sakit or tahunan') == "cuti or sakit or tahunan"
+    assert or_query("?!") == ""
+
+
+def test_keyword_batch_sql_ors_the_words_of_each_query():
+    engine = FakeEngine([row("a", ord=1), row("b", ord=2)])
+    retriever = PostgresKeywordRetriever(engine=engine, collection_name="docs", k=2)
+
+    results = retriever.search_batch(["prosedur cuti", "gaji?"])
+
+    sql, params = engine.executed[0]
+    assert "websearch_to_tsquery(CAST(:config AS regconfig), qs.query)" in sql
+    assert "replace(" not in sql
+    assert params["queries"] == ["prosedur or cuti", "gaji"]
+    assert params["config"] == "simple" and params["k"] == 2
+    assert [[doc.id for doc in docs] for docs in results] == [["a"], ["b"]]
+
+
+def test_hybrid_sql_fuses_both_branches_with_weighted_rrf():
+    engine = FakeEngine([row("a"), row("b")])
+    retriever = PostgresHybridRetriever(
+        engine=engine,
+        collection_name="docs",
+        embeddings=DeterministicFakeEmbedding(size=3),
+        vector_k=2,
+        keyword_k=2,
+        weights=[0.3, 0.7],
+    )
+
+    docs = retriever.search_by_vectors(["prosedur cuti"], [[0.1, 0.2, 0.3]])[0]
+
+    sql, params = engine.executed[0]
+    assert "websearch_to_tsquery(CAST(:config AS regconfig), :query)" in sql
+    # Documents found by one branch only still score through the other's COALESCE
+    assert "FULL OUTER JOIN keyword ON keyword.id = vector.id" in sql
+    assert "COALESCE(CAST(:keyword_weight AS float8) / (:c + keyword.rank), 0)" in sql
+    assert params["query"] == "prosedur or cuti"
+    assert params["embedding"] == "[0.1,0.2,0.3]"
+    assert (params["vector_weight"], params["keyword_weight"], params["c"], params["k"]) == (0.3, 0.7, 60, 4)
+    assert [doc.id for doc in docs] == ["a", "b"]
+
+
+def test_rrf_fusion_with_one_branch_empty_keeps_the_other_ranking():
+    ensemble = ConcurrentEnsembleRetriever(
+        retrievers=[PostgresKeywordRetriever(engine=None, collection_name="docs")] * 2,
+        weights=[0.5, 0.5],
+        names=["vector", "keyword"],
+    )
+    vector_docs = [Document(id=i, page_content=f"isi {i}") for i in ("a", "b", "c")]
+
+    assert [doc.id for doc in ensemble.fuse([vector_docs, []])] == ["a", "b", "c"]
+    assert [doc.id for doc in ensemble.fuse([[], vector_docs])] == ["a", "b", "c"]
+    assert ensemble.fuse([[], []]) == []
@@ -0,0 +1,71 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from langchain_core.documents import Document
+
+rag = pytest.importorskip("pipeline.rag")
+
+from pipeline.ensemble import ConcurrentEnsembleRetriever
+from pipeline.fulltext import PostgresKeywordRetriever
+from pipeline.snapshot import IndexSnapshot
+
+
+class SlowKeywordRetriever:
+    """Keyword batch search that takes `delay` seconds"""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+
+    def search_batch(self, queries):
+        time.sleep(self.delay)
+        return [[Document(page_content=f"keyword: {q}")] for q in queries]
+
+
+def make_pipeline(keyword_delay: float) -> "rag.RAGPipeline":
+    pipeline = rag.RAGPipeline.__new__(rag.RAGPipeline)
+    pipeline.executor = ThreadPoolExecutor(max_workers=2)
+    pipeline.vector_timeout = 1.0
+    pipeline.keyword_timeout = 0.05
+
+    async def search_vector(vector):
+        return [Document(page_content=f"vector: {vector[0]}")]
+
+    pipeline._asearch_vector = search_vector
+    placeholder = PostgresKeywordRetriever(engine=None, collection_name="docs")
+    ensemble = ConcurrentEnsembleRetriever(
+        retrievers=[placeholder, placeholder], weights=[0.5, 0.5], names=["vector", "keyword"]
+    )
+    pipeline.snapshot = IndexSnapshot(
+        name=None,
+        version="v1",
+        keyword_retriever=SlowKeywordRetriever(keyword_delay),
+        hybrid_retriever=SimpleNamespace(base_retriever=ensemble)
+    )
+    return pipeline
+
+
+def fuse_batch(pipeline):
+    try:
+        return asyncio.run(pipeline._afuse_batch(["cuti", "gaji"], [[1.0], [2.0]], pipeline.snapshot))
+    finally:
+        pipeline.executor.shutdown(wait=True)
+
+
+def test_batch_fuses_both_branches():
+    results = fuse_batch(make_pipeline(keyword_delay=0))
+
+    assert [sorted(doc.page_content for doc in docs) for docs in results] == [
+        ["keyword: cuti", "vector: 1.0"],
+        ["keyword: gaji", "vector: 2.0"],
+    ]
+
+
+def test_slow_keyword_branch_degrades_to_vector_results():
+    started = time.perf_counter()
+    results = fuse_batch(make_pipeline(keyword_delay=0.5))
+
+    assert [[doc.page_content for doc in docs] for docs in results] == [["vector: 1.0"], ["vector: 2.0"]]
+    assert time.perf_counter() - started < 1.0
@@ -0,0 +1,79 @@
+import json
+import os
+
+import numpy as np
+import pytest
+from langchain_core.documents import Document
+from rank_bm25 import BM25Okapi
+
+from common.index_format import KEYWORD_INDEX_FORMAT, is_current_format
+from common.keyword_index import build_keyword_index
+from pipeline.keyword_index import KeywordIndex, KeywordIndexRetriever
+
+TEXTS = [
+    "Cuti tahunan diajukan melalui formulir cuti kepada atasan langsung",
+    "Lembur pada hari libur dibayar dua kali upah per jam",
+    "Karyawan yang sakit wajib melampirkan surat dokter",
+    "Formulir lembur disetujui atasan sebelum lembur dimulai",
+    "Gaji dibayarkan setiap tanggal 25",
+    "",
+    "Izin meninggalkan kantor — atasan menyetujui izin ≥ 2 jam",
+]
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    chunks = [Document(page_content=text, metadata={"source_document": f"sop{i}.pdf"}) for i, text in enumerate(TEXTS)]
+    ids = [f"id{i}" for i in range(len(TEXTS))]
+    path = str(tmp_path / "keyword_index")
+    build_keyword_index(chunks, ids, path)
+    return path
+
+
+def test_index_is_written_in_the_current_format(index_dir):
+    with open(os.path.join(index_dir, "meta.json"), encoding="utf-8") as f:
+        meta = json.load(f)
+
+    assert is_current_format(index_dir, KEYWORD_INDEX_FORMAT)
+    assert meta["num_docs"] == len(TEXTS)
+    assert not os.path.exists(index_dir + ".tmp")
+
+
+def test_loaded_index_scores_like_rank_bm25(index_dir):
+    index = KeywordIndex(index_dir)
+    reference = BM25Okapi([text.split() for text in TEXTS])
+
+    for query in ["cuti atasan", "lembur lembur", "izin ≥ jam", "tidak ditemukan"]:
+        np.testing.assert_allclose(
+            index.get_scores(query.split()), reference.get_scores(query.split()), rtol=1e-6, atol=1e-6
+        )
+
+
+def test_terms_and_chunks_round_trip(index_dir):
+    index = KeywordIndex(index_dir)
+
+    for term in {token for text in TEXTS for token in text.split()}:
+        assert term in index.vocab
+    assert "tidak" not in index.vocab
+    for i, text in enumerate(TEXTS):
+        doc = index.get_document(i)
+        assert (doc.id, doc.page_content, doc.metadata) == (f"id{i}", text, {"source_document": f"sop{i}.pdf"})
+
+
+def test_retriever_returns_best_chunks_first(index_dir):
+    retriever = KeywordIndexRetriever(index=KeywordIndex(index_dir), k=2)
+
+    expected = np.argsort(-BM25Okapi([text.split() for text in TEXTS]).get_scores(["lembur", "atasan"]))[:2]
+
+    assert [doc.id for doc in retriever.invoke("lembur atasan")] == [f"id{i}" for i in expected]
+    assert [docs[0].id for docs in retriever.search_batch(["Gaji", "surat dokter"])] == ["id4", "id2"]
+
+
+def test_rebuilding_replaces_the_index(index_dir):
+    version = KeywordIndex(index_dir).version
+    build_keyword_index([Document(page_content="hanya satu")], ["baru"], index_dir)
+    index = KeywordIndex(index_dir)
+
+    assert index.version != version
+    assert index.num_docs == 1
+    assert index.get_document(0).id == "baru"
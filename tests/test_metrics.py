@@ -0,0 +1,50 @@
+import os
+
+from pipeline.metrics import Counter, Histogram, Registry, shared_metrics_path
+
+
+def make_worker(directory, worker):
+    registry = Registry()
+    requests = registry.register(Counter("rag_requests_total", "Questions processed.", ("method",)))
+    latency = registry.register(Histogram("rag_stage_duration_seconds", "Stage duration.", ("stage",), (0.1, 1.0)))
+    registry.add_collector(lambda: ["# HELP rag_ready Ready.", "# TYPE rag_ready gauge", "rag_ready 1"])
+    registry.share(str(directory), worker=worker, interval=3600)
+    return registry, requests, latency
+
+
+def test_single_process_render_has_no_worker_label():
+    registry = Registry()
+    requests = registry.register(Counter("rag_requests_total", "Questions processed.", ("method",)))
+    requests.inc(method="hybrid")
+
+    assert 'worker="' not in registry.render()
+    assert 'rag_requests_total{method="hybrid"} 1' in registry.render()
+
+
+def test_any_worker_renders_every_worker(tmp_path):
+    first, first_requests, first_latency = make_worker(tmp_path, "0")
+    second, second_requests, _ = make_worker(tmp_path, "1")
+    first_requests.inc(method="hybrid")
+    first_latency.observe(0.5, stage="llm")
+    second_requests.inc(2, method="hybrid")
+
+    # The second worker serves the scrape; the first published its values on its own scrape
+    first.render()
+    lines = second.render().splitlines()
+
+    assert 'rag_requests_total{worker="0",method="hybrid"} 1' in lines
+    assert 'rag_requests_total{worker="1",method="hybrid"} 2' in lines
+    assert 'rag_stage_duration_seconds_count{worker="0",stage="llm"} 1' in lines
+    assert 'rag_ready{worker="1"} 1' in lines
+    # One header per metric, followed by the samples of every worker
+    assert lines.count("# TYPE rag_requests_total counter") == 1
+    start = lines.index("# TYPE rag_requests_total counter")
+    assert all(line.startswith("rag_requests_total{") for line in lines[start + 1:start + 3])
+
+
+def test_removed_worker_is_not_rendered(tmp_path):
+    first, _, _ = make_worker(tmp_path, "0")
+    make_worker(tmp_path, "1")
+    os.remove(shared_metrics_path(str(tmp_path), "1"))
+
+    assert 'worker="1"' not in first.render()
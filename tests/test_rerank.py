@@ -0,0 +1,96 @@
+import numpy as np
+import pytest
+from flashrank import Ranker
+from langchain_core.documents import Document
+from tokenizers import Tokenizer
+from tokenizers.models import WordLevel
+from tokenizers.pre_tokenizers import WhitespaceSplit
+from tokenizers.processors import TemplateProcessing
+
+from pipeline import retriever as retriever_module
+from pipeline.retriever import TimedFlashrankRerank
+
+WORDS = "cuti lembur gaji izin sakit tahunan atasan formulir hari kerja karyawan dibayar".split()
+
+
+class FakeSession:
+    """Cross-encoder stand-in whose logits depend on every ONNX input"""
+
+    def __init__(self, classes: int):
+        self.classes = classes
+        self.inputs = []
+
+    def run(self, output_names, onnx_input):
+        self.inputs.append(sorted(onnx_input))
+        ids = onnx_input["input_ids"] * onnx_input["attention_mask"]
+        types = onnx_input.get("token_type_ids", np.zeros_like(ids))
+        logit = ((ids * (1 + types) * np.arange(1, ids.shape[1] + 1)).sum(axis=1) % 23) / 4.0 - 2.5
+        if self.classes == 1:
+            return [logit[:, None].astype(np.float32)]
+        return [np.stack([-logit, logit], axis=1).astype(np.float32)]
+
+
+def make_ranker(classes: int) -> Ranker:
+    """Flashrank client with a tiny word-level tokenizer and a fake session; nothing is downloaded"""
+    vocab = {"[PAD]": 0, "[UNK]": 1, "[CLS]": 2, "[SEP]": 3, **{w: i + 4 for i, w in enumerate(WORDS)}}
+    tokenizer = Tokenizer(WordLevel(vocab, unk_token="[UNK]"))
+    tokenizer.pre_tokenizer = WhitespaceSplit()
+    tokenizer.post_processor = TemplateProcessing(
+        single="[CLS] $A [SEP]", pair="[CLS] $A [SEP] $B:1 [SEP]:1", special_tokens=[("[CLS]", 2), ("[SEP]", 3)]
+    )
+    tokenizer.enable_truncation(max_length=12)
+    tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+    ranker = Ranker.__new__(Ranker)
+    ranker.llm_model = None
+    ranker.tokenizer = tokenizer
+    ranker.session = FakeSession(classes)
+    ranker.logger = retriever_module.logger
+    return ranker
+
+
+QUERIES = ["cuti tahunan atasan", "lembur dibayar", "gaji karyawan sakit izin"]
+CANDIDATES = [
+    [Document(page_content=" ".join(WORDS[(i * 5 + j) % len(WORDS)] for j in range(3 + i % 9))) for i in range(n)]
+    for n in (7, 1, 12)
+]
+
+
+@pytest.mark.parametrize("classes", [1, 2])
+@pytest.mark.parametrize("batch_size", [1, 5, 64])
+def test_batched_scores_match_flashrank(classes, batch_size):
+    reranker = TimedFlashrankRerank(client=make_ranker(classes), top_n=5)
+
+    batched = reranker.compress_documents_batch(CANDIDATES, QUERIES, batch_size=batch_size)
+
+    for docs, query, got in zip(CANDIDATES, QUERIES, batched):
+        expected = reranker.compress_documents(docs, query)
+        assert [doc.page_content for doc in got] == [doc.page_content for doc in expected]
+        np.testing.assert_allclose(
+            [doc.metadata["relevance_score"] for doc in got],
+            [doc.metadata["relevance_score"] for doc in expected],
+            rtol=1e-6
+        )
+    assert ["attention_mask", "input_ids", "token_type_ids"] in reranker.client.session.inputs
+
+
+def test_model_path_is_resolved_when_the_reranker_is_built(tmp_path):
+    ranker = make_ranker(1)
+    ranker.model_dir = tmp_path / "ms-marco-TinyBERT-L-2-v2"
+
+    reranker = TimedFlashrankRerank(client=ranker, model="ms-marco-TinyBERT-L-2-v2")
+
+    assert reranker.model_path == str(tmp_path / "ms-marco-TinyBERT-L-2-v2" / "flashrank-TinyBERT-L-2-v2.onnx")
+
+
+def test_fork_reset_reloads_the_stored_model_path(monkeypatch):
+    ort = pytest.importorskip("onnxruntime")
+    created = []
+    monkeypatch.setattr(ort, "InferenceSession", lambda path, options: created.append((path, options)) or "session")
+    reranker = TimedFlashrankRerank(client=make_ranker(1), model_path="/models/reranker.onnx")
+
+    reranker.reset_after_fork(threads=2)
+
+    assert reranker.client.session == "session"
+    assert created[0][0] == "/models/reranker.onnx"
+    assert created[0][1].intra_op_num_threads == 2
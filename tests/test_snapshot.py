@@ -0,0 +1,133 @@
+import asyncio
+import itertools
+import os
+import threading
+
+import httpx
+import pytest
+from langchain_core.documents import Document
+
+import service
+from common import snapshot as snapshot_module
+from common.keyword_index import build_keyword_index
+from common.snapshot import (
+    CURRENT_FILE, KEYWORD_INDEX, create_staging_dir, publish_snapshot, read_current_snapshot, resolve_index_dirs
+)
+
+
+@pytest.fixture(autouse=True)
+def increasing_timestamps(monkeypatch):
+    # Snapshot names start with the publish time; tests publish several per second
+    ticks = itertools.count()
+    monkeypatch.setattr(snapshot_module.time, "strftime", lambda fmt: f"20260101T{next(ticks):06d}")
+
+
+def publish(snapshots_dir, text, keep=3):
+    staging_dir = create_staging_dir(snapshots_dir)
+    version = build_keyword_index([Document(page_content=text)], [text], os.path.join(staging_dir, KEYWORD_INDEX))
+    return publish_snapshot(staging_dir, snapshots_dir, version, keep=keep)
+
+
+def test_publish_switches_current_and_keeps_recent_snapshots(tmp_path):
+    snapshots_dir = str(tmp_path)
+    assert read_current_snapshot(snapshots_dir) is None
+    assert resolve_index_dirs(snapshots_dir, "keyword", "vector") == (None, "keyword", "vector")
+
+    names = [publish(snapshots_dir, f"versi {i}", keep=2) for i in range(3)]
+
+    assert read_current_snapshot(snapshots_dir) == names[-1]
+    assert sorted(os.listdir(snapshots_dir)) == sorted([CURRENT_FILE, *names[1:]])
+    name, keyword_dir, _ = resolve_index_dirs(snapshots_dir, "keyword", "vector")
+    assert (name, keyword_dir) == (names[-1], os.path.join(snapshots_dir, names[-1], KEYWORD_INDEX))
+
+
+def test_current_pointing_to_a_missing_snapshot_is_ignored(tmp_path):
+    (tmp_path / CURRENT_FILE).write_text("hilang")
+
+    assert read_current_snapshot(str(tmp_path)) is None
+
+
+class StubEmbeddings:
+    def embed_queries(self, texts):
+        return [[1.0] for _ in texts]
+
+
+def make_pipeline(snapshots_dir):
+    """RAGPipeline serving only the keyword index of each snapshot, without models or databases"""
+    rag = pytest.importorskip("pipeline.rag")
+    from pipeline.keyword_index import KeywordIndex
+    from pipeline.snapshot import IndexSnapshot
+
+    pipeline = rag.RAGPipeline.__new__(rag.RAGPipeline)
+    pipeline.snapshots_dir = snapshots_dir
+    pipeline.keyword_index_dir = None
+    pipeline.vector_index_dir = None
+    pipeline.embeddings = StubEmbeddings()
+    pipeline.reloads = 0
+    pipeline._reload_lock = threading.Lock()
+
+    def load_snapshot(name, keyword_index_dir, vector_index_dir):
+        index = KeywordIndex(keyword_index_dir)
+        return IndexSnapshot(
+            name=name, version=index.version, keyword_retriever=None, hybrid_retriever=None, keyword_index=index
+        )
+
+    pipeline._load_snapshot = load_snapshot
+    pipeline._warm_snapshot = lambda snapshot, vector: []
+    pipeline.snapshot = load_snapshot(*resolve_index_dirs(snapshots_dir, None, None))
+    return pipeline
+
+
+def post_reload(pipeline, token=None, force=False):
+    async def post():
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            headers = {"X-Admin-Token": token} if token is not None else {}
+            return await client.post("/api/v1/admin/reload", params={"force": force}, headers=headers)
+
+    service.rag_pipeline = pipeline
+    try:
+        return asyncio.run(post())
+    finally:
+        service.rag_pipeline = None
+
+
+class CountingPipeline:
+    def __init__(self):
+        self.reloads = 0
+
+    def reload(self, force=False):
+        self.reloads += 1
+        return True
+
+
+@pytest.mark.parametrize("configured, sent", [("", None), ("", ""), ("rahasia", None), ("rahasia", "salah")])
+def test_reload_requires_the_admin_token(monkeypatch, configured, sent):
+    monkeypatch.setattr(service, "ADMIN_TOKEN", configured)
+    pipeline = CountingPipeline()
+
+    response = post_reload(pipeline, token=sent)
+
+    assert response.status_code == 403
+    assert pipeline.reloads == 0
+
+
+def test_reload_swaps_in_the_published_snapshot(tmp_path, monkeypatch):
+    monkeypatch.setattr(service, "ADMIN_TOKEN", "rahasia")
+    snapshots_dir = str(tmp_path)
+    first = publish(snapshots_dir, "versi 1")
+    pipeline = make_pipeline(snapshots_dir)
+    assert not pipeline.snapshot_changed()
+
+    second = publish(snapshots_dir, "versi 2")
+    assert pipeline.snapshot_changed()
+    response = post_reload(pipeline, token="rahasia")
+
+    assert response.status_code == 200
+    assert response.json() == {"reloaded": True, "snapshot": second, "version": pipeline.snapshot.version}
+    assert pipeline.snapshot.keyword_index.get_document(0).page_content == "versi 2"
+    assert first != second and not pipeline.snapshot_changed()
+
+    assert post_reload(pipeline, token="rahasia").json()["reloaded"] is False
+    assert post_reload(pipeline, token="rahasia", force=True).json()["reloaded"] is True
+    assert pipeline.reloads == 2
@@ -0,0 +1,57 @@
+import asyncio
+import json
+
+import httpx
+
+import service
+from models import RetrievalMethod
+
+
+class StubPipeline:
+    """Streams two tokens; memmap is unsupported, as when no vector index was exported"""
+
+    def __init__(self):
+        self.streamed = 0
+
+    def validate_method(self, method):
+        if method == RetrievalMethod.MEMMAP:
+            raise ValueError(f"Invalid retrieval method: {method}")
+
+    async def astream_response(self, session_id, query, method):
+        self.streamed += 1
+        yield {"event": "metadata", "session_id": session_id}
+        for token in ["jawaban ", query]:
+            yield {"event": "token", "content": token}
+        yield {"event": "done"}
+
+
+def post(path, method, pipeline):
+    async def send():
+        transport = httpx.ASGITransport(app=service.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post(path, json={"session_id": "s1", "query": "cuti", "method": method})
+
+    service.rag_pipeline = pipeline
+    try:
+        return asyncio.run(send())
+    finally:
+        service.rag_pipeline = None
+
+
+def test_stream_sends_ndjson_events():
+    response = post("/api/v1/ask/stream", "hybrid", StubPipeline())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert [event["event"] for event in events] == ["metadata", "token", "token", "done"]
+
+
+def test_unsupported_method_is_rejected_before_streaming():
+    pipeline = StubPipeline()
+
+    for path in ["/api/v1/ask/stream", "/api/v1/ask"]:
+        response = post(path, "memmap", pipeline)
+        assert response.status_code == 400
+        assert "Invalid retrieval method" in response.json()["detail"]
+    assert pipeline.streamed == 0